@@ -1,27 +1,89 @@
 import os
-from flask import Flask, render_template, request, jsonify
+
+# Concurrency model: under eventlet (the default) each Socket.IO event runs
+# on a green thread, and the standard library is monkey-patched before
+# anything else is imported, so a handler blocked on an LLM call, speech
+# synthesis or the session store yields to other clients instead of
+# stalling the server. Worker pools and background threads become green
+# threads too. MBTI_ASYNC_MODE=threading runs handlers on OS threads
+# instead. It is read from the environment, not .env, as it must be
+# decided before any import.
+ASYNC_MODE = os.environ.get("MBTI_ASYNC_MODE", "eventlet")
+if ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 from dotenv import load_dotenv
-from models.mbti_analyzer import MBTIAnalyzer
+from models import metrics
+from models.llm_provider import api_key_missing
+from models.mbti_analyzer import MBTIAnalyzer, static_utterances
+from models.result import spoken_section
+from models.rate_limiter import SchedulerBusy
+from models.session_manager import SessionManager
+from models.stt_pipeline import STTPipeline
+from models.tts_cache import presynthesize
+from models.tts_pipeline import TTSPipeline
 from models.voice_processor import VoiceProcessor
 
 # Load environment variables
 load_dotenv()
 
 # Check for OpenAI API key
-if not os.environ.get("OPENAI_API_KEY"):
+if api_key_missing():
     print("WARNING: OPENAI_API_KEY environment variable is not set.")
     print("Please add it to your .env file or environment variables.")
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'mbti-personality-test'
-socketio = SocketIO(app, cors_allowed_origins="*")
+# In multi-worker mode a message queue (e.g. redis://) carries emits to
+# clients connected to other workers
+socketio = SocketIO(
+    app,
+    async_mode=ASYNC_MODE,
+    cors_allowed_origins="*",
+    message_queue=os.environ.get("MBTI_MESSAGE_QUEUE")
+)
 
-# Initialize MBTI analyzer and voice processor
-mbti_analyzer = MBTIAnalyzer()
+# Initialize per-session MBTI analyzers and voice processor
+session_manager = SessionManager(MBTIAnalyzer)
 voice_processor = VoiceProcessor()
 
+metrics.register_collector(lambda: [
+    ('mbti_active_sessions', {}, len(session_manager)),
+    ('mbti_connected_clients', {}, len(session_manager.sid_tokens)),
+    ('mbti_voice_sessions', {}, voice_processor.active_sessions()),
+] + [
+    ('mbti_tts_cache_total', {'event': event}, value)
+    for event, value in voice_processor.cache.stats().items()
+    if event not in ('memory_clips', 'memory_bytes')
+])
+
+def deliver_speech(sid, key, first):
+    """Point the client that should hear a reply at its next cached clip."""
+    socketio.emit('tts_audio', {'url': f'/tts/{key}.mp3', 'mime_type': 'audio/mpeg', 'first': first}, to=sid)
+
+# Speech is synthesized (or found in the clip cache) sentence by sentence
+# off the handler path, and fetched and played in order by the browser
+tts_pipeline = TTSPipeline(voice_processor.clip, deliver_speech, sessions=voice_processor)
+
+if os.environ.get('MBTI_TTS_PRESYNTHESIZE') == '1':
+    # Warm the clip cache with the fixed replies without delaying startup
+    socketio.start_background_task(presynthesize, voice_processor, static_utterances(), tts_pipeline.chunk_chars)
+
+def deliver_partial_transcript(sid, text):
+    """Show a client what it has said so far, while it is still speaking."""
+    socketio.emit('partial_transcript', {'text': text}, to=sid)
+
+def deliver_transcript(sid, text):
+    """Run a finished utterance as the client's next turn, off the recognition pool."""
+    socketio.start_background_task(handle_voice_input, text, sid)
+
+# Browser microphone audio is endpointed per client and recognized on a worker pool
+stt_pipeline = STTPipeline(deliver_partial_transcript, deliver_transcript, sessions=voice_processor)
+
 @app.route('/')
 def index():
     """Render the main page of the application."""
@@ -32,57 +94,186 @@ def result():
     """Render the result page of the application."""
     return render_template('result.html')
 
-def handle_voice_input(text):
-    """Handle voice input from the speech recognition."""
-    # Process the voice input and emit response
-    response, is_complete, mbti_result = mbti_analyzer.process_message(text)
-    
-    # Emit the response back to the client
-    socketio.emit('response', {
-        'message': response,
-        'is_complete': is_complete,
-        'mbti_result': mbti_result,
-        'voice_input': text
-    })
-    
-    # Convert response to speech
-    voice_processor.text_to_speech(response)
+@app.route('/tts/<key>.mp3')
+def tts_clip(key):
+    """Serve a cached speech clip; clips are content-addressed, so they never change."""
+    audio = voice_processor.clip_audio(key)
+    if audio is None:
+        return Response(status=404)
+    response = Response(audio, mimetype='audio/mpeg')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    response.set_etag(key)
+    return response.make_conditional(request)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Expose latency histograms and pipeline counters for Prometheus."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def progressive_callbacks(sid):
+    """Build callbacks that push result sections and tokens to one client as they form."""
+    def on_section(section, content):
+        socketio.emit('result_section', {'section': section, 'content': content}, to=sid)
+
+    def on_token(section, token):
+        socketio.emit('result_token', {'section': section, 'token': token}, to=sid)
+
+    return on_section, on_token
+
+def result_payload(mbti_result):
+    """The analyzer's result as a dict for the 'response' event, recording its encoded size."""
+    if mbti_result is None:
+        return None
+    # Socket.IO encodes the event as one compact JSON frame; a JSON string
+    # inside it would be encoded twice, escaping every quote
+    metrics.observe('mbti_result_payload_bytes', len(mbti_result.to_json()))
+    return mbti_result.to_dict()
+
+def spoken_text(response, mbti_result):
+    """The text to speak for a reply: the full result once the test is complete."""
+    return mbti_result.render_text() if mbti_result is not None else response
+
+def speaking_callbacks(sid, on_section):
+    """
+    Wrap on_section so each result section is also spoken as soon as it is ready.
+
+    Returns the wrapper and the set of sections spoken so far; the first
+    section opens a new utterance, later ones are appended to it.
+    """
+    spoken = set()
+
+    def speak_section(section, content):
+        if on_section is not None:
+            on_section(section, content)
+        # A personalized update replaces a section on screen but isn't read twice
+        if section in spoken:
+            return
+        if not spoken:
+            tts_pipeline.open(sid)
+        spoken.add(section)
+        tts_pipeline.append(sid, spoken_section(section, content))
+
+    return speak_section, spoken
+
+def queue_speech(sid, response, mbti_result, spoken):
+    """Speak a reply, or finish the result that was already spoken section by section."""
+    if spoken:
+        tts_pipeline.close(sid)
+    else:
+        tts_pipeline.submit(sid, spoken_text(response, mbti_result))
+
+def busy_payload(error):
+    """Tell a client its turn was refused because the LLM queue is saturated."""
+    return {
+        'message': "I'm talking with a lot of people right now. Please send that again in a moment.",
+        'retry_after': error.retry_after
+    }
+
+def handle_voice_input(text, sid):
+    """Handle a transcribed utterance from the client's microphone stream."""
+    # A client's overlapping turns run one at a time, in the order they arrived
+    with session_manager.turn(sid):
+        # Process the voice input with this client's analyzer and emit response
+        mbti_analyzer = session_manager.get_analyzer(sid)
+        on_section, on_token = progressive_callbacks(sid)
+        on_section, spoken = speaking_callbacks(sid, on_section)
+        try:
+            response, is_complete, mbti_result = mbti_analyzer.process_message(
+                text, on_section=on_section, on_token=on_token, on_update=session_manager.saver(sid)
+            )
+        except SchedulerBusy as e:
+            socketio.emit('busy', dict(busy_payload(e), voice_input=text), to=sid)
+            return
+        session_manager.save(sid)
+        
+        # Emit the response back to the client
+        socketio.emit('response', {
+            'message': response,
+            'is_complete': is_complete,
+            'mbti_result': result_payload(mbti_result),
+            'voice_input': text
+        }, to=sid)
+        
+        # Queue the spoken reply; voice input always gets one
+        queue_speech(sid, response, mbti_result, spoken)
 
 @socketio.on('message')
 def handle_message(data):
     """Handle incoming messages from the client."""
     user_message = data.get('message', '')
     
-    # Process the message and get a response
-    response, is_complete, mbti_result = mbti_analyzer.process_message(user_message)
-    
-    # Emit the response back to the client
-    emit('response', {
-        'message': response,
-        'is_complete': is_complete,
-        'mbti_result': mbti_result,
-        'voice_input': None
-    })
-    
-    # Convert response to speech
-    voice_processor.text_to_speech(response)
+    # One turn at a time per client, in arrival order
+    with session_manager.turn(request.sid):
+        # Process the message with this client's analyzer and get a response
+        mbti_analyzer = session_manager.get_analyzer(request.sid)
+        on_section, on_token = progressive_callbacks(request.sid) if data.get('progressive') else (None, None)
+        spoken = set()
+        if data.get('speak'):
+            on_section, spoken = speaking_callbacks(request.sid, on_section)
+        try:
+            response, is_complete, mbti_result = mbti_analyzer.process_message(
+                user_message, on_section=on_section, on_token=on_token,
+                on_update=session_manager.saver(request.sid)
+            )
+        except SchedulerBusy as e:
+            # Explicit backpressure instead of leaving the client waiting
+            emit('busy', dict(busy_payload(e), voice_input=None))
+            return
+        session_manager.save(request.sid)
+        
+        # Emit the response back to the client
+        emit('response', {
+            'message': response,
+            'is_complete': is_complete,
+            'mbti_result': result_payload(mbti_result),
+            'voice_input': None
+        })
+        
+        # Queue a spoken reply if the client asked for one; either way it supersedes older speech
+        if data.get('speak'):
+            queue_speech(request.sid, response, mbti_result, spoken)
+        else:
+            tts_pipeline.cancel(request.sid)
 
 @socketio.on('start_voice')
-def handle_start_voice():
-    """Start voice recognition."""
-    success = voice_processor.start_listening(handle_voice_input)
-    emit('voice_status', {'status': 'started' if success else 'error'})
+def handle_start_voice(data=None):
+    """Open a stream for the client's microphone audio."""
+    sample_rate = (data or {}).get('sample_rate', 16000)
+    try:
+        stt_pipeline.start(request.sid, sample_rate)
+    except (TypeError, ValueError):
+        emit('voice_status', {'status': 'error'})
+        return
+    emit('voice_status', {'status': 'started'})
+
+@socketio.on('audio_chunk')
+def handle_audio_chunk(chunk):
+    """Endpoint a chunk of 16-bit mono PCM from the client's microphone."""
+    stt_pipeline.feed(request.sid, chunk)
 
 @socketio.on('stop_voice')
 def handle_stop_voice():
-    """Stop voice recognition."""
-    voice_processor.stop_listening()
+    """Close the client's audio stream, transcribing anything still being said."""
+    stt_pipeline.stop(request.sid)
     emit('voice_status', {'status': 'stopped'})
 
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Attach the client to a new or resumed test session."""
+    token = (auth or {}).get('session_token')
+    token = session_manager.connect(request.sid, token)
+    emit('session', {'session_token': token})
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Clean up resources on client disconnect."""
-    voice_processor.cleanup()
+    session_manager.disconnect(request.sid)
+    tts_pipeline.cancel(request.sid)
+    # Each pipeline releases this client's voice state once its in-flight work
+    # is done; the audio backend and clip cache are shared and stay up
+    stt_pipeline.cancel(request.sid)
 
 if __name__ == '__main__':
     try:
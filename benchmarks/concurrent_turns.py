@@ -0,0 +1,170 @@
+"""
+End-to-end concurrency check of the Socket.IO server on the fake LLM backend.
+
+Starts app.py in a subprocess, eventlet by default, and connects real
+Socket.IO clients to it:
+
+1. Concurrency: N clients send one answer each at the same moment. Every
+   turn waits on the fake LLM's fixed latency, so when handlers yield
+   while they wait all N finish in about the time one turn takes alone; a
+   server that blocks on each call takes about N times as long.
+2. Ordering: one client sends two answers back to back without waiting for
+   a reply. The per-session turn lock must process them one at a time and
+   in order, so the replies are the next two opening questions in sequence.
+
+Exits with status 1 if either check fails, so it can gate CI.
+
+    python -m benchmarks.concurrent_turns
+    python -m benchmarks.concurrent_turns --clients 50 --latency 2 --async-mode threading
+"""
+import argparse
+import os
+import queue
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.load_test import ANSWERS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Client:
+    def __init__(self, url):
+        """A Socket.IO client that collects the text of each 'response' event."""
+        import socketio
+
+        self.sio = socketio.Client()
+        self.replies = queue.Queue()
+        self.sio.on("response", lambda data: self.replies.put(data["message"]))
+        self.sio.on("busy", lambda data: self.replies.put(None))
+        self.sio.connect(url)
+
+    def send(self, message):
+        self.sio.emit("message", {"message": message})
+
+    def reply(self, timeout):
+        return self.replies.get(timeout=timeout)
+
+    def turn(self, message, timeout):
+        self.send(message)
+        return self.reply(timeout)
+
+    def close(self):
+        self.sio.disconnect()
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(port, async_mode, latency):
+    """Run app.py on the fake backend, with the caches that would hide latency off."""
+    env = dict(
+        os.environ,
+        MBTI_ASYNC_MODE=async_mode,
+        MBTI_LLM_BACKEND="fake",
+        MBTI_FAKE_LLM_LATENCY=f"fixed:{latency}",
+        MBTI_ANSWER_CACHE="off",
+        MBTI_SINGLE_FLIGHT="off",
+        MBTI_GENERATION_CACHE="off",
+    )
+    env.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+    code = f"import app; app.socketio.run(app.app, host='127.0.0.1', port={port})"
+    return subprocess.Popen([sys.executable, "-c", code], cwd=ROOT, env=env)
+
+
+def connect(url, deadline):
+    """Connect a client, retrying while the server starts."""
+    while True:
+        try:
+            return Client(url)
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def started_client(url, timeout):
+    """A client that has been welcomed and asked the first question."""
+    client = connect(url, time.time() + timeout)
+    client.turn("", timeout)
+    client.turn("I'm ready", timeout)
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients (default: 20)")
+    parser.add_argument("--latency", type=float, default=1.0, help="Fake LLM latency in seconds (default: 1.0)")
+    parser.add_argument("--async-mode", default="eventlet", choices=("eventlet", "threading"),
+                        help="MBTI_ASYNC_MODE for the server (default: eventlet)")
+    args = parser.parse_args()
+
+    from models.mbti_analyzer import INITIAL_QUESTIONS
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    timeout = 30 + args.latency * args.clients * 2
+    server = start_server(port, args.async_mode, args.latency)
+    clients = []
+    failures = 0
+    try:
+        # An untimed turn first: the server loads langchain and builds its
+        # chains on the first LLM call, which would inflate the baseline and
+        # make any concurrent run look fast by comparison
+        warm_up = started_client(url, timeout)
+        clients.append(warm_up)
+        warm_up.turn(ANSWERS[3], timeout)
+
+        # One turn alone, for the baseline
+        solo = started_client(url, timeout)
+        clients.append(solo)
+        started = time.perf_counter()
+        solo.turn(ANSWERS[0], timeout)
+        single = time.perf_counter() - started
+
+        # N turns at once; distinct answers so nothing is shared between them
+        clients += [started_client(url, timeout) for _ in range(args.clients)]
+        started = time.perf_counter()
+        concurrent_clients = clients[2:]
+        for i, client in enumerate(concurrent_clients):
+            client.send(f"{ANSWERS[i % len(ANSWERS)]} ({i})")
+        for client in concurrent_clients:
+            client.reply(timeout)
+        concurrent = time.perf_counter() - started
+
+        ratio = concurrent / single
+        print(f"[{args.async_mode}] one turn alone {single:.2f}s, {args.clients} concurrent turns {concurrent:.2f}s: "
+              f"{ratio:.1f}x (1x is fully concurrent, {args.clients}x serialized)")
+        print("concurrency: " + ("ok" if ratio < 2 else "FAILED, turns are being serialized"))
+        failures += ratio >= 2
+
+        # Overlapping turns from one client
+        ordered = started_client(url, timeout)
+        clients.append(ordered)
+        started = time.perf_counter()
+        ordered.send(ANSWERS[1])
+        ordered.send(ANSWERS[2])
+        replies = [ordered.reply(timeout), ordered.reply(timeout)]
+        elapsed = time.perf_counter() - started
+        expected = list(INITIAL_QUESTIONS[1:3])
+        print(f"two overlapping turns from one client took {elapsed:.2f}s")
+        print("ordering: " + ("ok" if replies == expected else f"FAILED, got {replies}, expected {expected}"))
+        failures += replies != expected
+    finally:
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+        server.terminate()
+        server.wait()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Profile the cold-start import cost of the app.
+
+Imports a module in a fresh interpreter under ``python -X importtime``,
+several times, and reports the median total import time, the slowest
+top-level packages by cumulative time, and which heavy optional
+dependencies were loaded at import. The app itself should load none of
+them: langchain, openai and the generators come in on the first LLM call,
+the voice libraries on the first voice event.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module models.mbti_analyzer --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+# Dependencies the app only needs once a session actually uses them
+HEAVY = ("langchain", "openai", "tiktoken", "numpy", "pygame", "speech_recognition", "gtts", "redis")
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+import json
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print("@@" + json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def profile(module, env):
+    """
+    Import module once in a fresh interpreter.
+
+    Returns:
+        tuple: (seconds, heavy modules loaded, {package: cumulative microseconds}, error or None)
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, env=env
+    )
+    packages = defaultdict(int)
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if not fields[1].isdigit():
+            continue  # the header line
+        # Top-level entries are indented by a single space in the raw line
+        name = line.split("|")[2]
+        if not name.startswith("  "):
+            packages[fields[2].split(".")[0]] += int(fields[1])
+
+    for line in process.stdout.splitlines():
+        if line.startswith("@@"):
+            result = json.loads(line[2:])
+            return result["seconds"], result["heavy"], packages, None
+    error = process.stderr.strip().splitlines()[-1:] or ["no output"]
+    return None, [], packages, error[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list (default: 10)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+
+    # One untimed run so every later run reads warm .pyc files and page cache
+    profile(args.module, env)
+
+    timings, packages, heavy = [], defaultdict(list), set()
+    for _ in range(args.runs):
+        seconds, loaded, run_packages, error = profile(args.module, env)
+        if error:
+            print(f"import {args.module} failed: {error}")
+            return
+        timings.append(seconds)
+        heavy.update(loaded)
+        for name, micros in run_packages.items():
+            packages[name].append(micros)
+
+    print(f"import {args.module}: median {statistics.median(timings) * 1000:.1f}ms "
+          f"min {min(timings) * 1000:.1f}ms max {max(timings) * 1000:.1f}ms over {args.runs} runs")
+    slowest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, micros in slowest[:args.top]:
+        print(f"  {name:<24} {statistics.median(micros) / 1000:8.1f}ms cumulative")
+    print(f"heavy dependencies loaded at import: {', '.join(sorted(heavy)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
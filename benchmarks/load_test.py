@@ -0,0 +1,148 @@
+"""
+End-to-end latency benchmark against the fake LLM backend.
+
+Simulates N concurrent Socket.IO clients, each with its own sid in the
+session store, driving a full test through process_message: welcome,
+"ready", answers until the result page. Reports p50/p95/p99 per-turn and
+result-page latency, throughput and memory per session.
+
+    python -m benchmarks.load_test --clients 200 --latency lognormal:-0.7,0.4
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+ANSWERS = [
+    "Honestly, a quiet evening with a good book recharges me more than anything.",
+    "I like to research first and make a plan before I jump in.",
+    "Hiking somewhere new, then cooking dinner with a couple of close friends.",
+    "I list the pros and cons, but in the end I go with what feels right.",
+    "I keep a calendar for everything, surprises stress me out a little.",
+    "I'd rather talk about ideas and what could be than about the news.",
+    "When a friend is upset I try to fix the problem before anything else.",
+    "Big parties are fun for an hour, then I look for the quiet corner.",
+]
+
+
+def answer(client, turn):
+    """
+    A client's answer for a turn.
+
+    Each client starts at a different answer and signs it, so concurrent
+    clients never send identical prompts: request coalescing would
+    otherwise fold them into one upstream call and the benchmark would
+    measure coalescing instead of LLM load.
+    """
+    return f"{ANSWERS[(client + turn) % len(ANSWERS)]} (client {client})"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_client(session_manager, number, max_turns, turn_latencies, result_latencies, errors):
+    """Drive one simulated client through a complete test."""
+    sid = f"client-{number}"
+    try:
+        session_manager.connect(sid)
+        analyzer = session_manager.get_analyzer(sid)
+        analyzer.process_message("")
+        analyzer.process_message("I'm ready")
+
+        for turn in range(max_turns):
+            started = time.perf_counter()
+            _, is_complete, _ = analyzer.process_message(answer(number, turn))
+            elapsed = time.perf_counter() - started
+            if is_complete:
+                result_latencies.append(elapsed)
+                return
+            turn_latencies.append(elapsed)
+        errors.append(f"{sid}: no result after {max_turns} turns")
+    except Exception as e:
+        errors.append(f"{sid}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent simulated clients (default: 50)")
+    parser.add_argument("--latency", default="lognormal:-0.7,0.4",
+                        help="Fake LLM latency distribution (default: lognormal:-0.7,0.4)")
+    parser.add_argument("--max-turns", type=int, default=30, help="Give up on a client after this many answers")
+    args = parser.parse_args()
+
+    # Configure the fake backend before anything builds a model
+    os.environ["MBTI_LLM_BACKEND"] = "fake"
+    os.environ["MBTI_FAKE_LLM_LATENCY"] = args.latency
+    os.environ.setdefault("MBTI_GENERATION_CACHE", "off")
+
+    from models import metrics
+    from models.answer_cache import get_answer_cache
+    from models.json_utils import parse_stats
+    from models.llm_provider import single_flight_stats
+    from models.mbti_analyzer import MBTIAnalyzer
+    from models.session_manager import SessionManager
+
+    # One untimed session first, so the lazily imported langchain, generator
+    # and tokenizer modules and the shared chains are loaded before memory is
+    # traced; otherwise their one-time cost shows up as per-session memory.
+    # The stage and LLM counters below include this session.
+    warm_up_errors = []
+    run_client(SessionManager(MBTIAnalyzer), args.clients, args.max_turns, [], [], warm_up_errors)
+    if warm_up_errors:
+        print(f"warm-up failed: {warm_up_errors[0]}")
+        return
+
+    session_manager = SessionManager(MBTIAnalyzer, max_sessions=args.clients * 2)
+    turn_latencies, result_latencies, errors = [], [], []
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    threads = [
+        threading.Thread(
+            target=run_client,
+            args=(session_manager, i, args.max_turns, turn_latencies, result_latencies, errors)
+        )
+        for i in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wall = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    completed = len(result_latencies)
+    print(f"clients: {args.clients}  completed: {completed}  errors: {len(errors)}  wall: {wall:.1f}s")
+    for label, values in (("turn", turn_latencies), ("result page", result_latencies)):
+        print(
+            f"{label:<12} n={len(values):<6} p50={percentile(values, 50):.3f}s "
+            f"p95={percentile(values, 95):.3f}s p99={percentile(values, 99):.3f}s "
+            f"mean={statistics.mean(values) if values else 0:.3f}s"
+        )
+    print(f"throughput: {completed / wall:.2f} tests/s, {(len(turn_latencies) + completed) / wall:.2f} turns/s")
+    print(f"memory per session: {retained / max(1, len(session_manager)) / 1024:.1f} KiB")
+    for name in ("mbti_stage_seconds", "mbti_section_seconds", "mbti_section_queue_seconds"):
+        for labels, (count, mean) in sorted(metrics.summary(name).items()):
+            print(f"{labels:<28} n={count:<6} mean={mean:.3f}s")
+    print(f"parse counters: {parse_stats()}")
+    print(f"LLM calls: {single_flight_stats()}")
+    if get_answer_cache() is not None:
+        print(f"answer cache: {get_answer_cache().stats()}")
+    for error in errors[:5]:
+        print(f"error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Multi-process load test for the shared session store.
+
+Starts W worker processes, each with its own SessionManager backed by one
+shared store, and drives N simulated clients through complete tests on the
+fake LLM backend. Every turn goes to a randomly chosen worker, as behind a
+non-sticky load balancer, so a test only completes if each worker picks up
+the state the previous one saved. Reports completion, per-turn latency
+percentiles, throughput and how many turns switched worker.
+
+    python -m benchmarks.multi_worker --workers 4 --clients 100
+    python -m benchmarks.multi_worker --store redis://localhost:6379/0
+"""
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.load_test import answer, percentile
+
+
+def worker(index, requests, responses, store_url, latency):
+    """Serve turns from the request queue until told to stop."""
+    os.environ["MBTI_LLM_BACKEND"] = "fake"
+    os.environ["MBTI_FAKE_LLM_LATENCY"] = latency
+    os.environ["MBTI_SESSION_STORE"] = store_url
+    os.environ.setdefault("MBTI_GENERATION_CACHE", "off")
+
+    from models.mbti_analyzer import MBTIAnalyzer
+    from models.session_manager import SessionManager
+
+    session_manager = SessionManager(MBTIAnalyzer)
+    while True:
+        item = requests.get()
+        if item is None:
+            return
+        request_id, token, message = item
+        sid = f"worker-{index}-{request_id}"
+        started = time.perf_counter()
+        try:
+            token = session_manager.connect(sid, token)
+            analyzer = session_manager.get_analyzer(sid)
+            _, is_complete, _ = analyzer.process_message(message)
+            session_manager.save(sid)
+            session_manager.disconnect(sid)
+            responses.put((request_id, token, is_complete, time.perf_counter() - started, index, None))
+        except Exception as e:
+            responses.put((request_id, token, False, 0.0, index, str(e)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (default: 4)")
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent simulated clients (default: 50)")
+    parser.add_argument("--latency", default="lognormal:-0.7,0.4",
+                        help="Fake LLM latency distribution (default: lognormal:-0.7,0.4)")
+    parser.add_argument("--max-turns", type=int, default=30, help="Give up on a client after this many answers")
+    parser.add_argument("--store", default=None,
+                        help="Shared session store URL (default: a temporary sqlite:/// file)")
+    args = parser.parse_args()
+
+    store_dir = tempfile.mkdtemp(prefix="mbti-sessions-")
+    store_url = args.store or f"sqlite:///{os.path.join(store_dir, 'sessions.sqlite3')}"
+
+    context = multiprocessing.get_context("spawn")
+    responses = context.Queue()
+    request_queues = [context.Queue() for _ in range(args.workers)]
+    processes = [
+        context.Process(target=worker, args=(i, request_queues[i], responses, store_url, args.latency), daemon=True)
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    # Route each response back to the client thread waiting for it
+    waiting = {}
+    waiting_lock = threading.Lock()
+
+    def route():
+        while True:
+            response = responses.get()
+            if response is None:
+                return
+            with waiting_lock:
+                inbox = waiting.pop(response[0])
+            inbox.put(response)
+
+    router = threading.Thread(target=route, daemon=True)
+    router.start()
+
+    request_ids = iter(range(10 ** 9))
+    ids_lock = threading.Lock()
+    turn_latencies, errors, hops = [], [], []
+    completed = []
+
+    def send(token, message):
+        with ids_lock:
+            request_id = next(request_ids)
+        inbox = queue.Queue()
+        with waiting_lock:
+            waiting[request_id] = inbox
+        request_queues[random.randrange(args.workers)].put((request_id, token, message))
+        return inbox.get()
+
+    def run_client(number):
+        token, last_worker = None, None
+        try:
+            for message in ("", "I'm ready"):
+                _, token, _, _, last_worker, error = send(token, message)
+                if error:
+                    raise RuntimeError(error)
+            for turn in range(args.max_turns):
+                _, token, is_complete, elapsed, worker_index, error = send(token, answer(number, turn))
+                if error:
+                    raise RuntimeError(error)
+                turn_latencies.append(elapsed)
+                hops.append(worker_index != last_worker)
+                last_worker = worker_index
+                if is_complete:
+                    completed.append(number)
+                    return
+            errors.append(f"client-{number}: no result after {args.max_turns} turns")
+        except Exception as e:
+            errors.append(f"client-{number}: {e}")
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=run_client, args=(i,)) for i in range(args.clients)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    wall = time.perf_counter() - started
+
+    for request_queue in request_queues:
+        request_queue.put(None)
+    for process in processes:
+        process.join(timeout=10)
+    responses.put(None)
+
+    print(f"workers: {args.workers}  clients: {args.clients}  completed: {len(completed)}  "
+          f"errors: {len(errors)}  wall: {wall:.1f}s  store: {store_url}")
+    print(
+        f"turn         n={len(turn_latencies):<6} p50={percentile(turn_latencies, 50):.3f}s "
+        f"p95={percentile(turn_latencies, 95):.3f}s p99={percentile(turn_latencies, 99):.3f}s "
+        f"mean={statistics.mean(turn_latencies) if turn_latencies else 0:.3f}s"
+    )
+    print(f"throughput: {len(completed) / wall:.2f} tests/s, {len(turn_latencies) / wall:.2f} turns/s")
+    print(f"turns served by a different worker than the previous turn: {sum(hops)}/{len(hops)}")
+    for error in errors[:5]:
+        print(f"error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the single-call and split turn modes.
+
+Drives one analyzer per mode through the same scripted answers against a
+stand-in prompt chain with a fixed per-call latency, and reports
+per-turn latency, LLM calls and prompt tokens once questions come from the LLM.
+
+    python -m benchmarks.turn_modes --latency 0.8
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-placeholder")
+
+from models.mbti_analyzer import MBTIAnalyzer
+
+ANSWERS = [
+    "Honestly, a quiet evening with a good book recharges me more than anything.",
+    "I like to research first and make a plan before I jump in.",
+    "Hiking somewhere new, then cooking dinner with a couple of close friends.",
+    "I list the pros and cons, but in the end I go with what feels right.",
+    "I keep a calendar for everything, surprises stress me out a little.",
+    "I'd rather talk about ideas and what could be than about the news.",
+    "When a friend is upset I try to fix the problem before anything else.",
+]
+
+ANALYSIS = {
+    "dimension_analysis": {
+        "E-I": {"confidence": 0.3, "preference": "I", "indicators": ["recharges alone"]},
+        "S-N": {"confidence": 0.3, "preference": "N", "indicators": ["ideas over facts"]},
+        "T-F": {"confidence": 0.3, "preference": "T", "indicators": ["problem solving"]},
+        "J-P": {"confidence": 0.3, "preference": "J", "indicators": ["keeps a calendar"]}
+    },
+    "themes": ["planning", "reflection"],
+    "context_relevance": 0.8
+}
+
+QUESTION = "What's something you've been looking forward to lately, and why?"
+
+
+class ScriptedChain:
+    """Stands in for the analyzer's prompt chain with a fixed per-call latency."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def predict(self, prompt, callbacks=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        if '"dimension_analysis"' not in prompt:
+            return QUESTION
+        reply = dict(ANALYSIS)
+        if '"next_question"' in prompt:
+            reply["next_question"] = QUESTION
+        return json.dumps(reply)
+
+
+def run_mode(mode, latency):
+    analyzer = MBTIAnalyzer()
+    analyzer.turn_mode = mode
+    analyzer.prompt_chain = ScriptedChain(latency)
+
+    analyzer.process_message("")
+    analyzer.process_message("I'm ready")
+
+    latencies, calls, prompt_tokens = [], [], []
+    for answer in ANSWERS:
+        generated = analyzer._next_question_is_generated()
+        calls_before = analyzer.prompt_chain.calls
+
+        started = time.perf_counter()
+        analyzer.process_message(answer)
+        elapsed = time.perf_counter() - started
+
+        # Only turns whose question comes from the LLM differ between modes
+        if generated:
+            latencies.append(elapsed)
+            calls.append(analyzer.prompt_chain.calls - calls_before)
+            prompt_tokens.append(analyzer.prompt_token_log[-1])
+
+    return {
+        "mode": mode,
+        "turns": len(latencies),
+        "mean_latency": statistics.mean(latencies),
+        "calls_per_turn": statistics.mean(calls),
+        "prompt_tokens_per_turn": statistics.mean(prompt_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.8,
+                        help="Simulated seconds per LLM call (default: 0.8)")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'turns':>7}{'latency (s)':>14}{'calls/turn':>12}{'prompt tokens/turn':>20}")
+    for mode in ("split", "single"):
+        stats = run_mode(mode, args.latency)
+        print(
+            f"{stats['mode']:<8}{stats['turns']:>7}{stats['mean_latency']:>14.2f}"
+            f"{stats['calls_per_turn']:>12.1f}{stats['prompt_tokens_per_turn']:>20.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+File-descriptor and memory footprint of voice sessions under churn.
+
+Runs many connect/disconnect cycles through the voice stack the way the
+Socket.IO handlers drive it: each simulated client opens a microphone
+stream, sends a second of audio, has a reply spoken through the TTS
+pipeline and disconnects. Recognition and synthesis are stubbed with
+fixed results, so nothing is fetched over the network or written to
+disk, and only the bookkeeping is measured.
+
+After a warm-up it samples open file descriptors, threads, traced Python
+memory and the live per-session entries every --report cycles. All of
+them should stay flat: a steady climb is a leak. At the end it checks
+that no per-session state is left, descriptors are back to the warm-up
+level, traced memory grew by less than --max-growth-kb since the first
+sample and the audio backend was never re-initialized; it exits with
+status 1 if any check fails.
+
+    python -m benchmarks.voice_sessions
+    python -m benchmarks.voice_sessions --cycles 10000 --concurrency 16
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# A fake MP3 the size of a sentence of gTTS speech
+CLIP = b"\xff\xf3" * 12000
+
+
+class EchoRecognizer:
+    """Returns the same transcript for any audio."""
+
+    def recognize(self, pcm, sample_rate):
+        return "I recharge best on a quiet evening at home."
+
+
+def speech(sample_rate, seconds):
+    """Silence, a loud stretch, then silence: one utterance for the endpointer."""
+    quiet = array("h", [0] * int(sample_rate * 0.3)).tobytes()
+    loud = array("h", [4000, -4000] * int(sample_rate * seconds / 2)).tobytes()
+    return quiet + loud + quiet * 3
+
+
+def open_fds():
+    """Open file descriptors of this process, or None where /proc isn't available."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=2000, help="Connect/disconnect cycles (default: 2000)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clients cycling at once (default: 8)")
+    parser.add_argument("--report", type=int, default=500, help="Cycles between samples (default: 500)")
+    parser.add_argument("--max-growth-kb", type=float, default=256,
+                        help="Traced memory growth allowed after the first sample (default: 256)")
+    parser.add_argument("--fd-slack", type=int, default=2,
+                        help="Open file descriptors allowed above the warm-up level (default: 2)")
+    args = parser.parse_args()
+
+    from models.stt_pipeline import STTPipeline
+    from models.tts_cache import TTSCache
+    from models.tts_pipeline import TTSPipeline
+    from models.voice_processor import VoiceProcessor
+
+    voice_processor = VoiceProcessor(cache=TTSCache(directory="off"))
+    voice_processor._synthesize = lambda text, lang: CLIP
+    tts_pipeline = TTSPipeline(voice_processor.clip, lambda sid, key, first: None, sessions=voice_processor)
+    stt_pipeline = STTPipeline(
+        lambda sid, text: None,
+        lambda sid, text: None,
+        recognizer=EchoRecognizer(),
+        partial_interval=0,
+        sessions=voice_processor,
+    )
+    audio = speech(16000, 1.0)
+    chunk = 3200  # 100ms, as the browser sends it
+
+    def cycle(n):
+        sid = f"sid-{n}"
+        stt_pipeline.start(sid, 16000)
+        for offset in range(0, len(audio), chunk):
+            stt_pipeline.feed(sid, audio[offset:offset + chunk])
+        stt_pipeline.stop(sid)
+        tts_pipeline.submit(sid, f"Reply number {n % 50}. It has a second sentence.")
+        # Disconnect, as handle_disconnect does
+        tts_pipeline.cancel(sid)
+        stt_pipeline.cancel(sid)
+
+    def sample(done, started):
+        current, peak = tracemalloc.get_traced_memory()
+        samples.append(current)
+        print(f"{done:>8} cycles  {done / (time.perf_counter() - started):8.0f}/s  "
+              f"fds {open_fds()}  threads {threading.active_count()}  "
+              f"traced {current / 1024:8.1f}KB (peak {peak / 1024:.1f}KB)  "
+              f"voice {voice_processor.active_sessions()}  stt {len(stt_pipeline.streams)}  "
+              f"tts {len(tts_pipeline.utterances)}/{len(tts_pipeline.generations)}")
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        # Warm-up: start the worker pools and fill the clip cache
+        list(executor.map(cycle, range(args.concurrency * 10)))
+        tts_pipeline.queue.join()
+
+        tracemalloc.start()
+        samples = []
+        baseline_fds = open_fds()
+        started = time.perf_counter()
+        done = 0
+        while done < args.cycles:
+            batch = min(args.report, args.cycles - done)
+            list(executor.map(cycle, range(done, done + batch)))
+            done += batch
+            tts_pipeline.queue.join()
+            sample(done, started)
+
+    # Let the last recognitions finish before the final count
+    time.sleep(0.5)
+    fds = open_fds()
+    growth = (tracemalloc.get_traced_memory()[0] - samples[0]) / 1024
+    print(f"file descriptors: {baseline_fds} after warm-up, {fds} after {args.cycles} cycles; "
+          f"voice sessions left: {voice_processor.active_sessions()}; "
+          f"traced memory grew {growth:.1f}KB after the first sample; "
+          f"audio backend initialized {voice_processor.backend.initializations} time(s)")
+
+    # Nothing here plays audio locally, so the backend is never initialized;
+    # more than once would mean sessions tear it down
+    checks = [
+        ("voice sessions left", voice_processor.active_sessions() == 0),
+        ("stt streams left", len(stt_pipeline.streams) == 0),
+        ("tts utterances left", len(tts_pipeline.utterances) == 0),
+        ("file descriptors", fds is None or fds <= baseline_fds + args.fd_slack),
+        ("traced memory growth", growth <= args.max_growth_kb),
+        ("audio backend re-initialized", voice_processor.backend.initializations <= 1),
+    ]
+    failed = [name for name, ok in checks if not ok]
+    print("leaks: " + (f"FAILED: {', '.join(failed)}" if failed else "ok"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import copy
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+
+_NON_WORD = re.compile(r"[^a-z0-9' ]+")
+_NEGATIONS = {"no", "not", "never", "nothing", "nobody", "neither", "nor", "don't", "dont", "doesn't",
+              "doesnt", "didn't", "didnt", "can't", "cant", "won't", "wont", "isn't", "isnt", "hate"}
+
+
+def normalize_answer(text):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def _negations(normalized):
+    return frozenset(word for word in normalized.split() if word in _NEGATIONS)
+
+
+def hash_vector(text, dimensions=1024, n=3):
+    """
+    Embed text as an L2-normalized bag of hashed character n-grams.
+
+    Returns:
+        dict: Sparse vector, bucket index to weight
+    """
+    padded = f" {text} "
+    counts = Counter(
+        zlib.crc32(padded[i:i + n].encode("utf-8")) % dimensions
+        for i in range(max(1, len(padded) - n + 1))
+    )
+    norm = math.sqrt(sum(value * value for value in counts.values())) or 1.0
+    return {bucket: value / norm for bucket, value in counts.items()}
+
+
+def cosine(a, b):
+    """Cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
+
+
+class AnswerCache:
+    def __init__(self, threshold=None, ttl=None, max_words=None, max_entries=None):
+        """
+        In-memory cache of analyses for answers to the fixed opening questions.
+
+        Lookups match the normalized answer exactly first, then by cosine
+        similarity of hashed character n-grams, so small rewordings and typos
+        of a common answer ("I like reading alone", "i like readin alone")
+        share one analysis. Answers only match when they carry the same negations,
+        since "I like reading alone" and "I don't like reading alone" are
+        close in n-gram space but opposite in meaning.
+
+        Args:
+            threshold (float, optional): Minimum similarity for a fuzzy hit.
+                Defaults to MBTI_ANSWER_CACHE_THRESHOLD or 0.85.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to
+                MBTI_ANSWER_CACHE_TTL or 86400.
+            max_words (int, optional): Longer answers are too specific to
+                share and are never cached. Defaults to
+                MBTI_ANSWER_CACHE_MAX_WORDS or 12.
+            max_entries (int, optional): Entries kept per question, least
+                recently used evicted first. Defaults to 500.
+        """
+        self.threshold = threshold or float(os.environ.get("MBTI_ANSWER_CACHE_THRESHOLD", 0.85))
+        self.ttl = ttl or float(os.environ.get("MBTI_ANSWER_CACHE_TTL", 86400))
+        self.max_words = max_words or int(os.environ.get("MBTI_ANSWER_CACHE_MAX_WORDS", 12))
+        self.max_entries = max_entries or 500
+
+        # question -> OrderedDict(normalized answer -> (vector, analysis, created_at, negations))
+        self.entries = {}
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, question, answer):
+        """
+        Return a copy of the cached analysis for a matching answer, or None.
+        """
+        normalized = normalize_answer(answer)
+        if not self._cacheable(normalized):
+            self._count("skipped")
+            return None
+
+        now = time.time()
+        vector = hash_vector(normalized)
+        with self.lock:
+            answers = self.entries.get(question)
+            if not answers:
+                self.counters["misses"] += 1
+                return None
+
+            entry = answers.get(normalized)
+            kind = "exact_hits"
+            if entry is None or now - entry[2] > self.ttl:
+                entry, kind = self._nearest(answers, vector, _negations(normalized), now), "similar_hits"
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+
+            self.counters[kind] += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, question, answer, analysis):
+        """Cache the analysis of a short answer to a fixed question."""
+        normalized = normalize_answer(answer)
+        if analysis is None or not self._cacheable(normalized):
+            return
+        with self.lock:
+            answers = self.entries.setdefault(question, OrderedDict())
+            answers[normalized] = (hash_vector(normalized), copy.deepcopy(analysis), time.time(), _negations(normalized))
+            answers.move_to_end(normalized)
+            while len(answers) > self.max_entries:
+                answers.popitem(last=False)
+
+    def stats(self):
+        """Hit/miss counters and the overall hit rate."""
+        with self.lock:
+            counters = dict(self.counters)
+        hits = counters.get("exact_hits", 0) + counters.get("similar_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        counters["hit_rate"] = round(hits / lookups, 3) if lookups else 0.0
+        return counters
+
+    def _cacheable(self, normalized):
+        return bool(normalized) and len(normalized.split()) <= self.max_words
+
+    def _nearest(self, answers, vector, negations, now):
+        """Most similar live entry at or above the threshold; drops expired entries on the way."""
+        best, best_score = None, self.threshold
+        for normalized, entry in list(answers.items()):
+            if now - entry[2] > self.ttl:
+                del answers[normalized]
+                continue
+            if entry[3] != negations:
+                continue
+            score = cosine(vector, entry[0])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _count(self, event):
+        with self.lock:
+            self.counters[event] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """
+    Return the process-wide answer cache, or None when MBTI_ANSWER_CACHE=off.
+    """
+    global _cache
+    if os.environ.get("MBTI_ANSWER_CACHE", "").lower() == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
@@ -0,0 +1,200 @@
+"""
+Re-run type determination over an archive of completed conversations.
+
+Reads transcripts from JSONL, one per line:
+
+    {"id": "abc", "turns": [{"question": "...", "response": "..."}, ...]}
+
+and replays every answer through the analyzer's own analysis prompt and
+scoring, writing one JSONL line per transcript with the per-turn analyses,
+the final type and the turn at which the stopping rule would have ended the
+test. The output file doubles as the checkpoint: rerunning the same command
+skips transcripts already written there.
+
+    python -m models.batch_rescore archive.jsonl rescored.jsonl --concurrency 16
+    python -m models.batch_rescore archive.jsonl rescored.jsonl --fake
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .json_utils import parse_stats
+
+# USD per 1K tokens, gpt-3.5-turbo list prices
+DEFAULT_PROMPT_PRICE = 0.0015
+DEFAULT_COMPLETION_PRICE = 0.002
+
+
+def read_transcripts(path, skip_ids=()):
+    """Yield transcripts from a JSONL file one at a time, leaving out already finished ids."""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping malformed transcript on line {number}")
+                continue
+            record.setdefault("id", number)
+            if str(record["id"]) not in skip_ids:
+                yield record
+
+
+def finished_ids(path):
+    """
+    Ids already written to an output file by an earlier, interrupted run.
+
+    A last line cut short by the interruption is truncated away so the
+    resumed run appends cleanly; that transcript is simply redone.
+    """
+    if not os.path.exists(path):
+        return set()
+    ids = set()
+    complete = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            complete += len(line)
+            try:
+                ids.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                continue
+    with open(path, "r+b") as f:
+        f.truncate(complete)
+    return ids
+
+
+def rescore_transcript(record, analyzer_factory):
+    """
+    Replay one transcript through a fresh analyzer.
+
+    Returns:
+        dict: id, per-turn analyses, final type, decided_at and token counts
+    """
+    analyzer = analyzer_factory()
+    turns = []
+    decided_at = None
+    prompt_tokens = completion_tokens = failures = 0
+    for number, turn in enumerate(record.get("turns", []), 1):
+        analysis = analyzer.analyze_turn(turn.get("question", ""), turn.get("response", ""))
+        prompt_tokens += analyzer.turn_prompt_tokens
+        completion_tokens += analyzer.turn_completion_tokens
+        failures += analysis is None
+        turns.append({"turn": number, "analysis": analysis})
+        if decided_at is None and analyzer.is_decided():
+            decided_at = number
+
+    return {
+        "id": record["id"],
+        "mbti_type": analyzer.scores.mbti_type(),
+        "decided_at": decided_at,
+        "confidence": analyzer.scores.confidence(),
+        "turns": turns,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "parse_failures": failures,
+    }
+
+
+def rescore(input_path, output_path, concurrency=8, restart=False, analyzer_factory=None,
+            prompt_price=DEFAULT_PROMPT_PRICE, completion_price=DEFAULT_COMPLETION_PRICE):
+    """
+    Rescore every transcript in input_path into output_path.
+
+    Transcripts are replayed concurrently, each on its own analyzer, with
+    at most `concurrency` in flight; turns within a transcript stay
+    sequential because each analysis sees the history before it.
+
+    Returns:
+        dict: Run statistics
+    """
+    if analyzer_factory is None:
+        from .mbti_analyzer import MBTIAnalyzer
+        analyzer_factory = MBTIAnalyzer
+
+    skip = set() if restart else finished_ids(output_path)
+    stats = {"transcripts": 0, "turns": 0, "failed": 0, "parse_failures": 0,
+             "prompt_tokens": 0, "completion_tokens": 0, "skipped": len(skip)}
+    started = time.perf_counter()
+
+    with open(output_path, "w" if restart else "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mbti-rescore") as executor:
+
+        def finish(future, record):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error rescoring transcript {record['id']}: {str(e)}")
+                stats["failed"] += 1
+                return
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            stats["transcripts"] += 1
+            stats["turns"] += len(result["turns"])
+            stats["parse_failures"] += result["parse_failures"]
+            stats["prompt_tokens"] += result["prompt_tokens"]
+            stats["completion_tokens"] += result["completion_tokens"]
+
+        # Keep a bounded window in flight so large archives are streamed, not loaded
+        pending = {}
+        for record in read_transcripts(input_path, skip):
+            if len(pending) >= concurrency * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future, pending.pop(future))
+            pending[executor.submit(rescore_transcript, record, analyzer_factory)] = record
+        for future in list(pending):
+            wait([future])
+            finish(future, pending.pop(future))
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed"] = elapsed
+    stats["cost"] = (stats["prompt_tokens"] * prompt_price + stats["completion_tokens"] * completion_price) / 1000
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run type determination over archived transcripts.")
+    parser.add_argument("input", help="JSONL file of transcripts")
+    parser.add_argument("output", help="JSONL file for results; also the resume checkpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Transcripts replayed at once (default: 8)")
+    parser.add_argument("--restart", action="store_true", help="Ignore earlier progress and overwrite the output")
+    parser.add_argument("--fake", action="store_true", help="Use the deterministic fake LLM backend")
+    parser.add_argument("--fake-latency", default=None, help="Fake backend latency spec, e.g. fixed:0.2")
+    parser.add_argument("--prompt-price", type=float, default=DEFAULT_PROMPT_PRICE,
+                        help="USD per 1K prompt tokens for the cost estimate")
+    parser.add_argument("--completion-price", type=float, default=DEFAULT_COMPLETION_PRICE,
+                        help="USD per 1K completion tokens for the cost estimate")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    if args.fake:
+        os.environ["MBTI_LLM_BACKEND"] = "fake"
+        if args.fake_latency:
+            os.environ["MBTI_FAKE_LLM_LATENCY"] = args.fake_latency
+
+    stats = rescore(args.input, args.output, args.concurrency, args.restart,
+                    prompt_price=args.prompt_price, completion_price=args.completion_price)
+    elapsed = stats["elapsed"]
+    print(
+        f"transcripts: {stats['transcripts']}  turns: {stats['turns']}  skipped (already done): {stats['skipped']}  "
+        f"failed: {stats['failed']}  parse failures: {stats['parse_failures']}"
+    )
+    print(
+        f"throughput: {stats['transcripts'] / elapsed if elapsed else 0:.2f} transcripts/s, "
+        f"{stats['turns'] / elapsed if elapsed else 0:.2f} turns/s over {elapsed:.1f}s"
+    )
+    print(
+        f"tokens: {stats['prompt_tokens']} prompt, {stats['completion_tokens']} completion  "
+        f"estimated cost: ${stats['cost']:.4f}"
+    )
+    print(f"parse counters: {parse_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,13 @@
 import os
 import sys
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from .fanout import submit_background
+from .json_utils import extract_json, validate_schema
+from .llm_provider import api_key_missing, get_chain, get_llm
+from .metrics import increment
 
-class CareerInsightsGenerator:
-    def __init__(self):
-        """Initialize the career insights generator with LLM components."""
-        # Check for OpenAI API key
-        if not os.environ.get("OPENAI_API_KEY"):
-            print("ERROR: OPENAI_API_KEY environment variable is not set.")
-            print("Please set it in the .env file or as an environment variable.")
-            sys.exit(1)
-        
-        # Setup OpenAI model
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-3.5-turbo",
-        )
-        
-        # Career insights template
-        self.insights_template = """
+# Career insights template
+CAREER_TEMPLATE = """
         Generate comprehensive career insights for the {mbti_type} personality type.
 
         Conversation Context: {conversation_context}
@@ -40,79 +27,392 @@ class CareerInsightsGenerator:
         - Provide actionable and empathetic insights
 
         Output Format:
-        A JSON object with detailed career insights
+        Return only a JSON object with exactly these keys:
+        {{
+            "workplace": "2-3 sentences on their ideal work environment",
+            "perfect_career": "2-3 sentences on the career paths that suit them",
+            "strengths": ["5-6 one or two word career strengths"],
+            "weaknesses": ["5-6 one or two word career challenges"],
+            "ideal_careers": ["4-5 job titles"]
+        }}
+        """
+
+# Predefined career insights for MBTI types
+CAREER_INSIGHTS = {
+    "INTJ": {
+        "workplace": "In the world of careers, you thrive on cognitive challenges but resist structured physical activity, suggesting you seek mental rather than physical flow states. Creative problem-solving energizes you, whether it's cracking code or capturing moments through a lens.",
+        "perfect_career": "Those who work like you need constant intellectual stimulation and tend to dive deep into self-directed learning after hours. While you accept practical compromises for stability, you'll only find true fulfillment in roles that let you push boundaries and explore emerging technologies.",
+        "strengths": [
+            "Analytical", "Determined", "Curious", 
+            "Focused", "Strategic", "Innovative"
+        ],
+        "weaknesses": [
+            "Perfectionist", "Restless", "Stubborn", 
+            "Hesitant", "Overly Critical", "Difficulty Collaborating"
+        ],
+        "ideal_careers": [
+            "Software Architect", 
+            "Research Scientist", 
+            "Strategic Consultant", 
+            "Technology Strategist", 
+            "Innovation Manager"
+        ]
+    },
+    "INFJ": {
+        "workplace": "You excel in environments that allow for deep, meaningful work with a clear purpose. Your intuitive nature helps you see complex systems and human dynamics that others might miss.",
+        "perfect_career": "Your ideal career combines intellectual depth with human impact. You thrive in roles that allow you to create positive change, whether through counseling, writing, design, or strategic planning.",
+        "strengths": [
+            "Empathetic", "Insightful", "Visionary", 
+            "Passionate", "Creative", "Purpose-Driven"
+        ],
+        "weaknesses": [
+            "Idealistic", "Sensitive", "Burnout-Prone", 
+            "Conflict-Avoidant", "Perfectionistic", "Overwhelmed"
+        ],
+        "ideal_careers": [
+            "Counselor", 
+            "Non-Profit Leader", 
+            "Social Worker", 
+            "Creative Director", 
+            "Educational Consultant"
+        ]
+    },
+    "ISTJ": {
+        "workplace": "You do your best work in stable, well-organized environments where expectations are clear and effort is rewarded. You take deadlines seriously and quietly become the person everyone relies on to get things right.",
+        "perfect_career": "Your ideal career lets you build expertise in a defined domain and apply it with precision. Roles with clear standards, measurable outcomes and room to master procedures give you lasting satisfaction.",
+        "strengths": [
+            "Reliable", "Thorough", "Organized", 
+            "Responsible", "Practical", "Detail-Oriented"
+        ],
+        "weaknesses": [
+            "Inflexible", "Change-Resistant", "Reserved", 
+            "Overly Cautious", "Self-Critical", "Slow to Delegate"
+        ],
+        "ideal_careers": [
+            "Accountant", 
+            "Auditor", 
+            "Operations Manager", 
+            "Systems Administrator", 
+            "Compliance Officer"
+        ]
+    },
+    "ISFJ": {
+        "workplace": "You flourish in supportive workplaces where your care and consistency make a visible difference to people. You notice the small things that keep a team running and quietly take care of them.",
+        "perfect_career": "Your perfect career combines helping others with clear routines and responsibilities. You find meaning in roles where your dependability directly improves someone's day.",
+        "strengths": [
+            "Dependable", "Caring", "Patient", 
+            "Observant", "Loyal", "Hardworking"
+        ],
+        "weaknesses": [
+            "Overextended", "Self-Effacing", "Change-Averse", 
+            "Conflict-Avoidant", "Perfectionistic", "Reluctant to Say No"
+        ],
+        "ideal_careers": [
+            "Nurse", 
+            "Teacher", 
+            "Office Manager", 
+            "Librarian", 
+            "Social Services Coordinator"
+        ]
+    },
+    "ISTP": {
+        "workplace": "You thrive where you can get hands-on with real problems and work with a high degree of autonomy. Rigid hierarchies and endless meetings drain you, while a broken system to diagnose brings you fully alive.",
+        "perfect_career": "Your ideal career rewards practical troubleshooting and technical skill. You do best in roles with variety, tangible results and freedom to work things out your own way.",
+        "strengths": [
+            "Resourceful", "Calm Under Pressure", "Analytical", 
+            "Hands-On", "Adaptable", "Independent"
+        ],
+        "weaknesses": [
+            "Easily Bored", "Private", "Impatient with Rules", 
+            "Risk-Prone", "Detached", "Inconsistent Follow-Through"
+        ],
+        "ideal_careers": [
+            "Engineer", 
+            "Mechanic", 
+            "Forensic Analyst", 
+            "Pilot", 
+            "Emergency Responder"
+        ]
+    },
+    "ISFP": {
+        "workplace": "You work best in flexible, low-pressure environments that leave room for personal expression. You bring warmth and a keen aesthetic sense to your work, and you care deeply that it reflects your values.",
+        "perfect_career": "Your perfect career lets you create, craft or care for something in a way that feels authentic. Roles that combine artistry with a personal touch suit you far better than rigid corporate ladders.",
+        "strengths": [
+            "Creative", "Compassionate", "Observant", 
+            "Flexible", "Authentic", "Aesthetic"
+        ],
+        "weaknesses": [
+            "Conflict-Avoidant", "Unstructured", "Self-Doubting", 
+            "Sensitive to Criticism", "Reserved", "Averse to Long-Term Planning"
+        ],
+        "ideal_careers": [
+            "Graphic Designer", 
+            "Veterinary Technician", 
+            "Photographer", 
+            "Occupational Therapist", 
+            "Chef"
+        ]
+    },
+    "INFP": {
+        "workplace": "You need work that aligns with your values, and you give your best when you believe in the mission. You bring creativity and empathy to every project, often seeing the human story behind the task.",
+        "perfect_career": "Your ideal career offers meaning, autonomy and room to imagine. Writing, counseling, advocacy and creative roles let you turn your ideals into something real.",
+        "strengths": [
+            "Idealistic", "Empathetic", "Creative", 
+            "Open-Minded", "Dedicated", "Insightful"
+        ],
+        "weaknesses": [
+            "Impractical", "Self-Critical", "Disorganized", 
+            "Conflict-Avoidant", "Easily Discouraged", "Struggles with Routine"
+        ],
+        "ideal_careers": [
+            "Writer", 
+            "Counselor", 
+            "UX Researcher", 
+            "Non-Profit Program Manager", 
+            "Art Therapist"
+        ]
+    },
+    "INTP": {
+        "workplace": "You excel where ideas matter more than politics and you're trusted to think things through. You are energized by elegant solutions and quickly bored by repetitive, procedural work.",
+        "perfect_career": "Your perfect career gives you complex problems and the freedom to explore them deeply. Research, engineering and analytical roles let your curiosity do its best work.",
+        "strengths": [
+            "Logical", "Inventive", "Objective", 
+            "Curious", "Independent", "Conceptual"
+        ],
+        "weaknesses": [
+            "Procrastinating", "Absent-Minded", "Insensitive", 
+            "Impatient with Details", "Overthinking", "Reluctant to Commit"
+        ],
+        "ideal_careers": [
+            "Software Developer", 
+            "Data Scientist", 
+            "Research Scientist", 
+            "Systems Analyst", 
+            "Philosophy Professor"
+        ]
+    },
+    "ESTP": {
+        "workplace": "You thrive in fast-moving environments where quick thinking and decisive action pay off immediately. You read a room instantly and love being where the action is.",
+        "perfect_career": "Your ideal career offers excitement, variety and tangible results. Roles in sales, entrepreneurship and emergency work let you turn your boldness into real impact.",
+        "strengths": [
+            "Energetic", "Persuasive", "Action-Oriented", 
+            "Perceptive", "Bold", "Pragmatic"
+        ],
+        "weaknesses": [
+            "Impatient", "Risk-Taking", "Easily Bored", 
+            "Insensitive", "Short-Term Focused", "Rule-Bending"
+        ],
+        "ideal_careers": [
+            "Sales Executive", 
+            "Entrepreneur", 
+            "Paramedic", 
+            "Real Estate Agent", 
+            "Sports Coach"
+        ]
+    },
+    "ESFP": {
+        "workplace": "You bring energy and fun to any workplace and shine when you're working directly with people. Dry, isolated work saps you, while a lively team and a live audience bring out your best.",
+        "perfect_career": "Your perfect career lets you engage, entertain and help people in the moment. Hospitality, performance, events and care roles make the most of your natural warmth.",
+        "strengths": [
+            "Enthusiastic", "Sociable", "Practical", 
+            "Spontaneous", "Encouraging", "Observant"
+        ],
+        "weaknesses": [
+            "Easily Distracted", "Dislikes Routine", "Impulsive", 
+            "Conflict-Averse", "Poor Long-Term Planning", "Sensitive"
+        ],
+        "ideal_careers": [
+            "Event Planner", 
+            "Performer", 
+            "Flight Attendant", 
+            "Tour Guide", 
+            "Pediatric Nurse"
+        ]
+    },
+    "ENFP": {
+        "workplace": "You flourish in creative, collaborative environments where new ideas are welcome and people matter. You light up brainstorming sessions and inspire others with your vision of what could be.",
+        "perfect_career": "Your ideal career gives you variety, human connection and room to explore possibilities. Roles in communication, coaching and creative fields channel your enthusiasm into impact.",
+        "strengths": [
+            "Enthusiastic", "Imaginative", "Charismatic", 
+            "Empathetic", "Curious", "Inspiring"
+        ],
+        "weaknesses": [
+            "Disorganized", "Easily Distracted", "Overcommitted", 
+            "Restless", "Dislikes Routine", "Overly Optimistic"
+        ],
+        "ideal_careers": [
+            "Marketing Strategist", 
+            "Journalist", 
+            "Career Coach", 
+            "Product Designer", 
+            "Community Organizer"
+        ]
+    },
+    "ENTP": {
+        "workplace": "You thrive in dynamic environments that reward debate, innovation and quick thinking. You love challenging assumptions and are at your best when tackling problems nobody has solved before.",
+        "perfect_career": "Your perfect career lets you generate ideas, pitch them and keep moving to the next challenge. Startups, consulting and strategy roles suit your restless, inventive mind.",
+        "strengths": [
+            "Innovative", "Quick-Witted", "Resourceful", 
+            "Confident", "Persuasive", "Adaptable"
+        ],
+        "weaknesses": [
+            "Argumentative", "Unfocused", "Dislikes Routine", 
+            "Impatient", "Poor Follow-Through", "Insensitive"
+        ],
+        "ideal_careers": [
+            "Entrepreneur", 
+            "Management Consultant", 
+            "Product Manager", 
+            "Lawyer", 
+            "Creative Director"
+        ]
+    },
+    "ESTJ": {
+        "workplace": "You excel in structured organizations where clear goals and accountability drive results. You naturally take charge, set standards and make sure things get done on time.",
+        "perfect_career": "Your ideal career puts you in a position to organize people and processes toward concrete outcomes. Management, administration and operations roles reward your decisiveness.",
+        "strengths": [
+            "Decisive", "Organized", "Dependable", 
+            "Direct", "Efficient", "Hardworking"
+        ],
+        "weaknesses": [
+            "Inflexible", "Impatient", "Controlling", 
+            "Blunt", "Change-Resistant", "Judgmental"
+        ],
+        "ideal_careers": [
+            "Project Manager", 
+            "Operations Director", 
+            "Financial Officer", 
+            "Police Officer", 
+            "School Administrator"
+        ]
+    },
+    "ESFJ": {
+        "workplace": "You thrive in harmonious, people-centered workplaces where cooperation is valued. You are the one who remembers birthdays, keeps the team connected and makes sure nobody is left behind.",
+        "perfect_career": "Your perfect career blends service, structure and human connection. Healthcare, education, HR and community roles let your warmth and reliability shine.",
+        "strengths": [
+            "Warm", "Cooperative", "Organized", 
+            "Loyal", "Supportive", "Conscientious"
+        ],
+        "weaknesses": [
+            "Approval-Seeking", "Sensitive to Criticism", "Inflexible", 
+            "Conflict-Avoidant", "Self-Neglecting", "Overly Involved"
+        ],
+        "ideal_careers": [
+            "Human Resources Manager", 
+            "Nurse", 
+            "Teacher", 
+            "Customer Success Manager", 
+            "Event Coordinator"
+        ]
+    },
+    "ENFJ": {
+        "workplace": "You excel in environments where you can lead, mentor and bring out the best in others. You quickly sense team dynamics and naturally rally people around a shared purpose.",
+        "perfect_career": "Your ideal career combines leadership with real human impact. Teaching, coaching, organizational development and advocacy roles let you grow people and causes alike.",
+        "strengths": [
+            "Charismatic", "Empathetic", "Inspiring", 
+            "Organized", "Diplomatic", "Persuasive"
+        ],
+        "weaknesses": [
+            "Overcommitted", "Approval-Seeking", "Self-Sacrificing", 
+            "Idealistic", "Overly Involved", "Sensitive to Criticism"
+        ],
+        "ideal_careers": [
+            "Teacher", 
+            "Training and Development Manager", 
+            "Public Relations Specialist", 
+            "Non-Profit Director", 
+            "Life Coach"
+        ]
+    },
+    "ENTJ": {
+        "workplace": "You thrive in ambitious, results-driven environments where you can set direction and drive execution. You spot inefficiencies instantly and can't resist fixing them.",
+        "perfect_career": "Your perfect career gives you authority, strategic scope and big goals to chase. Executive, entrepreneurial and consulting roles match your drive to lead and build.",
+        "strengths": [
+            "Strategic", "Decisive", "Confident", 
+            "Efficient", "Ambitious", "Visionary"
+        ],
+        "weaknesses": [
+            "Impatient", "Domineering", "Blunt", 
+            "Workaholic", "Dismissive of Feelings", "Intolerant of Inefficiency"
+        ],
+        "ideal_careers": [
+            "Chief Executive", 
+            "Management Consultant", 
+            "Entrepreneur", 
+            "Investment Banker", 
+            "Operations Strategist"
+        ]
+    },
+    "DEFAULT": {
+        "workplace": "You approach professional environments with a unique blend of your personality traits, seeking roles that align with your core values and personal growth.",
+        "perfect_career": "Your career path is characterized by continuous learning, adaptability, and a drive to make meaningful contributions in your chosen field.",
+        "strengths": [
+            "Adaptable", "Passionate", "Committed", 
+            "Innovative", "Thoughtful"
+        ],
+        "weaknesses": [
+            "Complex", "Challenging", "Evolving", 
+            "Introspective", "Nuanced"
+        ],
+        "ideal_careers": [
+            "Versatile Professional", 
+            "Adaptive Specialist", 
+            "Innovative Contributor"
+        ]
+    }
+}
+
+# Shape the LLM must return for its insights to replace the static ones
+CAREER_SCHEMA = {
+    "workplace": str,
+    "perfect_career": str,
+    "strengths": list,
+    "weaknesses": list,
+    "ideal_careers": list
+}
+
+# Create prompt template
+CAREER_PROMPT = PromptTemplate(
+    input_variables=["mbti_type", "conversation_context"],
+    template=CAREER_TEMPLATE
+)
+
+
+class CareerInsightsGenerator:
+    def __init__(self, mode=None):
         """
+        Initialize the career insights generator with the shared LLM components.
         
-        # Predefined career insights for MBTI types
-        self.career_insights = {
-            "INTJ": {
-                "workplace": "In the world of careers, you thrive on cognitive challenges but resist structured physical activity, suggesting you seek mental rather than physical flow states. Creative problem-solving energizes you, whether it's cracking code or capturing moments through a lens.",
-                "perfect_career": "Those who work like you need constant intellectual stimulation and tend to dive deep into self-directed learning after hours. While you accept practical compromises for stability, you'll only find true fulfillment in roles that let you push boundaries and explore emerging technologies.",
-                "strengths": [
-                    "Analytical", "Determined", "Curious", 
-                    "Focused", "Strategic", "Innovative"
-                ],
-                "weaknesses": [
-                    "Perfectionist", "Restless", "Stubborn", 
-                    "Hesitant", "Overly Critical", "Difficulty Collaborating"
-                ],
-                "ideal_careers": [
-                    "Software Architect", 
-                    "Research Scientist", 
-                    "Strategic Consultant", 
-                    "Technology Strategist", 
-                    "Innovation Manager"
-                ]
-            },
-            "INFJ": {
-                "workplace": "You excel in environments that allow for deep, meaningful work with a clear purpose. Your intuitive nature helps you see complex systems and human dynamics that others might miss.",
-                "perfect_career": "Your ideal career combines intellectual depth with human impact. You thrive in roles that allow you to create positive change, whether through counseling, writing, design, or strategic planning.",
-                "strengths": [
-                    "Empathetic", "Insightful", "Visionary", 
-                    "Passionate", "Creative", "Purpose-Driven"
-                ],
-                "weaknesses": [
-                    "Idealistic", "Sensitive", "Burnout-Prone", 
-                    "Conflict-Avoidant", "Perfectionistic", "Overwhelmed"
-                ],
-                "ideal_careers": [
-                    "Counselor", 
-                    "Non-Profit Leader", 
-                    "Social Worker", 
-                    "Creative Director", 
-                    "Educational Consultant"
-                ]
-            },
-            # Add more MBTI types as needed
-            "DEFAULT": {
-                "workplace": "You approach professional environments with a unique blend of your personality traits, seeking roles that align with your core values and personal growth.",
-                "perfect_career": "Your career path is characterized by continuous learning, adaptability, and a drive to make meaningful contributions in your chosen field.",
-                "strengths": [
-                    "Adaptable", "Passionate", "Committed", 
-                    "Innovative", "Thoughtful"
-                ],
-                "weaknesses": [
-                    "Complex", "Challenging", "Evolving", 
-                    "Introspective", "Nuanced"
-                ],
-                "ideal_careers": [
-                    "Versatile Professional", 
-                    "Adaptive Specialist", 
-                    "Innovative Contributor"
-                ]
-            }
-        }
-        
-        # Create prompt template
-        self.prompt = PromptTemplate(
-            input_variables=["mbti_type", "conversation_context"],
-            template=self.insights_template
-        )
-        
-        # Create LLM chain
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        Args:
+            mode (str, optional): 'static' serves the predefined insights with no
+                network call, 'llm' asks the model for personalized insights and
+                falls back to the static ones if its JSON doesn't validate, and
+                'hybrid' returns the static insights immediately and pushes the
+                personalized version later. Defaults to the MBTI_INSIGHTS_MODE
+                environment variable or 'static'.
+        """
+        self.mode = (mode or os.environ.get("MBTI_INSIGHTS_MODE", "static")).lower()
+        if self.mode not in ("static", "llm", "hybrid"):
+            raise ValueError(f"Invalid insights mode: {self.mode}")
+        
+        # Check for OpenAI API key
+        if api_key_missing():
+            print("ERROR: OPENAI_API_KEY environment variable is not set.")
+            print("Please set it in the .env file or as an environment variable.")
+            sys.exit(1)
+        
+        # Setup the shared OpenAI model
+        self.llm = get_llm(temperature=0.7, streaming=False)
+        
+        self.insights_template = CAREER_TEMPLATE
+        self.career_insights = CAREER_INSIGHTS
+        self.insights_schema = CAREER_SCHEMA
+        self.prompt = CAREER_PROMPT
+        
+        # Shared LLM chain
+        self.chain = get_chain(self.prompt, temperature=0.7, streaming=False)
     
-    def generate_career_insights(self, mbti_type, conversation, max_context_length=500):
+    def generate_career_insights(self, mbti_type, conversation, max_context_length=500, on_update=None):
         """
         Generate career insights for a specific MBTI type.
         
@@ -120,10 +420,18 @@ class CareerInsightsGenerator:
             mbti_type (str): The MBTI personality type
             conversation (ConversationChain): The conversation chain to extract context
             max_context_length (int, optional): Maximum length of context to include. Defaults to 500.
+            on_update (callable, optional): In hybrid mode, called with the
+                personalized insights once they are ready
         
         Returns:
             dict: Detailed career insights
         """
+        # Use predefined insights or default
+        insights = self.career_insights.get(mbti_type, self.career_insights["DEFAULT"])
+        
+        if self.mode == "static":
+            return insights
+        
         # Extract conversation context
         try:
             conversation_context = conversation.memory.chat_memory.messages[-5:]
@@ -132,20 +440,38 @@ class CareerInsightsGenerator:
         except Exception:
             context_str = "No specific context available"
         
-        # Use predefined insights or default
-        insights = self.career_insights.get(mbti_type, self.career_insights["DEFAULT"])
+        if self.mode == "llm":
+            return self._personalize(mbti_type, context_str, insights)
+        
+        # Hybrid: answer with the static insights now, personalize in the background
+        if on_update is not None:
+            def push_update():
+                personalized = self._personalize(mbti_type, context_str, insights)
+                if personalized is not insights:
+                    on_update(personalized)
+            submit_background(push_update)
         
-        # Try to generate more personalized insights using LLM
+        return insights
+    
+    def _personalize(self, mbti_type, context_str, fallback):
+        """Ask the LLM for personalized insights, returning the fallback if they don't validate."""
         try:
             llm_result = self.chain.run(
                 mbti_type=mbti_type, 
                 conversation_context=context_str
             )
-            # Additional processing of LLM result could be added here
         except Exception as e:
             print(f"LLM insights generation failed: {e}")
+            increment("mbti_fallbacks_total", section="career", reason="error")
+            return fallback
         
-        return insights
+        personalized = extract_json(llm_result)
+        if not validate_schema(personalized, self.insights_schema):
+            print("LLM career insights did not match the expected schema, using static insights")
+            increment("mbti_fallbacks_total", section="career", reason="invalid")
+            return fallback
+        
+        return {key: personalized[key] for key in self.insights_schema}
     
     def format_career_insights(self, insights):
         """
@@ -1,16 +1,9 @@
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from .generation_cache import GenerationCache, cached_generation
+from .llm_provider import get_chain, get_llm
+from .recommendation import MBTI_TRAITS
 
-class CelebrityDoppelgangerGenerator:
-    def __init__(self):
-        """Initialize the celebrity doppelganger generator with LLM components."""
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-3.5-turbo",
-        )
-        
-        self.doppelganger_template = """
+DOPPELGANGER_TEMPLATE = """
         For the MBTI personality type {mbti_type}, identify 3 celebrity doppelgangers that embody the {traits} characteristics:
 
         - Select celebrities who authentically represent the core traits of {mbti_type}
@@ -20,42 +13,49 @@ class CelebrityDoppelgangerGenerator:
         Ensure the descriptions are nuanced, perceptive, and reveal the unique personality dimensions of each celebrity.
         Use a thoughtful and descriptive tone that goes beyond surface-level observations.
         """
+
+DOPPELGANGER_PROMPT = PromptTemplate(
+    input_variables=["mbti_type", "traits"],
+    template=DOPPELGANGER_TEMPLATE
+)
+
+
+class CelebrityDoppelgangerGenerator:
+    def __init__(self):
+        """Initialize the celebrity doppelganger generator with the shared LLM components."""
+        self.llm = get_llm(temperature=0.7)
         
-        self.prompt = PromptTemplate(
-            input_variables=["mbti_type", "traits"],
-            template=self.doppelganger_template
-        )
-        
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        self.doppelganger_template = DOPPELGANGER_TEMPLATE
+        self.prompt = DOPPELGANGER_PROMPT
+        self.chain = get_chain(self.prompt, temperature=0.7)
         
         # MBTI type traits mapping (same as in recommendation generator)
-        self.mbti_traits = {
-            "ISTJ": "practical, detail-oriented, and traditional",
-            "ISFJ": "nurturing, detail-focused, and service-oriented",
-            "INFJ": "insightful, creative, and idealistic",
-            "INTJ": "analytical, strategic, and independent",
-            "ISTP": "logical, practical, and adaptable",
-            "ISFP": "artistic, sensitive, and spontaneous",
-            "INFP": "idealistic, empathetic, and creative",
-            "INTP": "logical, innovative, and analytical",
-            "ESTP": "energetic, practical, and spontaneous",
-            "ESFP": "enthusiastic, spontaneous, and fun-loving",
-            "ENFP": "enthusiastic, creative, and people-oriented",
-            "ENTP": "innovative, entrepreneurial, and adaptable",
-            "ESTJ": "organized, practical, and traditional",
-            "ESFJ": "warm, practical, and people-oriented",
-            "ENFJ": "charismatic, idealistic, and people-focused",
-            "ENTJ": "strategic, logical, and efficient"
-        }
+        self.mbti_traits = MBTI_TRAITS
     
-    def find_doppelgangers(self, mbti_type):
+    def find_doppelgangers(self, mbti_type, callbacks=None):
         """Generate celebrity doppelgangers based on MBTI type."""
         if mbti_type not in self.mbti_traits:
             raise ValueError(f"Invalid MBTI type: {mbti_type}")
-            
+        
+        # Only the type varies, so serve a cached variant when one exists
+        return cached_generation(
+            self.cache_key(mbti_type),
+            "doppelgangers",
+            mbti_type,
+            lambda: self.generate_variant(mbti_type, callbacks)
+        )
+    
+    def generate_variant(self, mbti_type, callbacks=None):
+        """Make a fresh LLM call, bypassing the generation cache."""
         traits = self.mbti_traits[mbti_type]
         
         # Generate doppelganger recommendations using LLM
-        result = self.chain.run(mbti_type=mbti_type, traits=traits)
+        result = self.chain.run(mbti_type=mbti_type, traits=traits, callbacks=callbacks)
         
         return result
+    
+    def cache_key(self, mbti_type):
+        """Return the generation cache key for a type."""
+        return GenerationCache.make_key(
+            "doppelgangers", self.doppelganger_template, self.llm.model_name, self.llm.temperature, mbti_type
+        )
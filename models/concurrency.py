@@ -0,0 +1,22 @@
+import sys
+
+
+def green_threads():
+    """Whether the process runs on eventlet's monkey-patched green threads."""
+    eventlet = sys.modules.get("eventlet")
+    return eventlet is not None and eventlet.patcher.is_monkey_patched("thread")
+
+
+def run_blocking(function, *args):
+    """
+    Run CPU-bound work without stalling other clients.
+
+    Green threads only switch on I/O, so a long computation on one (offline
+    speech recognition, say) would freeze every other session; under
+    eventlet it goes to a real OS thread instead. Only for code that does
+    no socket I/O, which must stay on green threads.
+    """
+    if green_threads():
+        from eventlet import tpool
+        return tpool.execute(function, *args)
+    return function(*args)
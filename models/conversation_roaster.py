@@ -1,26 +1,11 @@
 import os
 import sys
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from .llm_provider import api_key_missing, get_chain, get_llm
+from .metrics import increment
 
-class PersonalityRoastGenerator:
-    def __init__(self):
-        """Initialize the personality roast generator with LLM components."""
-        # Check for OpenAI API key
-        if not os.environ.get("OPENAI_API_KEY"):
-            print("ERROR: OPENAI_API_KEY environment variable is not set.")
-            print("Please set it in the .env file or as an environment variable.")
-            sys.exit(1)
-        
-        # Setup OpenAI model
-        self.llm = ChatOpenAI(
-            temperature=0.8,  # Higher temperature for more creative roasting
-            model_name="gpt-3.5-turbo",
-        )
-        
-        # Roast template with nuanced humor for each MBTI type
-        self.roast_template = """
+# Roast template with nuanced humor for each MBTI type
+ROAST_TEMPLATE = """
         Create a witty, good-humored roast that playfully highlights the stereotypical quirks of the {mbti_type} personality type.
 
         Consider these conversation details for personalization:
@@ -36,37 +21,54 @@ class PersonalityRoastGenerator:
         Roast Format:
         A punchy, 3-4 sentence roast that captures the essence of {mbti_type} with humor and warmth.
         """
+
+# MBTI type roast characteristics
+MBTI_ROAST_TRAITS = {
+    "ISTJ": "the overly serious, rule-following perfectionist",
+    "ISFJ": "the people-pleasing, detail-obsessed caretaker",
+    "INFJ": "the mysterious, overthinking idealist",
+    "INTJ": "the know-it-all strategic mastermind",
+    "ISTP": "the cool, detached problem-solving lone wolf",
+    "ISFP": "the sensitive artist who's low-key dramatic",
+    "INFP": "the dreamy, perpetually misunderstood poet",
+    "INTP": "the absent-minded genius living in their head",
+    "ESTP": "the adrenaline junkie who thinks rules are suggestions",
+    "ESFP": "the party animal who's always the center of attention",
+    "ENFP": "the enthusiastic idea machine with 1000 unfinished projects",
+    "ENTP": "the argumentative devil's advocate who loves intellectual chaos",
+    "ESTJ": "the bossy spreadsheet lover who runs everything",
+    "ESFJ": "the social butterfly obsessed with everyone's approval",
+    "ENFJ": "the charismatic life coach who wants to save the world",
+    "ENTJ": "the ambitious bulldozer who sees life as a strategy game"
+}
+
+# Create prompt template
+ROAST_PROMPT = PromptTemplate(
+    input_variables=["mbti_type", "conversation_context"],
+    template=ROAST_TEMPLATE
+)
+
+
+class PersonalityRoastGenerator:
+    def __init__(self):
+        """Initialize the personality roast generator with the shared LLM components."""
+        # Check for OpenAI API key
+        if api_key_missing():
+            print("ERROR: OPENAI_API_KEY environment variable is not set.")
+            print("Please set it in the .env file or as an environment variable.")
+            sys.exit(1)
         
-        # MBTI type roast characteristics
-        self.mbti_roast_traits = {
-            "ISTJ": "the overly serious, rule-following perfectionist",
-            "ISFJ": "the people-pleasing, detail-obsessed caretaker",
-            "INFJ": "the mysterious, overthinking idealist",
-            "INTJ": "the know-it-all strategic mastermind",
-            "ISTP": "the cool, detached problem-solving lone wolf",
-            "ISFP": "the sensitive artist who's low-key dramatic",
-            "INFP": "the dreamy, perpetually misunderstood poet",
-            "INTP": "the absent-minded genius living in their head",
-            "ESTP": "the adrenaline junkie who thinks rules are suggestions",
-            "ESFP": "the party animal who's always the center of attention",
-            "ENFP": "the enthusiastic idea machine with 1000 unfinished projects",
-            "ENTP": "the argumentative devil's advocate who loves intellectual chaos",
-            "ESTJ": "the bossy spreadsheet lover who runs everything",
-            "ESFJ": "the social butterfly obsessed with everyone's approval",
-            "ENFJ": "the charismatic life coach who wants to save the world",
-            "ENTJ": "the ambitious bulldozer who sees life as a strategy game"
-        }
+        # Setup the shared OpenAI model
+        self.llm = get_llm(temperature=0.8)  # Higher temperature for more creative roasting
         
-        # Create prompt template
-        self.prompt = PromptTemplate(
-            input_variables=["mbti_type", "conversation_context"],
-            template=self.roast_template
-        )
+        self.roast_template = ROAST_TEMPLATE
+        self.mbti_roast_traits = MBTI_ROAST_TRAITS
+        self.prompt = ROAST_PROMPT
         
-        # Create LLM chain
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        # Shared LLM chain
+        self.chain = get_chain(self.prompt, temperature=0.8)
     
-    def generate_roast(self, mbti_type, conversation, max_context_length=500):
+    def generate_roast(self, mbti_type, conversation, max_context_length=500, callbacks=None):
         """
         Generate a personalized roast based on MBTI type and conversation context.
         
@@ -74,6 +76,7 @@ class PersonalityRoastGenerator:
             mbti_type (str): The MBTI personality type
             conversation (ConversationChain): The conversation chain to extract context
             max_context_length (int, optional): Maximum length of context to include. Defaults to 500.
+            callbacks (list, optional): Langchain callbacks, e.g. for token streaming
         
         Returns:
             str: A humorous roast tailored to the MBTI type
@@ -93,9 +96,11 @@ class PersonalityRoastGenerator:
         try:
             roast = self.chain.run(
                 mbti_type=mbti_type, 
-                conversation_context=context_str
+                conversation_context=context_str,
+                callbacks=callbacks
             )
             return roast
         except Exception as e:
             print(f"Error generating roast: {e}")
+            increment("mbti_fallbacks_total", section="roast", reason="error")
             return f"Looks like a {mbti_type} can't even handle a good roast! 😉"
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, ChatGeneration, ChatResult
+
+DIMENSIONS = (("E-I", "E", "I"), ("S-N", "S", "N"), ("T-F", "T", "F"), ("J-P", "J", "P"))
+
+# How often an analysis agrees with the persona on an axis; the rest is noise.
+# Tuned so simulated tests stop after about 8 answers (4-16) at the default
+# MBTI_STOP_CONFIDENCE, like a respondent with a clear but not extreme type
+PERSONA_AGREEMENT = 0.93
+
+
+def persona_type(seed, override=None):
+    """The type a fake respondent leans toward: override if it's a valid type, else one picked by seed."""
+    if override:
+        override = override.upper()
+        letters = zip(override, DIMENSIONS)
+        if len(override) == 4 and all(letter in (first, second) for letter, (_, first, second) in letters):
+            return override
+        raise ValueError(f"Invalid fake LLM persona type: {override}")
+    rng = random.Random(seed)
+    return "".join(rng.choice((first, second)) for _, first, second in DIMENSIONS)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampler.
+
+    Supported specs (seconds): ``fixed:0.5``, ``uniform:0.2,1.5``,
+    ``normal:0.8,0.2`` and ``lognormal:-0.3,0.4`` (mu and sigma of the
+    underlying normal).
+
+    Returns:
+        callable: Takes a random.Random and returns a delay in seconds
+    """
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(value) for value in args.split(",") if value.strip()]
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Invalid fake LLM latency spec: {spec}")
+
+
+def _lean(rng, persona_letter, first, second):
+    """A preference that mostly agrees with the persona."""
+    if rng.random() < PERSONA_AGREEMENT:
+        return persona_letter
+    return second if persona_letter == first else first
+
+
+def canned_reply(prompt, rng, persona="INTJ"):
+    """
+    Build a schema-valid reply for whichever of the app's prompts this is.
+
+    Analyses lean toward the persona type on every axis, so a simulated
+    test's evidence converges and the stopping rule ends it the way it
+    would for a real respondent.
+    """
+    if '"dimension_analysis"' in prompt:
+        leans = {
+            dimension: _lean(rng, letter, first, second)
+            for (dimension, first, second), letter in zip(DIMENSIONS, persona)
+        }
+        reply = {
+            "dimension_analysis": {
+                dimension: {
+                    "confidence": round(rng.uniform(0.6, 0.95), 2),
+                    "preference": leans[dimension],
+                    "indicators": [f"{leans[dimension]}-leaning wording"]
+                }
+                for dimension, first, second in DIMENSIONS
+            },
+            "themes": rng.sample(["planning", "friends", "reading", "new ideas", "routine", "travel"], 2),
+            "context_relevance": round(rng.uniform(0.5, 1.0), 2)
+        }
+        if '"next_question"' in prompt:
+            reply["next_question"] = "What's a recent moment that made you feel most like yourself?"
+        return json.dumps(reply)
+
+    if '"workplace"' in prompt:
+        return json.dumps({
+            "workplace": "You do your best work where you can focus deeply and see the impact of what you build.",
+            "perfect_career": "Roles that mix independent problem solving with a clear purpose suit you best.",
+            "strengths": ["Focused", "Curious", "Reliable", "Thoughtful", "Adaptable"],
+            "weaknesses": ["Impatient", "Self-Critical", "Reserved", "Stubborn", "Restless"],
+            "ideal_careers": ["Engineer", "Researcher", "Designer", "Analyst"]
+        })
+
+    if '"summary"' in prompt:
+        return json.dumps({
+            "summary": "You value honest, steady connection and show care through attention to the people you love.",
+            "strengths": ["Loyal", "Attentive", "Honest", "Supportive", "Patient"],
+            "weaknesses": ["Reserved", "Guarded", "Stubborn", "Self-Critical", "Private"]
+        })
+
+    if "Music:" in prompt:
+        return (
+            "Music:\n1. Bon Iver - Holocene: Quiet, reflective and layered.\n"
+            "2. Radiohead - Reckoner: Intricate and emotionally precise.\n"
+            "3. Nils Frahm - Says: A slow build that rewards patience.\n\n"
+            "Books:\n1. Quiet by Susan Cain: A celebration of inner worlds.\n"
+            "2. Dune by Frank Herbert: Strategy, ecology and destiny.\n"
+            "3. Sapiens by Yuval Noah Harari: Big-picture thinking about us.\n\n"
+            "Movies:\n1. Arrival: Language, time and quiet courage.\n"
+            "2. The Social Network: Ambition with sharp edges.\n"
+            "3. Inception: Layered ideas for a layered mind."
+        )
+
+    if "celebrity doppelgangers" in prompt:
+        return (
+            "1. Keanu Reeves: Private, thoughtful and quietly principled.\n"
+            "2. Emma Watson: Purpose-driven and intellectually curious.\n"
+            "3. Barack Obama: Calm, deliberate and strategic."
+        )
+
+    if "roast" in prompt.lower():
+        return (
+            "You've color-coded your calendar so thoroughly that spontaneity needs a meeting invite. "
+            "Your idea of a wild night is finishing a book before midnight. Never change."
+        )
+
+    if "insights" in prompt:
+        return (
+            "- You think before you speak and prefer depth over small talk.\n"
+            "- You weigh options carefully, then commit with confidence.\n"
+            "- You recharge with quiet time after busy social stretches.\n"
+            "- You care about doing things well and for the right reasons."
+        )
+
+    return "That's interesting! What do you usually do when a plan suddenly changes at the last minute?"
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic local stand-in for ChatOpenAI, for load tests and offline runs."""
+
+    model_name: str = "fake"
+    temperature: float = 0.7
+    streaming: bool = False
+    latency: str = "fixed:0"
+    seed: int = 0
+    persona: str = "INTJ"
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _reply(self, messages):
+        """Return (reply text, delay) determined entirely by the prompt and seed."""
+        prompt = "\n".join(message.content for message in messages)
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        rng = random.Random(int(digest[:16], 16))
+        delay = parse_latency(self.latency)(rng)
+        return canned_reply(prompt, rng, self.persona), delay
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        from .llm_provider import model_slot, request_key, scheduled, single_flight
+
+        def call():
+            text, delay = self._reply(messages)
+            with model_slot(self.model_name):
+                time.sleep(delay)
+            if self.streaming and run_manager is not None:
+                for token in text.split(" "):
+                    run_manager.on_llm_new_token(token + " ")
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+        return single_flight(request_key(self, messages, stop), lambda: scheduled(messages, call))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, delay = self._reply(messages)
+        await asyncio.sleep(delay)
+        if self.streaming and run_manager is not None:
+            for token in text.split(" "):
+                await run_manager.on_llm_new_token(token + " ")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def build_fake_llm(temperature=0.7, streaming=True):
+    """Build a fake chat model configured from MBTI_FAKE_LLM_LATENCY, MBTI_FAKE_LLM_SEED and MBTI_FAKE_LLM_TYPE."""
+    latency = os.environ.get("MBTI_FAKE_LLM_LATENCY", "fixed:0")
+    parse_latency(latency)
+    seed = int(os.environ.get("MBTI_FAKE_LLM_SEED", 0))
+    return FakeChatModel(
+        temperature=temperature,
+        streaming=streaming,
+        latency=latency,
+        seed=seed,
+        persona=persona_type(seed, os.environ.get("MBTI_FAKE_LLM_TYPE")),
+    )
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .metrics import increment, observe
+from .rate_limiter import ENRICHMENT, request_priority
+
+# Shared across every session so concurrent result pages can't exceed the pool.
+# Under eventlet monkey-patching the worker threads become green threads.
+# Created on first use, so MBTI_RESULT_WORKERS can come from .env.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("MBTI_RESULT_WORKERS", 32)),
+                thread_name_prefix="mbti-section",
+            )
+        return _executor
+
+
+class SectionFanout:
+    def __init__(self, timeout=None, page_timeout=None):
+        """
+        Run independent result-page generators concurrently.
+
+        Args:
+            timeout (float, optional): Per-section timeout in seconds. Defaults
+                to the MBTI_SECTION_TIMEOUT environment variable or 30.
+            page_timeout (float, optional): Cap on the whole page, queue wait
+                included. Defaults to MBTI_PAGE_TIMEOUT or 60.
+        """
+        self.timeout = timeout or float(os.environ.get("MBTI_SECTION_TIMEOUT", 30))
+        self.page_timeout = page_timeout or float(os.environ.get("MBTI_PAGE_TIMEOUT", 60))
+        self.sections = []
+
+    def add(self, name, func, fallback=None, timeout=None):
+        """
+        Register a section.
+
+        Args:
+            name (str): Section name used as the key in the results
+            func (callable): Zero-argument callable producing the section
+            fallback: Value used when the section fails or times out
+            timeout (float, optional): Override for this section's timeout
+        """
+        self.sections.append((name, func, fallback, timeout or self.timeout))
+        return self
+
+    def run(self, on_section=None):
+        """
+        Start every section at once and collect them in registration order.
+
+        Each section's timeout counts from when a pool worker picks it up, so
+        sections queued behind other result pages aren't given up on before
+        they have run; the page timeout, counted from the call, caps every
+        section, queued or running.
+
+        Args:
+            on_section (callable, optional): Called as on_section(name, result)
+                as soon as each section finishes, in completion order
+
+        Returns:
+            OrderedDict: Section name to result (or fallback), in the order added
+        """
+        started = time.time()
+        page_deadline = started + self.page_timeout
+        executor = _get_executor()
+        pending = {}
+        for name, func, fallback, timeout in self.sections:
+            section = _Section(func)
+            future = executor.submit(section.run)
+            pending[future] = (name, fallback, timeout, section)
+
+        finished = {}
+        while pending:
+            next_deadline = min(
+                section.deadline(timeout, page_deadline) for _, _, timeout, section in pending.values()
+            )
+            done, _ = wait(
+                pending,
+                timeout=max(0, next_deadline - time.time()),
+                return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                name, fallback, _, section = pending.pop(future)
+                section_started = section.started or started
+                observe("mbti_section_queue_seconds", section_started - started, section=name)
+                observe("mbti_section_seconds", time.time() - section_started, section=name)
+                try:
+                    finished[name] = future.result()
+                except Exception as e:
+                    print(f"Result section '{name}' failed: {e}")
+                    increment("mbti_fallbacks_total", section=name, reason="error")
+                    finished[name] = fallback
+                self._notify(on_section, name, finished[name])
+
+            # Give up on anything past its deadline; a queued section is
+            # cancelled, a running one frees its worker when its LLM request
+            # times out (MBTI_LLM_REQUEST_TIMEOUT)
+            now = time.time()
+            for future in [f for f, (_, _, timeout, section) in pending.items()
+                           if section.deadline(timeout, page_deadline) <= now]:
+                name, fallback, timeout, _ = pending.pop(future)
+                future.cancel()
+                print(f"Result section '{name}' timed out after {now - started:.1f}s")
+                increment("mbti_fallbacks_total", section=name, reason="timeout")
+                finished[name] = fallback
+                self._notify(on_section, name, fallback)
+
+        return OrderedDict((name, finished[name]) for name, _, _, _ in self.sections)
+
+    def _notify(self, on_section, name, result):
+        """Report a finished section without letting callback errors break the page."""
+        if on_section is None:
+            return
+        try:
+            on_section(name, result)
+        except Exception as e:
+            print(f"Error delivering result section '{name}': {e}")
+
+
+class _Section:
+    def __init__(self, func):
+        """One section's work on the pool, noting when a worker starts it."""
+        self.func = func
+        self.started = None
+
+    def run(self):
+        self.started = time.time()
+        return _as_enrichment(self.func)
+
+    def deadline(self, timeout, page_deadline):
+        """When the section times out: its own timeout once running, the page's in any case."""
+        if self.started is None:
+            return page_deadline
+        return min(self.started + timeout, page_deadline)
+
+
+def submit_background(func):
+    """Run a follow-up job on the shared section pool without waiting for it."""
+    return _get_executor().submit(_as_enrichment, func)
+
+
+def _as_enrichment(func):
+    """Result-page work yields to interactive turns at the LLM scheduler."""
+    with request_priority(ENRICHMENT):
+        return func()
@@ -0,0 +1,182 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "generations.sqlite3"
+)
+
+
+class GenerationCache:
+    def __init__(self, path=None):
+        """
+        Disk-backed, content-addressed store of LLM generations.
+
+        Each key can hold several variants; lookups pick one at random so
+        repeat visitors don't always see the same text.
+
+        Args:
+            path (str, optional): SQLite database path. Defaults to the
+                MBTI_GENERATION_CACHE environment variable or cache/generations.sqlite3.
+        """
+        self.path = path or os.environ.get("MBTI_GENERATION_CACHE", DEFAULT_CACHE_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS generations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cache_key TEXT NOT NULL,
+                    generator TEXT NOT NULL,
+                    mbti_type TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generations_key ON generations (cache_key)"
+            )
+
+    @staticmethod
+    def make_key(generator, template, model, temperature, mbti_type):
+        """Hash everything that determines a type-only generation into one key."""
+        template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()
+        payload = json.dumps([generator, template_hash, model, temperature, mbti_type])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_random(self, key):
+        """Return a random cached variant for a key, or None on a miss."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT content FROM generations WHERE cache_key = ?", (key,)
+            ).fetchall()
+        if not rows:
+            return None
+        return random.choice(rows)[0]
+
+    def count(self, key):
+        """Return how many variants are stored for a key."""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM generations WHERE cache_key = ?", (key,)
+            ).fetchone()[0]
+
+    def add(self, key, generator, mbti_type, content):
+        """Store one more variant for a key, unless that exact text is already stored."""
+        with self.lock, self.connection:
+            # Coalesced concurrent misses all hand back the same reply
+            self.connection.execute(
+                "INSERT INTO generations (cache_key, generator, mbti_type, content, created_at) "
+                "SELECT ?, ?, ?, ?, ? WHERE NOT EXISTS "
+                "(SELECT 1 FROM generations WHERE cache_key = ? AND content = ?)",
+                (key, generator, mbti_type, content, time.time(), key, content)
+            )
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """Return the process-wide generation cache, or None when disabled."""
+    global _cache
+    if os.environ.get("MBTI_GENERATION_CACHE", "").lower() == "off":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = GenerationCache()
+        return _cache
+
+
+def cached_generation(key, generator, mbti_type, generate):
+    """
+    Serve a type-only generation from the cache, generating and storing it on a miss.
+
+    Args:
+        key (str): Cache key from GenerationCache.make_key
+        generator (str): Name of the generator, stored alongside each variant
+        mbti_type (str): The MBTI personality type
+        generate (callable): Zero-argument callable making the LLM call
+
+    Returns:
+        str: A cached or freshly generated variant
+    """
+    cache = get_generation_cache()
+    if cache is None:
+        return generate()
+
+    cached = cache.get_random(key)
+    if cached is not None:
+        return cached
+
+    result = generate()
+    cache.add(key, generator, mbti_type, result)
+    return result
+
+
+def warm_up(variants, mbti_types=None, generators=None):
+    """
+    Pre-generate variants for every type so request-time lookups never miss.
+
+    Args:
+        variants (int): Number of variants to keep per (generator, type)
+        mbti_types (list, optional): Types to warm. Defaults to all 16.
+        generators (list, optional): Generator names to warm. Defaults to all.
+    """
+    from .celebrity import CelebrityDoppelgangerGenerator
+    from .recommendation import RecommendationGenerator
+
+    cache = get_generation_cache()
+    if cache is None:
+        print("Generation cache is disabled (MBTI_GENERATION_CACHE=off)")
+        return
+
+    available = {
+        "recommendations": RecommendationGenerator(),
+        "doppelgangers": CelebrityDoppelgangerGenerator(),
+    }
+    for name in generators or available:
+        instance = available[name]
+        for mbti_type in mbti_types or instance.mbti_traits:
+            key = instance.cache_key(mbti_type)
+            before = cache.count(key)
+            generated = max(0, variants - before)
+            for _ in range(generated):
+                cache.add(key, name, mbti_type, instance.generate_variant(mbti_type))
+            # add() skips a generation identical to one already stored
+            stored = cache.count(key)
+            duplicates = generated - (stored - before)
+            print(f"{name} {mbti_type}: {stored} variants cached"
+                  + (f" ({duplicates} duplicate generations not stored)" if duplicates else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-generate cached recommendations and celebrity doppelgangers."
+    )
+    parser.add_argument("--variants", type=int, default=3,
+                        help="Variants to keep per generator and type (default: 3)")
+    parser.add_argument("--types", nargs="*",
+                        help="MBTI types to warm (default: all 16)")
+    parser.add_argument("--generators", nargs="*", choices=["recommendations", "doppelgangers"],
+                        help="Generators to warm (default: all)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    warm_up(args.variants, args.types, args.generators)
+
+
+if __name__ == "__main__":
+    main()
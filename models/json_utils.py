@@ -0,0 +1,194 @@
+import json
+import re
+import threading
+from collections import Counter
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+_LINE_COMMENT = re.compile(r"^\s*//.*$", re.MULTILINE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_][\w-]*)\s*:")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+# A double-quoted string, possibly cut off at the end of the reply
+_STRING_LITERAL = re.compile(r'("(?:[^"\\]|\\.)*"?)')
+_DECODER = json.JSONDecoder()
+
+# Process-wide counts of parse outcomes, see parse_stats()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record_parse_event(event, count=1):
+    """Count a parse outcome, e.g. 'analysis_retries'."""
+    with _stats_lock:
+        _stats[event] += count
+
+
+def parse_stats():
+    """
+    Snapshot of the parse counters.
+
+    ``json_repaired`` and ``json_unparseable`` are counted by extract_json;
+    callers add their own events through record_parse_event.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _close_brackets(text):
+    """Close a string and any brackets left open by a truncated reply."""
+    stack = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text + "".join(reversed(stack))
+
+
+def _outside_strings(text, fix):
+    """Apply fix to the text between string literals, leaving their contents alone."""
+    parts = _STRING_LITERAL.split(text)
+    # split() with a capturing group alternates code and string literals
+    parts[::2] = [fix(code) for code in parts[::2]]
+    return "".join(parts)
+
+
+def _fix_tokens(code):
+    code = _PYTHON_LITERAL.sub(lambda match: _PYTHON_LITERALS[match.group(1)], code)
+    return _UNQUOTED_KEY.sub(r'\1"\2":', code)
+
+
+def repair_json(text):
+    """
+    Fix the defects LLMs most often leave in JSON: smart quotes, // comments,
+    Python literals and single quotes, unquoted keys, trailing commas and
+    replies cut off before the closing brackets.
+    """
+    text = text.translate(_SMART_QUOTES)
+    text = _LINE_COMMENT.sub("", text)
+    if '"' not in text:
+        # A Python-style dict repr
+        text = text.replace("'", '"')
+    text = _outside_strings(text, _fix_tokens)
+    text = _close_brackets(text)
+    return _outside_strings(text, lambda code: _TRAILING_COMMA.sub(r"\1", code))
+
+
+def extract_json(text):
+    """
+    Pull the first JSON object out of an LLM reply.
+
+    Handles bare JSON, ```json fenced blocks and objects embedded in prose,
+    even next to other brace groups; when none of those parse as-is, the
+    fenced blocks and each embedded object are retried after repair_json().
+
+    Returns:
+        dict or None: The parsed object, or None if nothing parses
+    """
+    if not text:
+        return None
+
+    candidates = [text.strip()]
+    candidates += [block.strip() for block in _FENCE_PATTERN.findall(text)]
+    for candidate in candidates:
+        data = _load_object(candidate)
+        if data is not None:
+            return data
+
+    # Objects embedded in prose, first to last; nested braces belong to
+    # their enclosing object and aren't tried on their own
+    repaired = candidates[1:]
+    start = text.find("{")
+    while start != -1:
+        end = _object_end(text, start)
+        try:
+            data = _DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            return data
+        # A reply cut off before the closing brace runs to the end
+        repaired.append(text[start:end])
+        start = text.find("{", end)
+
+    for candidate in repaired:
+        data = _load_object(repair_json(candidate))
+        if data is not None:
+            record_parse_event("json_repaired")
+            return data
+    record_parse_event("json_unparseable")
+    return None
+
+
+def _object_end(text, start):
+    """Index just past the brace closing the one at start, or len(text) if it is never closed."""
+    depth = 0
+    in_string = escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+    return len(text)
+
+
+def _load_object(text):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_schema(data, schema):
+    """
+    Check a parsed object against a flat schema.
+
+    Args:
+        data (dict): Parsed JSON object
+        schema (dict): Key to expected type; ``list`` means a non-empty list of strings
+
+    Returns:
+        bool: True when every key is present with the expected type
+    """
+    if not isinstance(data, dict):
+        return False
+    for key, expected in schema.items():
+        value = data.get(key)
+        if expected is list:
+            if not isinstance(value, list) or not value:
+                return False
+            if not all(isinstance(item, str) and item.strip() for item in value):
+                return False
+        elif expected is str:
+            if not isinstance(value, str) or not value.strip():
+                return False
+        elif not isinstance(value, expected):
+            return False
+    return True
@@ -0,0 +1,237 @@
+import hashlib
+import os
+import random
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# openai, requests and langchain are imported on first use: importing this
+# module (e.g. for api_key_missing at startup) must stay cheap
+from .metrics import increment
+from .rate_limiter import LLMScheduler
+from .token_budget import count_tokens
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+_lock = threading.Lock()
+_llms = {}
+_chains = {}
+_model_slots = {}
+_http_session = None
+_scheduler = None
+
+# In-flight calls by request key, and how many were issued vs. coalesced
+_in_flight = {}
+_flight_stats = Counter()
+
+
+def _configure_http_pool():
+    """Route every OpenAI request through one keep-alive connection pool."""
+    global _http_session
+    if _http_session is not None:
+        return
+    import openai
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    pool_size = int(os.environ.get("MBTI_HTTP_POOL_SIZE", 64))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    openai.requestssession = session
+    _http_session = session
+
+
+@contextmanager
+def model_slot(model_name):
+    """Hold one of the model's concurrent request slots for the duration of a call."""
+    with _lock:
+        slots = _model_slots.get(model_name)
+        if slots is None:
+            slots = threading.BoundedSemaphore(int(os.environ.get("MBTI_LLM_CONCURRENCY", 32)))
+            _model_slots[model_name] = slots
+    with slots:
+        yield
+
+
+def get_scheduler():
+    """Return the process-wide scheduler that admits every LLM call under the rate limits."""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            import openai
+            _scheduler = LLMScheduler(retry_on=(
+                openai.error.RateLimitError,
+                openai.error.ServiceUnavailableError,
+            ))
+        return _scheduler
+
+
+def scheduler_stats():
+    """The scheduler's counters, or nothing before the first LLM call created it."""
+    with _lock:
+        scheduler = _scheduler
+    return scheduler.stats() if scheduler is not None else {}
+
+
+def scheduled(messages, call):
+    """
+    Run an LLM call through the scheduler, sized by its prompt plus an expected reply.
+
+    Counts the call and its prompt and completion tokens for /metrics.
+    """
+    prompt_tokens = sum(count_tokens(message.content) for message in messages)
+    estimate = prompt_tokens + int(os.environ.get("MBTI_LLM_COMPLETION_ESTIMATE", 300))
+    result = get_scheduler().run(call, estimate)
+
+    reply = "".join(generation.message.content for generation in result.generations)
+    increment("mbti_llm_calls_total")
+    increment("mbti_llm_tokens_total", prompt_tokens, direction="prompt")
+    increment("mbti_llm_tokens_total", count_tokens(reply), direction="completion")
+    _log_prompt(messages, reply)
+    return result
+
+
+def _log_prompt(messages, reply):
+    """Print a sample of prompts and replies; off unless MBTI_PROMPT_LOG_RATE is set."""
+    rate = float(os.environ.get("MBTI_PROMPT_LOG_RATE", 0))
+    if rate <= 0 or random.random() >= rate:
+        return
+    prompt = "\n".join(f"[{message.type}] {message.content}" for message in messages)
+    print(f"LLM prompt:\n{prompt}\nLLM reply:\n{reply}")
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def request_key(llm, messages, stop=None):
+    """Hash of everything that determines an LLM reply: model parameters and prompt."""
+    digest = hashlib.sha256()
+    digest.update(repr((type(llm).__name__, llm.model_name, llm.temperature, stop)).encode("utf-8"))
+    for message in messages:
+        digest.update(b"\0" + message.type.encode("utf-8") + b"\0" + message.content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def single_flight(key, call):
+    """
+    Run call() once for every concurrent request with the same key.
+
+    The first caller makes the upstream request; callers arriving while it
+    is in flight wait for and share its result (or exception). Disabled
+    with MBTI_SINGLE_FLIGHT=off.
+    """
+    if os.environ.get("MBTI_SINGLE_FLIGHT", "").lower() == "off":
+        return call()
+
+    with _lock:
+        flight = _in_flight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _in_flight[key] = flight
+            _flight_stats["issued"] += 1
+        else:
+            _flight_stats["coalesced"] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = call()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _lock:
+            del _in_flight[key]
+        flight.done.set()
+
+
+def single_flight_stats():
+    """Upstream LLM calls issued, and identical concurrent calls coalesced into them."""
+    with _lock:
+        return dict(_flight_stats)
+
+
+def llm_backend():
+    """Return the configured LLM backend: 'openai' (default) or 'fake'."""
+    return os.environ.get("MBTI_LLM_BACKEND", "openai").lower()
+
+
+def api_key_missing():
+    """Whether the OpenAI backend is selected without an API key."""
+    return llm_backend() == "openai" and not os.environ.get("OPENAI_API_KEY")
+
+
+def get_llm(model_name=DEFAULT_MODEL, temperature=0.7, streaming=True):
+    """
+    Return the shared chat model for a configuration, building it on first use.
+
+    Args:
+        model_name (str, optional): OpenAI model name. Defaults to gpt-3.5-turbo.
+        temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        streaming (bool, optional): Whether tokens are streamed to callbacks. Defaults to True.
+
+    Returns:
+        BaseChatModel: A model instance shared by every session; a
+        FakeChatModel when MBTI_LLM_BACKEND=fake
+    """
+    backend = llm_backend()
+    key = (backend, model_name, temperature, streaming)
+    with _lock:
+        llm = _llms.get(key)
+        if llm is None:
+            if backend == "fake":
+                from .fake_llm import build_fake_llm
+                llm = build_fake_llm(temperature=temperature, streaming=streaming)
+            else:
+                from .openai_chat import PooledChatOpenAI
+                _configure_http_pool()
+                llm = PooledChatOpenAI(
+                    temperature=temperature,
+                    model_name=model_name,
+                    streaming=streaming,
+                    # Rate-limit retries are the scheduler's job, with jittered backoff
+                    max_retries=1,
+                    # A hung request would hold its worker, e.g. a result-page
+                    # section the page has already given up on
+                    request_timeout=float(os.environ.get("MBTI_LLM_REQUEST_TIMEOUT", 25)),
+                )
+            _llms[key] = llm
+        return llm
+
+
+def get_chain(prompt, model_name=DEFAULT_MODEL, temperature=0.7, streaming=True):
+    """
+    Return the shared LLMChain for a prompt template and model configuration.
+
+    Chains hold no per-session state, so one instance serves every session.
+
+    Args:
+        prompt (PromptTemplate): Module-level prompt template
+        model_name (str, optional): OpenAI model name. Defaults to gpt-3.5-turbo.
+        temperature (float, optional): Sampling temperature. Defaults to 0.7.
+        streaming (bool, optional): Whether tokens are streamed to callbacks. Defaults to True.
+
+    Returns:
+        LLMChain: A chain shared by every session
+    """
+    llm = get_llm(model_name, temperature, streaming)
+    key = (prompt.template, tuple(prompt.input_variables), id(llm))
+    with _lock:
+        chain = _chains.get(key)
+        if chain is None:
+            from langchain.chains import LLMChain
+            chain = LLMChain(llm=llm, prompt=prompt)
+            _chains[key] = chain
+        return chain
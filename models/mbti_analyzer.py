@@ -1,82 +1,115 @@
 import os
+import copy
 import json
 import sys
 import time
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.llms import OpenAI
-from langchain.chat_models import ChatOpenAI
-from .recommendation import RecommendationGenerator
-from .celebrity import CelebrityDoppelgangerGenerator
-from .conversation_roaster import PersonalityRoastGenerator
+from collections import deque
+from functools import cached_property
+from .answer_cache import get_answer_cache
+from .fanout import SectionFanout
+from .result import MBTIResult, parse_doppelgangers, split_recommendations
+from .scoring import AXES, AxisScores
+from .json_utils import extract_json, record_parse_event
+from .metrics import timer
+from .rate_limiter import SchedulerBusy
+from .token_budget import count_tokens, select_recent
+from .llm_provider import api_key_missing, get_chain, get_llm
+
+# Pass-through template for the analyzer's own, fully formatted prompts
+ANALYZER_TEMPLATE = "{prompt}"
+
+# Compact follow-up sent when an analysis reply doesn't parse or validate
+ANALYSIS_FIX_TEMPLATE = """Your previous reply was not valid JSON in the required format. Reply again with ONLY this JSON object, no other text:
+{{"dimension_analysis": {{"E-I": {{"confidence": 0.0-1.0, "preference": "E"|"I", "indicators": []}}, "S-N": {{...S|N}}, "T-F": {{...T|F}}, "J-P": {{...J|P}}}}, "themes": [], "context_relevance": 0.0-1.0}}
+
+Previous reply:
+{reply}"""
+
+# Full-word preferences some replies use instead of the letter
+PREFERENCE_WORDS = {
+    "EXTRAVERSION": "E", "EXTROVERSION": "E", "INTROVERSION": "I",
+    "SENSING": "S", "INTUITION": "N", "THINKING": "T", "FEELING": "F",
+    "JUDGING": "J", "PERCEIVING": "P"
+}
+
+# Fixed replies, shared by every session
+WELCOME_MESSAGE = (
+    "Hi there! 👋 I'm your MBTI personality test assistant. "
+    "Let's have a conversation to understand your personality better. "
+    "I'll ask you questions about your preferences and tendencies, "
+    "and at the end, I'll provide insights about your personality type "
+    "along with personalized recommendations for music, books, and movies! "
+    "Are you ready to begin?"
+)
+INITIAL_QUESTIONS = (
+    "Tell me about what energizes you the most in life.",
+    "How do you typically approach new situations or challenges?",
+    "What's your ideal way to spend a free day?",
+    "How do you usually make important decisions?"
+)
+COMPLETE_MESSAGE = "Great! Your test is now complete. Here are your results..."
+ALREADY_COMPLETE_MESSAGE = "Your personality test is already complete! Your MBTI type is "
+NOT_SURE_MESSAGE = "I'm not sure how to respond to that. Are you ready to continue our conversation?"
+
+
+def static_utterances():
+    """
+    Every spoken reply whose text is known up front, e.g. to pre-synthesize it.
+
+    The completion messages aren't included: once a result exists, its
+    rendered text is spoken instead.
+    """
+    return [WELCOME_MESSAGE, *INITIAL_QUESTIONS, NOT_SURE_MESSAGE]
 
-from .relationship import RelationshipInsightsGenerator
-from .career import CareerInsightsGenerator
 
 class MBTIAnalyzer:
     def __init__(self):
         """Initialize the MBTI analyzer with dynamic conversation handling."""
         # Check for OpenAI API key
-        if not os.environ.get("OPENAI_API_KEY"):
+        if api_key_missing():
             print("ERROR: OPENAI_API_KEY environment variable is not set.")
             print("Please set it in the .env file or as an environment variable.")
             sys.exit(1)
             
-        # Setup OpenAI model
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-3.5-turbo",
-        )
-        
-        # Setup conversation memory
-        self.memory = ConversationBufferMemory()
+        # 'single' analyzes a turn and writes the next question in one LLM call,
+        # 'split' makes two calls (analysis, then question)
+        self.turn_mode = os.environ.get("MBTI_TURN_MODE", "single").lower()
+        
+        # Prompt size limits: the analyzer's prompts carry at most the last
+        # history_turns turns within history_token_budget tokens, plus a
+        # summary of older turns; at most max_context_turns turns are kept
+        self.history_token_budget = int(os.environ.get("MBTI_HISTORY_TOKEN_BUDGET", 600))
+        self.history_turns = int(os.environ.get("MBTI_HISTORY_TURNS", 5))
+        self.max_context_turns = int(os.environ.get("MBTI_MAX_CONTEXT_TURNS", 40))
+        self.memory_turns = int(os.environ.get("MBTI_MEMORY_TURNS", 5))
+        self.report_prompt_tokens = os.environ.get("MBTI_REPORT_PROMPT_TOKENS") == "1"
+        
+        # Stopping rule: end once every axis' leading letter reaches
+        # stop_confidence, but never before min_turns or after max_turns
+        self.stop_confidence = float(os.environ.get("MBTI_STOP_CONFIDENCE", 0.95))
+        self.min_turns = int(os.environ.get("MBTI_MIN_TURNS", 4))
+        self.max_turns = int(os.environ.get("MBTI_MAX_TURNS", 16))
         
-        # Setup conversation chain
-        self.conversation = ConversationChain(
-            llm=self.llm,
-            memory=self.memory,
-            verbose=True
-        )
-        
-        # Initialize recommendation generator
-        self.recommendation_generator = RecommendationGenerator()
-
-        # Initialize  doppelganger recommendations
-        self.celebrity = CelebrityDoppelgangerGenerator()
-
-        #Initialize conversation roast
-        self.conversation_roaster = PersonalityRoastGenerator()
-
-     
-
-        #relationship
-        self.relationship = RelationshipInsightsGenerator()
-
-        #Career insights
-        self.career = CareerInsightsGenerator()
-
         # Conversation state
         self.conversation_started = False
         self.test_complete = False
         self.mbti_result = None
+        self.result = None
         self.conversation_context = []
         self.current_question = None
+        self.turn_count = 0
         
-        # Track dimension coverage
-        self.dimension_coverage = {
-            'E-I': 0.0,  # Coverage score for E/I dimension
-            'S-N': 0.0,  # Coverage score for S/N dimension
-            'T-F': 0.0,  # Coverage score for T/F dimension
-            'J-P': 0.0   # Coverage score for J/P dimension
-        }
+        # Per-axis evidence, and themes folded out of turns as they leave the context
+        self.scores = AxisScores()
+        self.summary_themes = []
+        
+        # Prompt and reply tokens for the current turn, and per-turn prompt totals
+        self.turn_prompt_tokens = 0
+        self.turn_completion_tokens = 0
+        self.prompt_token_log = deque(maxlen=100)
         
         # Initial open-ended questions
-        self.initial_questions = [
-            "Tell me about what energizes you the most in life.",
-            "How do you typically approach new situations or challenges?",
-            "What's your ideal way to spend a free day?",
-            "How do you usually make important decisions?"
-        ]
+        self.initial_questions = list(INITIAL_QUESTIONS)
         
         # MBTI dimension descriptions for context
         self.dimension_descriptions = {
@@ -99,24 +132,83 @@ class MBTIAnalyzer:
         }
         
         # Welcome message
-        self.welcome_message = (
-            "Hi there! 👋 I'm your MBTI personality test assistant. "
-            "Let's have a conversation to understand your personality better. "
-            "I'll ask you questions about your preferences and tendencies, "
-            "and at the end, I'll provide insights about your personality type "
-            "along with personalized recommendations for music, books, and movies! "
-            "Are you ready to begin?"
-        )
-    
-    def process_message(self, message):
-        """Process user message and return appropriate response."""
+        self.welcome_message = WELCOME_MESSAGE
+
+    # langchain and the result generators are only imported and built on
+    # first use, so importing this module and creating an analyzer stay cheap
+
+    @cached_property
+    def prompt_chain(self):
+        """Shared stateless chain for the analyzer's own prompts; all context is explicit."""
+        from langchain.prompts import PromptTemplate
+        return get_chain(PromptTemplate(input_variables=["prompt"], template=ANALYZER_TEMPLATE), temperature=0.7)
+
+    @cached_property
+    def memory(self):
+        """The capped question/answer transcript that the result generators read."""
+        from langchain.memory import ConversationBufferMemory
+        return ConversationBufferMemory()
+
+    @cached_property
+    def conversation(self):
+        """Conversation chain over the transcript memory, handed to the generators."""
+        from langchain.chains import ConversationChain
+        return ConversationChain(llm=get_llm(temperature=0.7), memory=self.memory)
+
+    @cached_property
+    def recommendation_generator(self):
+        from .recommendation import RecommendationGenerator
+        return RecommendationGenerator()
+
+    @cached_property
+    def celebrity(self):
+        from .celebrity import CelebrityDoppelgangerGenerator
+        return CelebrityDoppelgangerGenerator()
+
+    @cached_property
+    def conversation_roaster(self):
+        from .conversation_roaster import PersonalityRoastGenerator
+        return PersonalityRoastGenerator()
+
+    @cached_property
+    def relationship(self):
+        from .relationship import RelationshipInsightsGenerator
+        return RelationshipInsightsGenerator()
+
+    @cached_property
+    def career(self):
+        from .career import CareerInsightsGenerator
+        return CareerInsightsGenerator()
+
+    def process_message(self, message, on_section=None, on_token=None, on_update=None):
+        """
+        Process user message and return appropriate response.
+        
+        Args:
+            message (str): The user's message
+            on_section (callable, optional): Called as on_section(name, content)
+                as each result section becomes ready, for progressive results
+            on_token (callable, optional): Called as on_token(name, token) while
+                a text result section is still being generated
+            on_update (callable, optional): Called with no arguments after a
+                hybrid-mode personalized section has replaced a static one on
+                the result, possibly after this call returned, so the caller
+                can save the session again
+        
+        Returns:
+            tuple: (response text, whether the test is complete, MBTIResult or None)
+        """
         if not message and not self.conversation_started:
             # First interaction, send welcome message
             return self.welcome_message, False, None
         
         if self.test_complete:
             # Test is already complete
-            return "Your personality test is already complete! Your MBTI type is " + self.mbti_result, True, self.mbti_result
+            return ALREADY_COMPLETE_MESSAGE + self.mbti_result, True, self.result
+        
+        if not message and self.conversation_started:
+            # Resumed session, repeat the pending question
+            return self.current_question, False, None
         
         if not self.conversation_started and "ready" in message.lower():
             # Start the conversation with first question
@@ -125,30 +217,143 @@ class MBTIAnalyzer:
             return self.current_question, False, None
         
         if self.conversation_started:
-            # Analyze the response
-            analysis = self._analyze_response(message)
-            self._update_conversation_context(message, analysis)
-            
-            # Check if we have enough information
-            if self._should_complete_test():
-                # Calculate MBTI result
-                self._calculate_mbti_result()
-                self.test_complete = True
-                
-                # Generate the result message
-                result_message = self._generate_result_message()
-                return result_message, True, self.mbti_result
+            # A turn refused part-way by the LLM queue is rolled back, so the
+            # client's retry of the same answer isn't counted twice
+            snapshot = copy.deepcopy(self.to_state())
+            try:
+                return self._answer_turn(message, on_section, on_token, on_update)
+            except SchedulerBusy:
+                self.load_state(snapshot)
+                raise
+        
+        # Default response
+        return NOT_SURE_MESSAGE, False, None
+    
+    def _answer_turn(self, message, on_section=None, on_token=None, on_update=None):
+        """Analyze an answer and return the next question, or the result once decided."""
+        self.turn_prompt_tokens = 0
+        self.turn_completion_tokens = 0
+        
+        # Analyze the response, together with writing the next question when
+        # that question has to come from the LLM anyway
+        next_question = None
+        analysis = self._cached_analysis(message)
+        if analysis is None:
+            if self.turn_mode == "single" and self._next_question_is_generated():
+                analysis, next_question = self._analyze_and_generate_question(message)
             else:
-                # Generate next question
+                analysis = self._analyze_response(message)
+            self._cache_analysis(message, analysis)
+        self._update_conversation_context(message, analysis)
+        
+        # Check if we have enough information
+        if self._should_complete_test():
+            # Calculate MBTI result
+            self._calculate_mbti_result()
+            self.test_complete = True
+            
+            # Generate the structured result
+            self.result = self._generate_result(on_section, on_token, on_update)
+            self._record_turn_tokens()
+            return COMPLETE_MESSAGE, True, self.result
+        else:
+            # Generate next question unless the combined call already did
+            if next_question is None:
                 next_question = self._generate_next_question()
-                self.current_question = next_question
-                return next_question, False, None
+            self.current_question = next_question
+            self._record_turn_tokens()
+            return next_question, False, None
+    
+    def analyze_turn(self, question, response):
+        """
+        Replay one stored question/answer pair: analyze it and fold it into
+        the scores, without writing a follow-up question.
         
-        # Default response
-        return "I'm not sure how to respond to that. Are you ready to continue our conversation?", False, None
+        Args:
+            question (str): The question that was asked
+            response (str): The user's answer
+        
+        Returns:
+            dict: The turn's analysis, or None if the reply could not be parsed
+        """
+        self.conversation_started = True
+        self.turn_prompt_tokens = 0
+        self.turn_completion_tokens = 0
+        self.current_question = question
+        analysis = self._analyze_response(response)
+        self._update_conversation_context(response, analysis)
+        self._record_turn_tokens()
+        return analysis
+    
+    def to_state(self):
+        """
+        Serialize everything a session needs to continue on another worker.
+        
+        Returns:
+            dict: JSON-serializable conversation state
+        """
+        return {
+            'conversation_started': self.conversation_started,
+            'test_complete': self.test_complete,
+            'mbti_result': self.mbti_result,
+            'result': self.result.to_dict() if self.result is not None else None,
+            'conversation_context': self.conversation_context,
+            'current_question': self.current_question,
+            'turn_count': self.turn_count,
+            'scores': self.scores.to_list(),
+            'summary_themes': self.summary_themes,
+            'memory': [
+                {'type': message.type, 'content': message.content}
+                for message in self.memory.chat_memory.messages
+            ]
+        }
+    
+    def load_state(self, state):
+        """Restore conversation state saved by to_state()."""
+        self.conversation_started = state['conversation_started']
+        self.test_complete = state['test_complete']
+        self.mbti_result = state['mbti_result']
+        self.result = MBTIResult(**state['result']) if state.get('result') else None
+        self.conversation_context = state['conversation_context']
+        self.current_question = state['current_question']
+        self.turn_count = state['turn_count']
+        self.scores = AxisScores.from_list(state['scores'])
+        self.summary_themes = state['summary_themes']
+        
+        self.memory.chat_memory.clear()
+        for message in state['memory']:
+            if message['type'] == 'ai':
+                self.memory.chat_memory.add_ai_message(message['content'])
+            else:
+                self.memory.chat_memory.add_user_message(message['content'])
+    
+    def is_decided(self):
+        """Whether the stopping rule would end the test after the turns so far."""
+        return self._should_complete_test()
+    
+    def _cached_analysis(self, response):
+        """Cached analysis of a short answer to one of the fixed opening questions, if any."""
+        cache = get_answer_cache()
+        if cache is None or self.current_question not in self.initial_questions:
+            return None
+        return cache.get(self.current_question, response)
+    
+    def _cache_analysis(self, response, analysis):
+        """Share the analysis of an answer to a fixed opening question with later sessions."""
+        cache = get_answer_cache()
+        if cache is not None and self.current_question in self.initial_questions:
+            cache.put(self.current_question, response, analysis)
     
     def _analyze_response(self, response):
-        """Analyze response for MBTI indicators and update dimension coverage."""
+        """
+        Ask the LLM for the MBTI indicators in an answer.
+        
+        Returns:
+            dict or None: The validated analysis (per-axis preference,
+            confidence and indicators, plus themes), or None if the reply
+            couldn't be parsed even after a fix-up request; the caller adds
+            it to the axis scores
+        """
         analysis_prompt = f"""
         Analyze this response in the context of MBTI dimensions:
         
@@ -176,26 +381,73 @@ class MBTIAnalyzer:
         """
         
         # Get analysis from LLM
-        result = self.conversation.predict(input=analysis_prompt)
-        try:
-            analysis = json.loads(result)
-            self._update_dimension_coverage(analysis)
+        with timer("mbti_stage_seconds", stage="analyze_response"):
+            return self._parse_analysis(self._predict(analysis_prompt))
+    
+    def _parse_analysis(self, reply):
+        """
+        Turn an analysis reply into a validated analysis dict.
+        
+        Extracts and repairs the JSON, normalizes near-miss values, and if
+        the result still isn't a usable analysis asks the LLM once to fix
+        its reply before giving up on the turn.
+        
+        Returns:
+            dict or None: The analysis, or None if the turn's evidence is lost
+        """
+        analysis = self._normalize_analysis(extract_json(reply))
+        if self._is_valid_analysis(analysis):
             return analysis
-        except json.JSONDecodeError:
-            print("Error parsing analysis result")
-            return None
+        
+        record_parse_event("analysis_parse_failures")
+        record_parse_event("analysis_retries")
+        fixed = self._normalize_analysis(extract_json(
+            self._predict(ANALYSIS_FIX_TEMPLATE.format(reply=(reply or "")[:1500]))
+        ))
+        if self._is_valid_analysis(fixed):
+            record_parse_event("analysis_retry_recoveries")
+            return fixed
+        
+        print("Error parsing analysis result")
+        record_parse_event("analysis_lost_turns")
+        return None
+    
+    def _normalize_analysis(self, analysis):
+        """Coerce near-miss values in place: 'EI'-style keys, lowercase or spelled-out preferences, string or percentage confidences."""
+        if not isinstance(analysis, dict) or not isinstance(analysis.get("dimension_analysis"), dict):
+            return analysis
+        
+        dimensions = {}
+        for key, data in analysis["dimension_analysis"].items():
+            letters = "".join(char for char in str(key).upper() if char.isalpha())
+            axis = f"{letters[:1]}-{letters[1:]}" if len(letters) == 2 else key
+            if not isinstance(data, dict):
+                dimensions[axis] = data
+                continue
+            
+            preference = str(data.get("preference", "")).strip().upper()
+            data["preference"] = PREFERENCE_WORDS.get(preference, preference)
+            try:
+                confidence = float(str(data.get("confidence")).strip().rstrip("%"))
+            except ValueError:
+                confidence = None
+            if confidence is not None:
+                data["confidence"] = min(1.0, max(0.0, confidence / 100 if confidence > 1 else confidence))
+            dimensions[axis] = data
+        analysis["dimension_analysis"] = dimensions
+        return analysis
     
     def _generate_next_question(self):
         """Generate a contextual follow-up question based on conversation history."""
-        # Determine which dimensions need more coverage
-        weak_dimensions = [dim for dim, score in self.dimension_coverage.items() if score < 0.6]
+        # Determine which dimensions are still undecided
+        weak_dimensions = self._undecided_dimensions()
         
         question_prompt = f"""
         Based on the following conversation history:
         {self._format_conversation_history()}
         
         Current dimension coverage:
-        {json.dumps(self.dimension_coverage, indent=2)}
+        {json.dumps(self.scores.confidence(), indent=2)}
         
         Generate a natural follow-up question that:
         1. Feels like a natural continuation of the conversation
@@ -214,40 +466,141 @@ class MBTIAnalyzer:
         """
         
         # If we have remaining initial questions and low coverage, use them
-        if len(self.conversation_context) < len(self.initial_questions):
-            return self.initial_questions[len(self.conversation_context)]
+        if self.turn_count < len(self.initial_questions):
+            return self.initial_questions[self.turn_count]
         
         # Generate dynamic question
-        return self.conversation.predict(input=question_prompt)
+        with timer("mbti_stage_seconds", stage="next_question"):
+            return self._predict(question_prompt)
     
-    def _update_dimension_coverage(self, analysis):
-        """Update dimension coverage based on response analysis."""
-        if not analysis or 'dimension_analysis' not in analysis:
-            return
-            
-        for dimension, data in analysis['dimension_analysis'].items():
-            confidence = data.get('confidence', 0)
-            # Update coverage score with diminishing returns
-            current_coverage = self.dimension_coverage[dimension]
-            self.dimension_coverage[dimension] = min(1.0, current_coverage + (confidence * (1 - current_coverage)))
+    def _next_question_is_generated(self):
+        """Whether the question after the current answer comes from the LLM rather than the fixed list."""
+        return self.turn_count + 1 >= len(self.initial_questions)
+    
+    def _analyze_and_generate_question(self, response):
+        """
+        Analyze a response and write the follow-up question in a single LLM call.
+        
+        A malformed analysis goes through the same fix-your-JSON retry as
+        _analyze_response; a missing question is left for a separate call.
+        
+        Returns:
+            tuple: (analysis dict or None, next question or None)
+        """
+        weak_dimensions = self._undecided_dimensions()
+        
+        turn_prompt = f"""
+        Analyze this response in the context of MBTI dimensions, then write the next question.
+        
+        Previous context: {self._format_conversation_history()}
+        Current response: "{response}"
+        Current question: "{self.current_question}"
+        
+        Current dimension coverage:
+        {json.dumps(self.scores.confidence())}
+        
+        For each MBTI dimension pair (E-I, S-N, T-F, J-P):
+        1. Identify relevant indicators
+        2. Assess confidence level (0-1)
+        3. Extract key themes or patterns
+        4. Determine which preference is stronger
+        
+        Then write a natural follow-up question that:
+        - Flows from the current response and references earlier answers when relevant
+        - Helps gather information about these dimensions: {', '.join(weak_dimensions) or 'any'}
+        - Is open-ended, friendly and doesn't feel like a test question
+        - Doesn't directly ask about personality preferences
+        
+        Format the response as JSON with the following structure:
+        {{
+            "dimension_analysis": {{
+                "E-I": {{"confidence": float, "preference": "E" or "I", "indicators": []}},
+                "S-N": {{"confidence": float, "preference": "S" or "N", "indicators": []}},
+                "T-F": {{"confidence": float, "preference": "T" or "F", "indicators": []}},
+                "J-P": {{"confidence": float, "preference": "J" or "P", "indicators": []}}
+            }},
+            "themes": [list of key themes],
+            "context_relevance": float,
+            "next_question": "the question text"
+        }}
+        """
+        
+        with timer("mbti_stage_seconds", stage="analyze_and_question"):
+            reply = self._predict(turn_prompt)
+            result = self._normalize_analysis(extract_json(reply))
+            if not self._is_valid_analysis(result):
+                # Only the analysis is retried; the question gets its own call
+                return self._parse_analysis(reply), None
+        
+        next_question = result.pop("next_question", None)
+        if not isinstance(next_question, str) or not next_question.strip():
+            return result, None
+        return result, next_question.strip()
+    
+    def _is_valid_analysis(self, analysis):
+        """Check that an analysis reply has a usable entry for every dimension."""
+        if not isinstance(analysis, dict):
+            return False
+        dimensions = analysis.get("dimension_analysis")
+        if not isinstance(dimensions, dict):
+            return False
+        for dimension in AXES:
+            data = dimensions.get(dimension)
+            if not isinstance(data, dict):
+                return False
+            if data.get("preference") not in dimension.split("-"):
+                return False
+            if not isinstance(data.get("confidence"), (int, float)):
+                return False
+        return True
+    
+    def _undecided_dimensions(self):
+        """Dimensions whose leading letter is still below the stopping confidence."""
+        return [axis for axis, value in self.scores.confidence().items() if value < self.stop_confidence]
     
     def _should_complete_test(self):
         """Determine if we have enough information to complete the test."""
-        # Check if we have at least 8 responses
-        if len(self.conversation_context) < 8:
+        if self.turn_count >= self.max_turns:
+            return True
+        if self.turn_count < self.min_turns:
             return False
-            
-        # Check if we have good coverage of all dimensions
-        return all(score >= 0.8 for score in self.dimension_coverage.values())
+        
+        # Stop as soon as the evidence is decisive on every dimension
+        return self.scores.is_decisive(self.stop_confidence)
     
     def _format_conversation_history(self):
-        """Format conversation history for LLM prompts."""
-        history = []
-        for entry in self.conversation_context[-5:]:  # Last 5 interactions
-            history.append(f"Q: {entry.get('question', 'Unknown question')}")
-            history.append(f"A: {entry.get('response', 'No response')}")
+        """Format the token-budgeted recent history, plus a summary of older turns, for LLM prompts."""
+        history, omitted = select_recent(
+            self.conversation_context,
+            self._format_turn,
+            self.history_token_budget,
+            self.history_turns
+        )
+        
+        summary = self._summarize_older_turns(omitted)
+        if summary:
+            history.insert(0, summary)
         return "\n".join(history)
     
+    def _format_turn(self, entry):
+        """Format one question/answer pair for a prompt."""
+        return f"Q: {entry.get('question', 'Unknown question')}\nA: {entry.get('response', 'No response')}"
+    
+    def _summarize_older_turns(self, omitted):
+        """Summarize turns that no longer fit the prompt window by their themes."""
+        themes = list(self.summary_themes)
+        for entry in self.conversation_context[:omitted]:
+            themes.extend((entry.get('analysis') or {}).get('themes') or [])
+        if not themes:
+            return ""
+        
+        # Most recent themes first, without repeats
+        unique = []
+        for theme in reversed(themes):
+            if isinstance(theme, str) and theme not in unique:
+                unique.append(theme)
+        return "Earlier in the conversation: " + ", ".join(unique[:12])
+    
     def _update_conversation_context(self, response, analysis):
         """Update conversation context with new response and analysis."""
         self.conversation_context.append({
@@ -256,37 +609,49 @@ class MBTIAnalyzer:
             'analysis': analysis,
             'timestamp': time.time()
         })
+        self.turn_count += 1
+        
+        # Fold this turn's evidence into the running scores
+        self.scores.update(analysis)
+        
+        # Keep the transcript the result generators read, capped
+        self.memory.chat_memory.add_ai_message(self.current_question or "")
+        self.memory.chat_memory.add_user_message(response)
+        del self.memory.chat_memory.messages[:-2 * self.memory_turns]
+        
+        # Cap the context, keeping only the themes of turns that drop out
+        while len(self.conversation_context) > self.max_context_turns:
+            evicted = self.conversation_context.pop(0)
+            self.summary_themes.extend((evicted.get('analysis') or {}).get('themes') or [])
+            del self.summary_themes[:-12]
     
     def _calculate_mbti_result(self):
         """Calculate MBTI result based on accumulated conversation analysis."""
-        preferences = {
-            'E': 0, 'I': 0,
-            'S': 0, 'N': 0,
-            'T': 0, 'F': 0,
-            'J': 0, 'P': 0
-        }
-        
-        # Analyze all responses to determine preferences
-        for entry in self.conversation_context:
-            analysis = entry.get('analysis', {})
-            if 'dimension_analysis' in analysis:
-                for dimension, data in analysis['dimension_analysis'].items():
-                    if 'preference' in data and 'confidence' in data:
-                        pref = data['preference']
-                        conf = data['confidence']
-                        preferences[pref] += conf
-        
-        # Determine final type
-        result = ""
-        result += "E" if preferences['E'] > preferences['I'] else "I"
-        result += "S" if preferences['S'] > preferences['N'] else "N"
-        result += "T" if preferences['T'] > preferences['F'] else "F"
-        result += "J" if preferences['J'] > preferences['P'] else "P"
-        
-        self.mbti_result = result
+        self.mbti_result = self.scores.mbti_type()
+    
+    def _predict(self, prompt, callbacks=None):
+        """Send one of the analyzer's prompts through the stateless chain."""
+        reply, prompt_tokens, completion_tokens = self._complete(prompt, callbacks)
+        self.turn_prompt_tokens += prompt_tokens
+        self.turn_completion_tokens += completion_tokens
+        return reply
+    
+    def _complete(self, prompt, callbacks=None):
+        """
+        Like _predict, but return (reply, prompt tokens, completion tokens)
+        instead of adding them to the turn's counters, for section threads.
+        """
+        reply = self.prompt_chain.predict(prompt=prompt, callbacks=callbacks)
+        return reply, count_tokens(prompt), count_tokens(reply)
+    
+    def _record_turn_tokens(self):
+        """Log how many prompt tokens the finished turn sent."""
+        self.prompt_token_log.append(self.turn_prompt_tokens)
+        if self.report_prompt_tokens:
+            print(f"Turn {self.turn_count} prompt tokens: {self.turn_prompt_tokens}")
     
-    def _generate_result_message(self):
-        """Generate a detailed result message with explanation and recommendations."""
+    def _generate_result(self, on_section=None, on_token=None, on_update=None):
+        """Generate the structured result with explanation and recommendations."""
         mbti_descriptions = {
             "ISTJ": "The Inspector: Practical, fact-minded, and reliable. You value loyalty, hard work, and tradition.",
             "ISFJ": "The Protector: Quiet, caring, and dependable. You're committed to fulfilling your duties and responsibilities.",
@@ -309,29 +674,10 @@ class MBTIAnalyzer:
         # Get base description
         description = mbti_descriptions.get(self.mbti_result, "Unknown personality type")
         
-        # Generate personalized recommendations
-        recommendations = self.recommendation_generator.generate_recommendations(self.mbti_result)
-
-        # Generate personalized recommendations
-        celeb_recommendations = self.celebrity.find_doppelgangers(self.mbti_result)
-
-
-
-        #Career insights
-        career_insights = self.career.generate_career_insights(
-            self.mbti_result, 
-            self.conversation
-        )
-
-        #generate personalized roast
-        user_roast = self.conversation_roaster.generate_roast(self.mbti_result, self.conversation) 
-
-        #Generate relationship overview
-        relationship_insights = self.relationship.generate_relationship_insights(
-            self.mbti_result, 
-            self.conversation
-        )
-
+        # The type is known before any generator runs, so it can go out first
+        result = MBTIResult(mbti_type=self.mbti_result, description=description)
+        if on_section is not None:
+            on_section('type', {'mbti_type': self.mbti_result, 'description': description})
         
         # Generate personalized insights based on conversation
         insights_prompt = f"""
@@ -349,35 +695,104 @@ class MBTIAnalyzer:
         Format each insight as a bullet point.
         """
         
-        personal_insights = self.conversation.predict(input=insights_prompt)
-        
-        # Combine all components
-        result_message = f"""
-        🎉 Your MBTI Personality Type: {self.mbti_result}
-
-        {description}
-
-        📝 Overview
-        {personal_insights}
-
-        🔥 Roast
-        {user_roast}
-
-        🎯 I've also prepared some personalized recommendations just for you:
-
-        {recommendations}
-
-        Who are your celebrity doppelgangers?
-
-        {celeb_recommendations}
-
-        Relationship
-        {relationship_insights}
-
-        Career insights
-        {career_insights}
-
-        Remember, these insights and recommendations are suggestions based on our conversation and your personality type. Feel free to explore and discover what resonates with you personally!
+        # Built here rather than on the section threads, which share them
+        from .streaming import section_callbacks
+        conversation = self.conversation
+        
+        # Fan out the independent generators so the page costs max(section), not sum(section)
+        fanout = SectionFanout()
+        fanout.add(
+            'recommendations',
+            lambda: self.recommendation_generator.generate_recommendations(
+                self.mbti_result,
+                callbacks=section_callbacks('recommendations', on_token)
+            ),
+            fallback=""
+        )
+        fanout.add(
+            'doppelgangers',
+            lambda: self.celebrity.find_doppelgangers(
+                self.mbti_result,
+                callbacks=section_callbacks('doppelgangers', on_token)
+            ),
+            fallback=""
+        )
+        fanout.add(
+            'career',
+            lambda: self.career.generate_career_insights(
+                self.mbti_result,
+                conversation,
+                on_update=self._section_updater(result, 'career', on_section, on_update)
+            ),
+            fallback=self.career.career_insights.get(self.mbti_result, self.career.career_insights["DEFAULT"])
+        )
+        fanout.add(
+            'roast',
+            lambda: self.conversation_roaster.generate_roast(
+                self.mbti_result,
+                conversation,
+                callbacks=section_callbacks('roast', on_token)
+            ),
+            fallback=f"Looks like a {self.mbti_result} can't even handle a good roast! 😉"
+        )
+        fanout.add(
+            'relationship',
+            lambda: self.relationship.generate_relationship_insights(
+                self.mbti_result,
+                conversation,
+                on_update=self._section_updater(result, 'relationship', on_section, on_update)
+            ),
+            fallback=self.relationship.relationship_insights.get(self.mbti_result, self.relationship.relationship_insights["DEFAULT"])
+        )
+        # The overview runs on a section thread, so its token counts are
+        # handed back and added to the turn's here rather than by _predict
+        overview_tokens = []
+        
+        def overview():
+            reply, prompt_tokens, completion_tokens = self._complete(
+                insights_prompt,
+                callbacks=section_callbacks('overview', on_token)
+            )
+            overview_tokens.append((prompt_tokens, completion_tokens))
+            return reply
+        
+        fanout.add('overview', overview, fallback=description)
+        sections = fanout.run(on_section=self._section_updater(result, None, on_section))
+        # A timed-out overview still finishes later; it no longer counts toward this turn
+        if overview_tokens and sections['overview'] is not description:
+            prompt_tokens, completion_tokens = overview_tokens[0]
+            self.turn_prompt_tokens += prompt_tokens
+            self.turn_completion_tokens += completion_tokens
+        return result
+    
+    def _section_updater(self, result, name, on_section, on_update=None):
         """
+        Build a callback that stores a finished section on the result and
+        sends it to the client, if it is listening.
         
-        return result_message 
\ No newline at end of file
+        With a name, the callback takes just the content (a generator's
+        late personalized update) and then calls on_update, as the result
+        may already have been saved; without one it takes (name, content).
+        """
+        def update(section, content):
+            content = self._structure_section(section, content)
+            setattr(result, section, content)
+            if on_section is not None:
+                on_section(section, content)
+        
+        if name is None:
+            return update
+        
+        def late_update(content):
+            update(name, content)
+            if on_update is not None:
+                on_update()
+        return late_update
+    
+    def _structure_section(self, name, content):
+        """Turn a generator's output into the result field for its section."""
+        if name == 'recommendations':
+            return split_recommendations(content)
+        if name == 'doppelgangers':
+            return parse_doppelgangers(content)
+        return content
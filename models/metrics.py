@@ -0,0 +1,176 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Upper bounds in seconds: sub-second stages (STT, cache hits) through
+# multi-second LLM calls and whole result sections
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Histograms that aren't latencies, by name -> upper bounds
+BUCKETS = {
+    "mbti_result_payload_bytes": (1024, 2048, 4096, 8192, 16384, 32768, 65536),
+}
+
+# name -> (type, help) for everything exposed at /metrics
+METRICS = {
+    "mbti_stage_seconds": ("histogram", "Latency of a turn or voice stage"),
+    "mbti_section_seconds": ("histogram", "Latency of a result-page section generator, from when a worker starts it"),
+    "mbti_section_queue_seconds": ("histogram", "Time a result-page section waited for a free worker"),
+    "mbti_result_payload_bytes": ("histogram", "Encoded size of the result in a client's final response event"),
+    "mbti_llm_calls_total": ("counter", "Upstream LLM calls made"),
+    "mbti_llm_tokens_total": ("counter", "LLM tokens sent (prompt) and received (completion)"),
+    "mbti_fallbacks_total": ("counter", "Result sections served from their fallback"),
+    "mbti_parse_events_total": ("counter", "JSON parse outcomes for LLM replies"),
+    "mbti_answer_cache_total": ("counter", "Answer-cache lookups by outcome"),
+    "mbti_single_flight_total": ("counter", "LLM requests issued upstream or coalesced into one in flight"),
+    "mbti_scheduler_total": ("counter", "LLM scheduler admissions, rejections, timeouts and retries"),
+    "mbti_scheduler_queued": ("gauge", "LLM calls waiting for admission"),
+    "mbti_tts_cache_total": ("counter", "Speech clip lookups by outcome, clips synthesized and clips evicted from disk"),
+    "mbti_active_sessions": ("gauge", "Test sessions held in memory"),
+    "mbti_connected_clients": ("gauge", "Socket.IO clients bound to a session"),
+    "mbti_voice_sessions": ("gauge", "Clients with live voice state"),
+}
+
+_lock = threading.Lock()
+# name -> label items -> [count per bucket..., count above the last bucket, sum, count]
+_histograms = defaultdict(dict)
+# name -> label items -> value
+_counters = defaultdict(lambda: defaultdict(float))
+_collectors = []
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _buckets(name):
+    return BUCKETS.get(name, LATENCY_BUCKETS)
+
+
+def observe(name, value, **labels):
+    """Record one value, a duration in seconds unless the histogram has its own BUCKETS, in a histogram."""
+    key = _labels(labels)
+    buckets = _buckets(name)
+    with _lock:
+        series = _histograms[name].get(key)
+        if series is None:
+            series = [0] * (len(buckets) + 3)
+            _histograms[name][key] = series
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def increment(name, amount=1, **labels):
+    """Add to a counter."""
+    with _lock:
+        _counters[name][_labels(labels)] += amount
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe how long the block takes, whether or not it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def register_collector(collect):
+    """
+    Add a callable sampled at every scrape.
+
+    collect() returns (name, labels dict, value) tuples for metrics whose
+    values live elsewhere, e.g. the session count or cache counters.
+    """
+    with _lock:
+        _collectors.append(collect)
+
+
+def summary(name):
+    """
+    Count and mean of a histogram per label set, for benchmark reports.
+
+    Returns:
+        dict: Label dict rendered as "k=v,..." to (count, mean)
+    """
+    with _lock:
+        series = dict(_histograms.get(name, {}))
+        return {
+            ",".join(f"{k}={v}" for k, v in key): (values[-1], values[-2] / values[-1] if values[-1] else 0.0)
+            for key, values in series.items()
+        }
+
+
+def _pipeline_samples():
+    """Counters kept by the LLM pipeline modules themselves."""
+    from .answer_cache import get_answer_cache
+    from .json_utils import parse_stats
+    from .llm_provider import scheduler_stats, single_flight_stats
+
+    for event, value in parse_stats().items():
+        yield "mbti_parse_events_total", {"event": event}, value
+    for outcome, value in single_flight_stats().items():
+        yield "mbti_single_flight_total", {"outcome": outcome}, value
+    for event, value in scheduler_stats().items():
+        if event == "queued":
+            yield "mbti_scheduler_queued", {}, value
+        else:
+            yield "mbti_scheduler_total", {"event": event}, value
+    cache = get_answer_cache()
+    if cache is not None:
+        for event, value in cache.stats().items():
+            if event != "hit_rate":
+                yield "mbti_answer_cache_total", {"event": event}, value
+
+
+def _format_labels(items, extra=()):
+    items = tuple(items) + tuple(extra)
+    if not items:
+        return ""
+    rendered = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + rendered + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    samples = defaultdict(list)
+    with _lock:
+        collectors = [_pipeline_samples] + list(_collectors)
+        for name, series in _counters.items():
+            samples[name].extend((key, value) for key, value in series.items())
+        histograms = {
+            name: {key: list(values) for key, values in series.items()}
+            for name, series in _histograms.items()
+        }
+
+    for collect in collectors:
+        try:
+            for name, labels, value in collect():
+                samples[name].append((_labels(labels), value))
+        except Exception as e:
+            print(f"Error collecting metrics: {e}")
+
+    lines = []
+    for name in sorted(set(samples) | set(histograms)):
+        kind, help_text = METRICS.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in samples.get(name, ()):
+            lines.append(f"{name}{_format_labels(key)} {_number(value)}")
+        for key, values in histograms.get(name, {}).items():
+            cumulative = 0
+            for bound, count in zip(_buckets(name) + (float("inf"),), values[:-2]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(key)} {_number(values[-2])}")
+            lines.append(f"{name}_count{_format_labels(key)} {values[-1]}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,21 @@
+from langchain.chat_models import ChatOpenAI
+
+from .llm_provider import model_slot, request_key, scheduled, single_flight
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI that shares the process-wide HTTP pool, caps concurrency per
+    model, coalesces identical in-flight requests and is admitted by the
+    rate-limit scheduler.
+
+    A coalesced caller gets the finished reply but not its streamed tokens.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def call():
+            with model_slot(self.model_name):
+                return super(PooledChatOpenAI, self)._generate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                )
+        return single_flight(request_key(self, messages, stop), lambda: scheduled(messages, call))
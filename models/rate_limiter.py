@@ -0,0 +1,169 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Lower runs first: a user waiting on their next question beats result-page extras
+INTERACTIVE = 0
+ENRICHMENT = 1
+
+_local = threading.local()
+
+
+class SchedulerBusy(Exception):
+    """Raised when the LLM queue is full or a request waited too long for its turn."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@contextmanager
+def request_priority(priority):
+    """Run LLM calls made by this thread inside the block at the given priority."""
+    previous = getattr(_local, "priority", INTERACTIVE)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def current_priority():
+    return getattr(_local, "priority", INTERACTIVE)
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        """A bucket refilled at per_minute units a minute, holding at most a minute's worth."""
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount can be taken; requests above capacity only need a full bucket."""
+        self._refill(now)
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class LLMScheduler:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_queue=None,
+                 queue_timeout=None, max_retries=None, retry_on=()):
+        """
+        Admit LLM calls under requests/min and tokens/min limits, by priority.
+
+        Callers block in a priority queue (interactive before enrichment,
+        then first come first served) until both buckets have room, then run
+        their call on their own thread. Calls failing with one of retry_on
+        (upstream rate limiting) are retried with jittered exponential
+        backoff, re-entering the queue each time.
+
+        Args:
+            requests_per_minute (int, optional): Defaults to MBTI_LLM_RPM or 3500.
+            tokens_per_minute (int, optional): Defaults to MBTI_LLM_TPM or 90000.
+            max_queue (int, optional): Waiting calls beyond this are refused
+                with SchedulerBusy. Defaults to MBTI_LLM_QUEUE_SIZE or 256.
+            queue_timeout (float, optional): Seconds a call may wait for
+                admission before SchedulerBusy. Defaults to MBTI_LLM_QUEUE_TIMEOUT or 30.
+            max_retries (int, optional): Retries after a rate-limit error.
+                Defaults to MBTI_LLM_MAX_RETRIES or 3.
+            retry_on (tuple): Exception types that mean "rate limited, try again".
+        """
+        self.requests = TokenBucket(requests_per_minute or int(os.environ.get("MBTI_LLM_RPM", 3500)))
+        self.tokens = TokenBucket(tokens_per_minute or int(os.environ.get("MBTI_LLM_TPM", 90000)))
+        self.max_queue = max_queue or int(os.environ.get("MBTI_LLM_QUEUE_SIZE", 256))
+        self.queue_timeout = queue_timeout or float(os.environ.get("MBTI_LLM_QUEUE_TIMEOUT", 30))
+        self.max_retries = int(os.environ.get("MBTI_LLM_MAX_RETRIES", 3)) if max_retries is None else max_retries
+        self.retry_on = tuple(retry_on)
+
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.sequence = itertools.count()
+        self.counters = Counter()
+
+    def run(self, call, tokens, priority=None):
+        """
+        Run call() once admitted, retrying on rate-limit errors.
+
+        Args:
+            call (callable): Zero-argument callable making the LLM request
+            tokens (int): Estimated prompt plus completion tokens
+            priority (int, optional): INTERACTIVE or ENRICHMENT. Defaults to
+                the calling thread's request_priority().
+
+        Raises:
+            SchedulerBusy: The queue is full or admission timed out
+        """
+        priority = current_priority() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            self._admit(tokens, priority)
+            try:
+                return call()
+            except self.retry_on:
+                if attempt == self.max_retries:
+                    self._count("rate_limit_failures")
+                    raise
+                self._count("retries")
+                # Full jitter: spread retries so they don't arrive in lockstep
+                time.sleep(random.uniform(0, min(30.0, 2 ** attempt)))
+
+    def stats(self):
+        """Admission counters and the current queue length."""
+        with self.condition:
+            counters = dict(self.counters)
+            counters["queued"] = len(self.waiting)
+        return counters
+
+    def _admit(self, tokens, priority):
+        """Block until this call is first in line and both buckets have room."""
+        with self.condition:
+            if len(self.waiting) >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise SchedulerBusy("The LLM queue is full", retry_after=self._estimated_wait())
+
+            ticket = (priority, next(self.sequence))
+            heapq.heappush(self.waiting, ticket)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self.waiting[0] == ticket:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait == 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.counters["admitted"] += 1
+                            return
+                    else:
+                        wait = self.queue_timeout
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.counters["timed_out"] += 1
+                        raise SchedulerBusy("Timed out waiting for an LLM slot", retry_after=self._estimated_wait())
+                    self.condition.wait(min(wait, remaining))
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+
+    def _estimated_wait(self):
+        """Rough seconds until the current queue drains at the request rate."""
+        return round(len(self.waiting) / self.requests.rate, 1)
+
+    def _count(self, event):
+        with self.condition:
+            self.counters[event] += 1
@@ -1,16 +1,8 @@
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from .generation_cache import GenerationCache, cached_generation
+from .llm_provider import get_chain, get_llm
 
-class RecommendationGenerator:
-    def __init__(self):
-        """Initialize the recommendation generator with LLM components."""
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-3.5-turbo",
-        )
-        
-        self.recommendation_template = """
+RECOMMENDATION_TEMPLATE = """
        For the MBTI personality type {mbti_type}, provide 3 highly tailored recommendations in each category:
 
         Music:
@@ -28,42 +20,68 @@ class RecommendationGenerator:
         Ensure recommendations are specific, engaging, and reflect the unique characteristics of {mbti_type}.
         Use an enthusiastic and personalized tone.
         """
+
+RECOMMENDATION_PROMPT = PromptTemplate(
+    input_variables=["mbti_type", "traits"],
+    template=RECOMMENDATION_TEMPLATE
+)
+
+# MBTI type traits mapping
+MBTI_TRAITS = {
+    "ISTJ": "practical, detail-oriented, and traditional",
+    "ISFJ": "nurturing, detail-focused, and service-oriented",
+    "INFJ": "insightful, creative, and idealistic",
+    "INTJ": "analytical, strategic, and independent",
+    "ISTP": "logical, practical, and adaptable",
+    "ISFP": "artistic, sensitive, and spontaneous",
+    "INFP": "idealistic, empathetic, and creative",
+    "INTP": "logical, innovative, and analytical",
+    "ESTP": "energetic, practical, and spontaneous",
+    "ESFP": "enthusiastic, spontaneous, and fun-loving",
+    "ENFP": "enthusiastic, creative, and people-oriented",
+    "ENTP": "innovative, entrepreneurial, and adaptable",
+    "ESTJ": "organized, practical, and traditional",
+    "ESFJ": "warm, practical, and people-oriented",
+    "ENFJ": "charismatic, idealistic, and people-focused",
+    "ENTJ": "strategic, logical, and efficient"
+}
+
+
+class RecommendationGenerator:
+    def __init__(self):
+        """Initialize the recommendation generator with the shared LLM components."""
+        self.llm = get_llm(temperature=0.7)
         
-        self.prompt = PromptTemplate(
-            input_variables=["mbti_type", "traits"],
-            template=self.recommendation_template
-        )
-        
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        self.recommendation_template = RECOMMENDATION_TEMPLATE
+        self.prompt = RECOMMENDATION_PROMPT
+        self.chain = get_chain(self.prompt, temperature=0.7)
         
-        # MBTI type traits mapping
-        self.mbti_traits = {
-            "ISTJ": "practical, detail-oriented, and traditional",
-            "ISFJ": "nurturing, detail-focused, and service-oriented",
-            "INFJ": "insightful, creative, and idealistic",
-            "INTJ": "analytical, strategic, and independent",
-            "ISTP": "logical, practical, and adaptable",
-            "ISFP": "artistic, sensitive, and spontaneous",
-            "INFP": "idealistic, empathetic, and creative",
-            "INTP": "logical, innovative, and analytical",
-            "ESTP": "energetic, practical, and spontaneous",
-            "ESFP": "enthusiastic, spontaneous, and fun-loving",
-            "ENFP": "enthusiastic, creative, and people-oriented",
-            "ENTP": "innovative, entrepreneurial, and adaptable",
-            "ESTJ": "organized, practical, and traditional",
-            "ESFJ": "warm, practical, and people-oriented",
-            "ENFJ": "charismatic, idealistic, and people-focused",
-            "ENTJ": "strategic, logical, and efficient"
-        }
+        self.mbti_traits = MBTI_TRAITS
     
-    def generate_recommendations(self, mbti_type):
+    def generate_recommendations(self, mbti_type, callbacks=None):
         """Generate personalized recommendations based on MBTI type."""
         if mbti_type not in self.mbti_traits:
             raise ValueError(f"Invalid MBTI type: {mbti_type}")
-            
+        
+        # Only the type varies, so serve a cached variant when one exists
+        return cached_generation(
+            self.cache_key(mbti_type),
+            "recommendations",
+            mbti_type,
+            lambda: self.generate_variant(mbti_type, callbacks)
+        )
+    
+    def generate_variant(self, mbti_type, callbacks=None):
+        """Make a fresh LLM call, bypassing the generation cache."""
         traits = self.mbti_traits[mbti_type]
         
         # Generate recommendations using LLM
-        result = self.chain.run(mbti_type=mbti_type, traits=traits)
+        result = self.chain.run(mbti_type=mbti_type, traits=traits, callbacks=callbacks)
         
-        return result 
\ No newline at end of file
+        return result
+    
+    def cache_key(self, mbti_type):
+        """Return the generation cache key for a type."""
+        return GenerationCache.make_key(
+            "recommendations", self.recommendation_template, self.llm.model_name, self.llm.temperature, mbti_type
+        )
@@ -1,26 +1,13 @@
 import os
 import sys
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
-from langchain.chat_models import ChatOpenAI
+from .fanout import submit_background
+from .json_utils import extract_json, validate_schema
+from .llm_provider import api_key_missing, get_chain, get_llm
+from .metrics import increment
 
-class RelationshipInsightsGenerator:
-    def __init__(self):
-        """Initialize the relationship insights generator with LLM components."""
-        # Check for OpenAI API key
-        if not os.environ.get("OPENAI_API_KEY"):
-            print("ERROR: OPENAI_API_KEY environment variable is not set.")
-            print("Please set it in the .env file or as an environment variable.")
-            sys.exit(1)
-        
-        # Setup OpenAI model
-        self.llm = ChatOpenAI(
-            temperature=0.7,
-            model_name="gpt-3.5-turbo",
-        )
-        
-        # Relationship insights template
-        self.insights_template = """
+# Relationship insights template
+RELATIONSHIP_TEMPLATE = """
         Generate comprehensive relationship insights for the {mbti_type} personality type.
 
         Conversation Context: {conversation_context}
@@ -38,57 +25,254 @@ class RelationshipInsightsGenerator:
         - Provide actionable and empathetic insights
 
         Output Format:
-        A JSON object with detailed relationship insights
+        Return only a JSON object with exactly these keys:
+        {{
+            "summary": "3-4 sentences on how they approach relationships",
+            "strengths": ["5-6 one or two word relationship strengths"],
+            "weaknesses": ["5-6 one or two word relationship challenges"]
+        }}
+        """
+
+# Predefined relationship insights for MBTI types
+RELATIONSHIP_INSIGHTS = {
+    "INTJ": {
+        "summary": "You gravitate towards intellectual pursuits and find comfort in structured, analytical environments. In relationships, you seek partners who can match your depth of curiosity while accepting your need for mental stimulation over physical activity. Your perfectionist tendencies extend beyond work into personal goals, but you maintain a healthy self-image despite acknowledging areas for improvement.",
+        "strengths": [
+            "Accepting", "Patient", "Authentic", 
+            "Observant", "Loyal", "Supportive"
+        ],
+        "weaknesses": [
+            "Reserved", "Distant", "Self-conscious", 
+            "Analytical", "Perfectionistic", "Challenging to read"
+        ]
+    },
+    "INFJ": {
+        "summary": "You seek deep, meaningful connections that transcend surface-level interactions. Relationships for you are about emotional depth, mutual growth, and shared values. You're naturally intuitive, often sensing your partner's unspoken needs while maintaining a delicate balance between empathy and personal boundaries.",
+        "strengths": [
+            "Empathetic", "Insightful", "Supportive", 
+            "Compassionate", "Deep", "Committed"
+        ],
+        "weaknesses": [
+            "Idealistic", "Sensitive", "Overanalyzing", 
+            "People-pleasing", "Conflict-avoidant", "Emotionally intense"
+        ]
+    },
+    "ISTJ": {
+        "summary": "You approach relationships with steady commitment and a strong sense of duty. You show love through reliability and practical support rather than grand gestures, and you value partners who appreciate consistency, honesty and shared responsibilities.",
+        "strengths": [
+            "Loyal", "Dependable", "Honest", 
+            "Committed", "Respectful", "Steady"
+        ],
+        "weaknesses": [
+            "Reserved", "Rigid", "Undemonstrative", 
+            "Stubborn", "Critical", "Slow to Open Up"
+        ]
+    },
+    "ISFJ": {
+        "summary": "You are a devoted, nurturing partner who pays close attention to the needs of the people you love. You remember the details that matter and create a sense of safety and warmth, though you can neglect your own needs while caring for others.",
+        "strengths": [
+            "Caring", "Attentive", "Loyal", 
+            "Supportive", "Patient", "Thoughtful"
+        ],
+        "weaknesses": [
+            "Self-Sacrificing", "Conflict-Avoidant", "Sensitive", 
+            "Holds Grudges", "Reluctant to Voice Needs", "Change-Averse"
+        ]
+    },
+    "ISTP": {
+        "summary": "You value freedom and low-drama connection, preferring to show affection through shared activities and practical help. You are calm and easygoing in relationships, but partners may need patience while you process emotions privately.",
+        "strengths": [
+            "Easygoing", "Respectful of Space", "Practical", 
+            "Calm", "Spontaneous", "Loyal"
+        ],
+        "weaknesses": [
+            "Emotionally Reserved", "Detached", "Commitment-Wary", 
+            "Private", "Unpredictable", "Blunt"
+        ]
+    },
+    "ISFP": {
+        "summary": "You love quietly and deeply, expressing affection through thoughtful actions and shared experiences. You seek partners who accept you as you are, respect your independence and appreciate your gentle, present-focused warmth.",
+        "strengths": [
+            "Gentle", "Accepting", "Affectionate", 
+            "Loyal", "Spontaneous", "Considerate"
+        ],
+        "weaknesses": [
+            "Conflict-Avoidant", "Sensitive", "Private", 
+            "Unpredictable", "Self-Doubting", "Withdraws Under Stress"
+        ]
+    },
+    "INFP": {
+        "summary": "You seek soulful, authentic relationships built on shared values and deep understanding. You are a devoted and imaginative partner, though your idealism can make it hard when reality doesn't match the connection you envision.",
+        "strengths": [
+            "Devoted", "Empathetic", "Accepting", 
+            "Romantic", "Supportive", "Authentic"
+        ],
+        "weaknesses": [
+            "Idealistic", "Sensitive", "Withdrawn", 
+            "Self-Critical", "Conflict-Avoidant", "Overthinking"
+        ]
+    },
+    "INTP": {
+        "summary": "You value relationships built on intellectual connection, honesty and mutual independence. You are a curious, open-minded partner who loves long conversations, but you may need reminders to express feelings you assume are obvious.",
+        "strengths": [
+            "Open-Minded", "Honest", "Independent", 
+            "Curious", "Easygoing", "Loyal"
+        ],
+        "weaknesses": [
+            "Emotionally Distant", "Absent-Minded", "Overanalyzing", 
+            "Insensitive", "Private", "Commitment-Hesitant"
+        ]
+    },
+    "ESTP": {
+        "summary": "You bring excitement, spontaneity and playfulness to relationships. You love sharing adventures and living in the moment, and you do best with partners who enjoy your energy and give you room to roam.",
+        "strengths": [
+            "Fun-Loving", "Spontaneous", "Confident", 
+            "Generous", "Perceptive", "Adventurous"
+        ],
+        "weaknesses": [
+            "Impatient", "Easily Bored", "Commitment-Wary", 
+            "Blunt", "Impulsive", "Avoids Deep Talks"
+        ]
+    },
+    "ESFP": {
+        "summary": "You are a warm, affectionate and fun-loving partner who makes every day feel like an occasion. You show love through attention, generosity and shared experiences, and you want a relationship full of laughter and closeness.",
+        "strengths": [
+            "Affectionate", "Playful", "Generous", 
+            "Warm", "Supportive", "Attentive"
+        ],
+        "weaknesses": [
+            "Impulsive", "Conflict-Avoidant", "Easily Bored", 
+            "Sensitive", "Short-Term Focused", "Needs Attention"
+        ]
+    },
+    "ENFP": {
+        "summary": "You approach relationships with enthusiasm, warmth and a desire for deep connection. You love exploring ideas and dreams with your partner, and you thrive when a relationship keeps growing and surprising you.",
+        "strengths": [
+            "Enthusiastic", "Affectionate", "Supportive", 
+            "Open-Minded", "Imaginative", "Encouraging"
+        ],
+        "weaknesses": [
+            "Restless", "Idealistic", "Overthinking", 
+            "Easily Distracted", "Sensitive", "Needs Reassurance"
+        ]
+    },
+    "ENTP": {
+        "summary": "You want a partner who can keep up with your mind and enjoys a spirited debate. You bring humor, novelty and endless ideas to relationships, though you may need to work on consistency and sensitivity to your partner's feelings.",
+        "strengths": [
+            "Witty", "Enthusiastic", "Open-Minded", 
+            "Spontaneous", "Growth-Oriented", "Engaging"
+        ],
+        "weaknesses": [
+            "Argumentative", "Inconsistent", "Insensitive", 
+            "Easily Bored", "Restless", "Avoids Routine"
+        ]
+    },
+    "ESTJ": {
+        "summary": "You take relationships seriously and show love through commitment, stability and getting things done for the people you care about. You value honesty and clear expectations, and you appreciate partners who share your sense of responsibility.",
+        "strengths": [
+            "Committed", "Dependable", "Honest", 
+            "Protective", "Responsible", "Direct"
+        ],
+        "weaknesses": [
+            "Controlling", "Inflexible", "Blunt", 
+            "Impatient", "Undemonstrative", "Judgmental"
+        ]
+    },
+    "ESFJ": {
+        "summary": "You are a warm, devoted partner who puts great energy into creating harmony and making your loved ones feel cared for. You value tradition, thoughtful gestures and open appreciation, and you want a partner who reciprocates that care.",
+        "strengths": [
+            "Caring", "Loyal", "Generous", 
+            "Attentive", "Warm", "Dependable"
+        ],
+        "weaknesses": [
+            "Approval-Seeking", "Conflict-Avoidant", "Sensitive to Criticism", 
+            "Controlling", "Self-Neglecting", "Needs Reassurance"
+        ]
+    },
+    "ENFJ": {
+        "summary": "You are a passionate, supportive partner who invests deeply in your loved one's happiness and growth. You communicate openly and seek meaningful connection, though you can lose yourself in meeting others' needs.",
+        "strengths": [
+            "Supportive", "Warm", "Communicative", 
+            "Devoted", "Encouraging", "Empathetic"
+        ],
+        "weaknesses": [
+            "Self-Sacrificing", "Overly Involved", "Idealistic", 
+            "Approval-Seeking", "Sensitive", "Smothering"
+        ]
+    },
+    "ENTJ": {
+        "summary": "You approach relationships with the same commitment and drive you bring to your goals. You value honesty, growth and a partner who is your equal, and you show love by building a strong, shared future.",
+        "strengths": [
+            "Committed", "Honest", "Growth-Oriented", 
+            "Protective", "Confident", "Dependable"
+        ],
+        "weaknesses": [
+            "Domineering", "Impatient", "Blunt", 
+            "Workaholic", "Dismissive of Feelings", "Competitive"
+        ]
+    },
+    "DEFAULT": {
+        "summary": "You approach relationships with a unique blend of your personality traits, seeking connections that align with your core values and personal growth. Your approach to partnerships is nuanced, balancing emotional needs with individual aspirations.",
+        "strengths": [
+            "Authentic", "Caring", "Adaptable", 
+            "Committed", "Understanding"
+        ],
+        "weaknesses": [
+            "Complex", "Challenging", "Nuanced", 
+            "Evolving", "Introspective"
+        ]
+    }
+}
+
+# Shape the LLM must return for its insights to replace the static ones
+RELATIONSHIP_SCHEMA = {
+    "summary": str,
+    "strengths": list,
+    "weaknesses": list
+}
+
+# Create prompt template
+RELATIONSHIP_PROMPT = PromptTemplate(
+    input_variables=["mbti_type", "conversation_context"],
+    template=RELATIONSHIP_TEMPLATE
+)
+
+
+class RelationshipInsightsGenerator:
+    def __init__(self, mode=None):
         """
+        Initialize the relationship insights generator with the shared LLM components.
         
-        # Predefined relationship insights for MBTI types
-        self.relationship_insights = {
-            "INTJ": {
-                "summary": "You gravitate towards intellectual pursuits and find comfort in structured, analytical environments. In relationships, you seek partners who can match your depth of curiosity while accepting your need for mental stimulation over physical activity. Your perfectionist tendencies extend beyond work into personal goals, but you maintain a healthy self-image despite acknowledging areas for improvement.",
-                "strengths": [
-                    "Accepting", "Patient", "Authentic", 
-                    "Observant", "Loyal", "Supportive"
-                ],
-                "weaknesses": [
-                    "Reserved", "Distant", "Self-conscious", 
-                    "Analytical", "Perfectionistic", "Challenging to read"
-                ]
-            },
-            "INFJ": {
-                "summary": "You seek deep, meaningful connections that transcend surface-level interactions. Relationships for you are about emotional depth, mutual growth, and shared values. You're naturally intuitive, often sensing your partner's unspoken needs while maintaining a delicate balance between empathy and personal boundaries.",
-                "strengths": [
-                    "Empathetic", "Insightful", "Supportive", 
-                    "Compassionate", "Deep", "Committed"
-                ],
-                "weaknesses": [
-                    "Idealistic", "Sensitive", "Overanalyzing", 
-                    "People-pleasing", "Conflict-avoidant", "Emotionally intense"
-                ]
-            },
-            # Add more MBTI types as needed
-            "DEFAULT": {
-                "summary": "You approach relationships with a unique blend of your personality traits, seeking connections that align with your core values and personal growth. Your approach to partnerships is nuanced, balancing emotional needs with individual aspirations.",
-                "strengths": [
-                    "Authentic", "Caring", "Adaptable", 
-                    "Committed", "Understanding"
-                ],
-                "weaknesses": [
-                    "Complex", "Challenging", "Nuanced", 
-                    "Evolving", "Introspective"
-                ]
-            }
-        }
-        
-        # Create prompt template
-        self.prompt = PromptTemplate(
-            input_variables=["mbti_type", "conversation_context"],
-            template=self.insights_template
-        )
-        
-        # Create LLM chain
-        self.chain = LLMChain(llm=self.llm, prompt=self.prompt)
+        Args:
+            mode (str, optional): 'static' serves the predefined insights with no
+                network call, 'llm' asks the model for personalized insights and
+                falls back to the static ones if its JSON doesn't validate, and
+                'hybrid' returns the static insights immediately and pushes the
+                personalized version later. Defaults to the MBTI_INSIGHTS_MODE
+                environment variable or 'static'.
+        """
+        self.mode = (mode or os.environ.get("MBTI_INSIGHTS_MODE", "static")).lower()
+        if self.mode not in ("static", "llm", "hybrid"):
+            raise ValueError(f"Invalid insights mode: {self.mode}")
+        
+        # Check for OpenAI API key
+        if api_key_missing():
+            print("ERROR: OPENAI_API_KEY environment variable is not set.")
+            print("Please set it in the .env file or as an environment variable.")
+            sys.exit(1)
+        
+        # Setup the shared OpenAI model
+        self.llm = get_llm(temperature=0.7, streaming=False)
+        
+        self.insights_template = RELATIONSHIP_TEMPLATE
+        self.relationship_insights = RELATIONSHIP_INSIGHTS
+        self.insights_schema = RELATIONSHIP_SCHEMA
+        self.prompt = RELATIONSHIP_PROMPT
+        
+        # Shared LLM chain
+        self.chain = get_chain(self.prompt, temperature=0.7, streaming=False)
     
-    def generate_relationship_insights(self, mbti_type, conversation, max_context_length=500):
+    def generate_relationship_insights(self, mbti_type, conversation, max_context_length=500, on_update=None):
         """
         Generate relationship insights for a specific MBTI type.
         
@@ -96,10 +280,18 @@ class RelationshipInsightsGenerator:
             mbti_type (str): The MBTI personality type
             conversation (ConversationChain): The conversation chain to extract context
             max_context_length (int, optional): Maximum length of context to include. Defaults to 500.
+            on_update (callable, optional): In hybrid mode, called with the
+                personalized insights once they are ready
         
         Returns:
             dict: Detailed relationship insights
         """
+        # Use predefined insights or default
+        insights = self.relationship_insights.get(mbti_type, self.relationship_insights["DEFAULT"])
+        
+        if self.mode == "static":
+            return insights
+        
         # Extract conversation context
         try:
             conversation_context = conversation.memory.chat_memory.messages[-5:]
@@ -108,20 +300,38 @@ class RelationshipInsightsGenerator:
         except Exception:
             context_str = "No specific context available"
         
-        # Use predefined insights or default
-        insights = self.relationship_insights.get(mbti_type, self.relationship_insights["DEFAULT"])
+        if self.mode == "llm":
+            return self._personalize(mbti_type, context_str, insights)
+        
+        # Hybrid: answer with the static insights now, personalize in the background
+        if on_update is not None:
+            def push_update():
+                personalized = self._personalize(mbti_type, context_str, insights)
+                if personalized is not insights:
+                    on_update(personalized)
+            submit_background(push_update)
         
-        # Try to generate more personalized insights using LLM
+        return insights
+    
+    def _personalize(self, mbti_type, context_str, fallback):
+        """Ask the LLM for personalized insights, returning the fallback if they don't validate."""
         try:
             llm_result = self.chain.run(
                 mbti_type=mbti_type, 
                 conversation_context=context_str
             )
-            # Additional processing of LLM result could be added here
         except Exception as e:
             print(f"LLM insights generation failed: {e}")
+            increment("mbti_fallbacks_total", section="relationship", reason="error")
+            return fallback
         
-        return insights
+        personalized = extract_json(llm_result)
+        if not validate_schema(personalized, self.insights_schema):
+            print("LLM relationship insights did not match the expected schema, using static insights")
+            increment("mbti_fallbacks_total", section="relationship", reason="invalid")
+            return fallback
+        
+        return {key: personalized[key] for key in self.insights_schema}
     
     def format_relationship_insights(self, insights):
         """
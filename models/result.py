@@ -0,0 +1,141 @@
+import json
+import re
+from dataclasses import asdict, dataclass, field
+
+_LIST_MARKER = re.compile(r"^\s*(?:\d+[\.\):]|[-*•](?=\s))\s*")
+_CATEGORY_HEADING = re.compile(r"^[#*\s]*(music|books?|movies?|films?)[*\s]*:?[*\s]*(.*)$", re.IGNORECASE)
+_NAME_SEPARATOR = re.compile(r":\s+|\s+[-–—]\s+")
+_CATEGORY_NAMES = {"music": "music", "book": "books", "books": "books",
+                   "movie": "movies", "movies": "movies", "film": "movies", "films": "movies"}
+
+
+def _clean(text):
+    """Strip markdown emphasis and surrounding whitespace."""
+    return text.replace("**", "").strip()
+
+
+def split_recommendations(text):
+    """
+    Split the recommendation generator's reply into its three categories.
+
+    Returns:
+        dict: ``music``, ``books`` and ``movies`` lists of recommendation strings
+    """
+    categories = {"music": [], "books": [], "movies": []}
+    current = None
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        heading = _CATEGORY_HEADING.match(line)
+        if heading and not _LIST_MARKER.match(line):
+            current = _CATEGORY_NAMES[heading.group(1).lower()]
+            line = heading.group(2)
+            if not line.strip():
+                continue
+        if current is None:
+            continue
+        if _LIST_MARKER.match(line) or not categories[current]:
+            categories[current].append(_clean(_LIST_MARKER.sub("", line)))
+        else:
+            # Continuation of the previous recommendation's description
+            categories[current][-1] += " " + _clean(line)
+    return categories
+
+
+def parse_doppelgangers(text):
+    """
+    Turn the doppelganger generator's reply into name/description pairs.
+
+    Returns:
+        list: Dicts with ``name`` and ``description`` keys
+    """
+    doppelgangers = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        if _LIST_MARKER.match(line):
+            item = _clean(_LIST_MARKER.sub("", line))
+            parts = _NAME_SEPARATOR.split(item, maxsplit=1)
+            if len(parts) == 2:
+                doppelgangers.append({"name": parts[0].strip(), "description": parts[1].strip()})
+            else:
+                doppelgangers.append({"name": "", "description": item})
+        elif doppelgangers:
+            # Continuation of the previous celebrity's description
+            doppelgangers[-1]["description"] = (doppelgangers[-1]["description"] + " " + _clean(line)).strip()
+    if not doppelgangers and text and text.strip():
+        doppelgangers.append({"name": "", "description": _clean(text)})
+    return doppelgangers
+
+
+@dataclass
+class MBTIResult:
+    """Everything shown on the results page, one field per section."""
+
+    mbti_type: str
+    description: str
+    overview: str = ""
+    roast: str = ""
+    recommendations: dict = field(default_factory=lambda: {"music": [], "books": [], "movies": []})
+    doppelgangers: list = field(default_factory=list)
+    career: dict = field(default_factory=dict)
+    relationship: dict = field(default_factory=dict)
+
+    def to_dict(self):
+        """Return the result as plain JSON-serializable data."""
+        return asdict(self)
+
+    def to_json(self):
+        """Return the result encoded as Socket.IO puts it on the wire: compact, ASCII-escaped JSON."""
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def render_text(self):
+        """Render the result as plain prose for the voice path."""
+        parts = [spoken_section("type", {"mbti_type": self.mbti_type, "description": self.description})]
+        parts += [spoken_section(name, getattr(self, name)) for name in SPOKEN_SECTIONS[1:]]
+        return "\n\n".join(part for part in parts if part)
+
+
+# Sections in the order render_text() speaks them
+SPOKEN_SECTIONS = ("type", "overview", "roast", "recommendations", "doppelgangers", "relationship", "career")
+
+
+def spoken_section(name, content):
+    """
+    Render one result section as prose, e.g. to speak it as soon as it arrives.
+
+    Args:
+        name (str): Section name, as in SPOKEN_SECTIONS
+        content: The section's field on MBTIResult; for 'type', a dict with
+            ``mbti_type`` and ``description``
+
+    Returns:
+        str: The spoken text, or "" if the section is empty
+    """
+    if not content:
+        return ""
+    if name == "type":
+        text = f"Your MBTI personality type is {content['mbti_type']}.\n\n{content.get('description', '')}"
+    elif name == "overview":
+        text = "Overview. " + " ".join(
+            _clean(_LIST_MARKER.sub("", line)) for line in content.splitlines() if line.strip()
+        )
+    elif name == "roast":
+        text = "Roast. " + content
+    elif name == "recommendations":
+        text = "\n\n".join(
+            f"{category.capitalize()} recommendations. " + " ".join(content[category])
+            for category in ("music", "books", "movies") if content.get(category)
+        )
+    elif name == "doppelgangers":
+        text = "Your celebrity doppelgangers. " + " ".join(
+            f"{item['name']}: {item['description']}" if item.get("name") else item["description"]
+            for item in content
+        )
+    elif name == "relationship":
+        text = "Relationships. " + content["summary"] if content.get("summary") else ""
+    elif name == "career":
+        text = "Career. " + content["workplace"] + " " + content.get("perfect_career", "") if content.get("workplace") else ""
+    else:
+        return ""
+    return text.strip()
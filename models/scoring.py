@@ -0,0 +1,280 @@
+"""
+Incremental per-axis scoring of MBTI evidence.
+
+Each turn's analysis contributes one signed piece of evidence per axis:
++confidence for the axis' first letter (E, S, T, J), -confidence for the
+second. AxisScores keeps the running sum, spread and count of that evidence
+in one flat array and turns it into a posterior probability per letter, so
+the test can stop as soon as every axis is decided.
+
+Stored transcripts can be re-scored in bulk with NumPy for offline
+recalibration:
+
+    python -m models.scoring transcripts.jsonl --confidence 0.95
+"""
+import argparse
+import json
+import math
+import os
+from array import array
+
+# Only needed for batch scoring, so imported by _require_numpy() rather
+# than on every import of the live scorer
+np = None
+
+AXES = ("E-I", "S-N", "T-F", "J-P")
+
+# Per axis: signed score sum, sum of squared deviations, evidence count
+_FIELDS = 3
+
+
+def _prior_variance():
+    return float(os.environ.get("MBTI_SCORE_PRIOR_VARIANCE", 0.5))
+
+
+def axis_evidence(analysis):
+    """
+    Turn one analysis reply into signed evidence per axis.
+
+    Returns:
+        list: One float in [-1, 1] per axis in AXES order, or None where
+        the analysis has no usable entry for that axis
+    """
+    dimensions = (analysis or {}).get("dimension_analysis") or {}
+    evidence = []
+    for axis in AXES:
+        data = dimensions.get(axis)
+        first, second = axis.split("-")
+        if not isinstance(data, dict) or data.get("preference") not in (first, second):
+            evidence.append(None)
+            continue
+        try:
+            confidence = min(1.0, max(0.0, float(data.get("confidence", 0))))
+        except (TypeError, ValueError):
+            evidence.append(None)
+            continue
+        evidence.append(confidence if data["preference"] == first else -confidence)
+    return evidence
+
+
+def posterior(mean, variance, count, prior_variance):
+    """Probability that an axis' true lean is toward its first letter."""
+    if count == 0:
+        return 0.5
+    standard_error = math.sqrt((variance + prior_variance) / count)
+    return 0.5 * (1 + math.erf(mean / (standard_error * math.sqrt(2))))
+
+
+class AxisScores:
+    def __init__(self, prior_variance=None):
+        """
+        Running evidence for the four MBTI axes.
+
+        Args:
+            prior_variance (float, optional): Variance assumed for every turn's
+                evidence on top of the observed spread, so a couple of
+                emphatic answers can't settle an axis on their own. Defaults
+                to MBTI_SCORE_PRIOR_VARIANCE or 0.5.
+        """
+        self.prior_variance = _prior_variance() if prior_variance is None else prior_variance
+        self.values = array("d", [0.0] * (len(AXES) * _FIELDS))
+
+    def update(self, analysis):
+        """Fold one turn's analysis into the scores."""
+        for index, evidence in enumerate(axis_evidence(analysis)):
+            if evidence is not None:
+                self.add(index, evidence)
+
+    def add(self, index, evidence):
+        """Add one piece of signed evidence to an axis (Welford's update)."""
+        base = index * _FIELDS
+        score, m2, count = self.values[base:base + _FIELDS]
+        old_mean = score / count if count else 0.0
+        count += 1
+        new_mean = old_mean + (evidence - old_mean) / count
+        self.values[base] = score + evidence
+        self.values[base + 1] = m2 + (evidence - old_mean) * (evidence - new_mean)
+        self.values[base + 2] = count
+
+    def probability(self, index):
+        """Posterior probability of the axis' first letter."""
+        base = index * _FIELDS
+        score, m2, count = self.values[base:base + _FIELDS]
+        if not count:
+            return 0.5
+        variance = m2 / (count - 1) if count > 1 else 0.0
+        return posterior(score / count, variance, count, self.prior_variance)
+
+    def probabilities(self):
+        """Posterior probability of every letter."""
+        result = {}
+        for index, axis in enumerate(AXES):
+            first, second = axis.split("-")
+            p = self.probability(index)
+            result[first] = p
+            result[second] = 1 - p
+        return result
+
+    def confidence(self):
+        """Probability of the leading letter on each axis, keyed by axis."""
+        return {
+            axis: round(max(p, 1 - p), 3)
+            for axis, p in ((axis, self.probability(index)) for index, axis in enumerate(AXES))
+        }
+
+    def is_decisive(self, threshold):
+        """Whether every axis' leading letter has reached the threshold probability."""
+        return all(max(p, 1 - p) >= threshold for p in map(self.probability, range(len(AXES))))
+
+    def mbti_type(self):
+        """The four-letter type; ties go to the second letter of an axis."""
+        letters = ""
+        for index, axis in enumerate(AXES):
+            first, second = axis.split("-")
+            letters += first if self.probability(index) > 0.5 else second
+        return letters
+
+    def to_list(self):
+        """Raw scores, for serialization."""
+        return list(self.values)
+
+    @classmethod
+    def from_list(cls, values, prior_variance=None):
+        """Rebuild scores from to_list() output."""
+        scores = cls(prior_variance)
+        scores.values = array("d", values)
+        return scores
+
+
+def evidence_matrix(transcripts):
+    """
+    Stack stored transcripts into one evidence array.
+
+    Args:
+        transcripts (list): Each a list of analysis dicts, one per turn
+
+    Returns:
+        numpy.ndarray: Shape (transcripts, max turns, 4), NaN where a turn
+        or axis has no evidence
+    """
+    _require_numpy()
+    max_turns = max((len(turns) for turns in transcripts), default=0)
+    matrix = np.full((len(transcripts), max_turns, len(AXES)), np.nan)
+    for row, turns in enumerate(transcripts):
+        for turn, analysis in enumerate(turns):
+            matrix[row, turn] = [np.nan if value is None else value for value in axis_evidence(analysis)]
+    return matrix
+
+
+def batch_posteriors(evidence, prior_variance=None):
+    """
+    Posterior of each axis' first letter after every turn, for many transcripts at once.
+
+    Args:
+        evidence (numpy.ndarray): Output of evidence_matrix()
+        prior_variance (float, optional): As for AxisScores
+
+    Returns:
+        numpy.ndarray: Same shape as evidence; entry [i, t, a] is the
+        posterior for transcript i, axis a after turn t
+    """
+    _require_numpy()
+    prior_variance = _prior_variance() if prior_variance is None else prior_variance
+    present = ~np.isnan(evidence)
+    values = np.where(present, evidence, 0.0)
+    count = np.cumsum(present, axis=1)
+    total = np.cumsum(values, axis=1)
+    squares = np.cumsum(values ** 2, axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, total / count, 0.0)
+        variance = np.where(count > 1, (squares - total * mean) / (count - 1), 0.0)
+        z = mean / np.sqrt((np.maximum(variance, 0.0) + prior_variance) / np.maximum(count, 1))
+    return np.where(count > 0, 0.5 * (1 + _erf(z / math.sqrt(2))), 0.5)
+
+
+def batch_results(evidence, threshold, min_turns=0, prior_variance=None):
+    """
+    Final type and stopping turn for each transcript under a stopping rule.
+
+    Returns:
+        list: (mbti_type, turns needed or None if never decisive) per transcript
+    """
+    probabilities = batch_posteriors(evidence, prior_variance)
+    confident = np.maximum(probabilities, 1 - probabilities).min(axis=2) >= threshold
+    confident[:, :min_turns - 1 if min_turns > 0 else 0] = False
+
+    results = []
+    for row in range(evidence.shape[0]):
+        answered = np.flatnonzero(~np.isnan(evidence[row]).all(axis=1))
+        last = int(answered[-1]) if answered.size else 0
+        decided = np.flatnonzero(confident[row, :last + 1])
+        stop = int(decided[0]) if decided.size else last
+        final = probabilities[row, stop] if evidence.shape[1] else np.full(len(AXES), 0.5)
+        letters = "".join(
+            axis[0] if p > 0.5 else axis[2] for axis, p in zip(AXES, final)
+        )
+        results.append((letters, stop + 1 if decided.size else None))
+    return results
+
+
+# Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7
+_ERF_P = 0.3275911
+_ERF_A = (0.254829592, -0.284496736, 1.421413741, -1.453152027, 1.061405429)
+
+
+def _erf(x):
+    """Element-wise erf of an array: SciPy's when installed, else a closed-form approximation."""
+    try:
+        from scipy.special import erf
+    except ImportError:
+        pass
+    else:
+        return erf(x)
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + _ERF_P * x)
+    polynomial = t * (_ERF_A[0] + t * (_ERF_A[1] + t * (_ERF_A[2] + t * (_ERF_A[3] + t * _ERF_A[4]))))
+    return sign * (1.0 - polynomial * np.exp(-x * x))
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("Batch scoring needs NumPy: pip install numpy")
+        np = numpy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored transcripts under a stopping rule.")
+    parser.add_argument("transcripts", help="JSONL file, one {\"id\", \"turns\": [{\"analysis\": {...}}]} per line")
+    parser.add_argument("--confidence", type=float, default=float(os.environ.get("MBTI_STOP_CONFIDENCE", 0.95)),
+                        help="Stop once every axis reaches this probability")
+    parser.add_argument("--min-turns", type=int, default=int(os.environ.get("MBTI_MIN_TURNS", 4)))
+    parser.add_argument("--prior-variance", type=float, default=None)
+    args = parser.parse_args()
+
+    ids, transcripts = [], []
+    with open(args.transcripts, encoding="utf-8") as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            ids.append(record.get("id", number))
+            transcripts.append([turn.get("analysis") for turn in record.get("turns", [])])
+
+    results = batch_results(evidence_matrix(transcripts), args.confidence, args.min_turns, args.prior_variance)
+    decided = [turns for _, turns in results if turns is not None]
+    for transcript_id, (mbti_type, turns) in zip(ids, results):
+        print(f"{transcript_id}\t{mbti_type}\t{turns if turns is not None else 'undecided'}")
+    print(
+        f"transcripts: {len(results)}  decided: {len(decided)}  "
+        f"mean turns to decide: {sum(decided) / len(decided) if decided else 0:.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
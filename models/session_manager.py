@@ -0,0 +1,238 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .session_store import open_session_store
+
+
+class TurnLock:
+    def __init__(self):
+        """
+        A lock that admits holders in the order they asked for it.
+
+        A plain lock wakes an arbitrary waiter, so two queued messages from
+        one client could be processed out of order; tickets keep them FIFO.
+        """
+        self.condition = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+
+    @contextmanager
+    def hold(self):
+        with self.condition:
+            ticket = self.next_ticket
+            self.next_ticket += 1
+            while self.serving != ticket:
+                self.condition.wait()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.serving += 1
+                self.condition.notify_all()
+
+
+class SessionManager:
+    def __init__(self, factory, max_sessions=None, idle_ttl=None, store=None):
+        """
+        Keep one lazily-created analyzer per test-taker in a bounded LRU/TTL store.
+
+        Sessions are keyed by a resumable session token. Socket.IO sids are
+        mapped onto tokens so a client that reconnects with its token picks
+        up the same conversation.
+
+        With a shared store (multi-worker mode) the local analyzers are a
+        cache: each one is refreshed from the store when another worker has
+        saved a newer state, and save() writes it back after every turn, so
+        any worker can serve any turn.
+
+        Args:
+            factory (callable): Zero-argument callable building a new analyzer
+            max_sessions (int, optional): Maximum number of live sessions.
+                Defaults to the MBTI_MAX_SESSIONS environment variable or 5000.
+            idle_ttl (float, optional): Seconds of inactivity before a session
+                is evicted. Defaults to MBTI_SESSION_TTL or 1800.
+            store (optional): Shared session store. Defaults to the one named
+                by MBTI_SESSION_STORE, if any.
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions or int(os.environ.get("MBTI_MAX_SESSIONS", 5000))
+        self.idle_ttl = idle_ttl or float(os.environ.get("MBTI_SESSION_TTL", 1800))
+        self.store = store if store is not None else open_session_store(ttl=self.idle_ttl)
+
+        # token -> [analyzer or None, last access time, bound sids, stored
+        # version the analyzer reflects, TurnLock], oldest first
+        self.sessions = OrderedDict()
+
+        # Socket.IO sid -> session token
+        self.sid_tokens = {}
+
+        self.lock = threading.Lock()
+
+    def connect(self, sid, token=None):
+        """
+        Bind a Socket.IO sid to a session token.
+
+        An unknown or missing token starts a fresh session; the analyzer itself
+        is only built on the first message.
+
+        Returns:
+            str: The session token the client should reuse on reconnect
+        """
+        with self.lock:
+            self._evict_expired()
+            if token and token not in self.sessions and self.store is not None and self.store.exists(token):
+                # Started on another worker
+                self._create(token)
+            if not token or token not in self.sessions:
+                token = self._create()
+            else:
+                self._touch(token)
+            self._bind(sid, token)
+            return token
+
+    def disconnect(self, sid):
+        """Forget the sid mapping; the session itself stays resumable until evicted."""
+        with self.lock:
+            token = self.sid_tokens.pop(sid, None)
+            if token in self.sessions:
+                self.sessions[token][2].discard(sid)
+
+    def get_analyzer(self, sid):
+        """Return the analyzer for a sid, creating the session and analyzer if needed."""
+        with self.lock:
+            self._evict_expired()
+            token = self.sid_tokens.get(sid)
+            if token is None or token not in self.sessions:
+                token = self._create()
+                self._bind(sid, token)
+
+            entry = self.sessions[token]
+            self._touch(token)
+            analyzer = entry[0]
+
+        if analyzer is None:
+            # Build outside the lock so a slow construction doesn't stall other sessions
+            analyzer = self.factory()
+            with self.lock:
+                if entry[0] is None:
+                    entry[0] = analyzer
+                analyzer = entry[0]
+
+        if self.store is not None:
+            stored = self.store.load(token)
+            if stored is not None and stored[1] > entry[3]:
+                analyzer.load_state(stored[0])
+                entry[3] = stored[1]
+        return analyzer
+
+    def turn(self, sid):
+        """
+        Serialize a session's turns.
+
+        Use as ``with session_manager.turn(sid):`` around everything a turn
+        does. A client's overlapping messages (a typed answer racing a voice
+        one, or a burst after a reconnect) then run one at a time, in the
+        order they arrived, while other sessions proceed concurrently. The
+        lock is per process; a client's socket stays on one worker.
+        """
+        with self.lock:
+            token = self.sid_tokens.get(sid)
+            if token is None or token not in self.sessions:
+                token = self._create()
+                self._bind(sid, token)
+            turn_lock = self.sessions[token][4]
+        return turn_lock.hold()
+
+    def save(self, sid):
+        """Write a session's analyzer state to the shared store, if there is one."""
+        if self.store is None:
+            return
+        with self.lock:
+            token = self.sid_tokens.get(sid)
+            entry = self.sessions.get(token)
+        if entry is None or entry[0] is None:
+            return
+        entry[3] = self.store.save(token, entry[0].to_state())
+
+    def saver(self, sid):
+        """
+        Return a callable that saves a session's state later, e.g. after a
+        background update to its result.
+
+        It waits for any turn in progress, so it never writes a half-done
+        turn, and keeps working after the sid has disconnected.
+        """
+        with self.lock:
+            token = self.sid_tokens.get(sid)
+
+        def save():
+            if self.store is None:
+                return
+            with self.lock:
+                entry = self.sessions.get(token)
+            if entry is None or entry[0] is None:
+                return
+            with entry[4].hold():
+                entry[3] = self.store.save(token, entry[0].to_state())
+        return save
+
+    def get_token(self, sid):
+        """Return the session token bound to a sid, if any."""
+        return self.sid_tokens.get(sid)
+
+    def evict_idle(self):
+        """Drop sessions that have been idle longer than the TTL."""
+        with self.lock:
+            return self._evict_expired()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _create(self, token=None):
+        """Register a new, still empty session. Caller must hold the lock."""
+        token = token or secrets.token_urlsafe(16)
+        self.sessions[token] = [None, time.time(), set(), 0, TurnLock()]
+        self._evict_overflow()
+        return token
+
+    def _bind(self, sid, token):
+        """Point a sid at a session. Caller must hold the lock."""
+        previous = self.sid_tokens.get(sid)
+        if previous in self.sessions:
+            self.sessions[previous][2].discard(sid)
+        self.sid_tokens[sid] = token
+        self.sessions[token][2].add(sid)
+
+    def _touch(self, token):
+        """Mark a session as most recently used."""
+        self.sessions[token][1] = time.time()
+        self.sessions.move_to_end(token)
+
+    def _evict_expired(self):
+        """Evict sessions past the idle TTL. Caller must hold the lock."""
+        cutoff = time.time() - self.idle_ttl
+        evicted = 0
+        while self.sessions:
+            token, (_, last_access, _, _, _) = next(iter(self.sessions.items()))
+            if last_access >= cutoff:
+                break
+            self._drop(token)
+            evicted += 1
+        return evicted
+
+    def _evict_overflow(self):
+        """Evict least recently used sessions above the cap. Caller must hold the lock."""
+        while len(self.sessions) > self.max_sessions:
+            token = next(iter(self.sessions))
+            self._drop(token)
+
+    def _drop(self, token):
+        """Remove a session and every sid pointing at it."""
+        entry = self.sessions.pop(token, None)
+        if entry is not None:
+            for sid in entry[2]:
+                self.sid_tokens.pop(sid, None)
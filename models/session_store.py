@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteSessionStore:
+    def __init__(self, path, ttl):
+        """
+        Serialized analyzer state shared by every worker process on a host.
+
+        A stand-in for Redis when the workers share a filesystem, e.g. tests
+        and single-machine deployments.
+
+        Args:
+            path (str): SQLite database path
+            ttl (float): Seconds an untouched session is kept
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.connection:
+            # WAL lets readers in other processes proceed while one writes
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sessions (
+                    token TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at)")
+
+    def load(self, token):
+        """Return (state, version) for a token, or None if it is unknown or expired."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT state, version FROM sessions WHERE token = ? AND updated_at >= ?",
+                (token, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def exists(self, token):
+        return self.load(token) is not None
+
+    def save(self, token, state):
+        """Store a session's state and return its new version."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO sessions (token, state, version, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(token) DO UPDATE SET state = excluded.state, "
+                "version = sessions.version + 1, updated_at = excluded.updated_at",
+                (token, json.dumps(state), now)
+            )
+            self.connection.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+            return self.connection.execute(
+                "SELECT version FROM sessions WHERE token = ?", (token,)
+            ).fetchone()[0]
+
+
+class RedisSessionStore:
+    def __init__(self, url, ttl):
+        """
+        Serialized analyzer state shared by worker processes across hosts.
+
+        Args:
+            url (str): redis:// URL
+            ttl (float): Seconds an untouched session is kept
+        """
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    def _key(self, token):
+        return f"mbti:session:{token}"
+
+    def load(self, token):
+        """Return (state, version) for a token, or None if it is unknown or expired."""
+        state, version = self.client.hmget(self._key(token), "state", "version")
+        if state is None:
+            return None
+        return json.loads(state), int(version)
+
+    def exists(self, token):
+        return bool(self.client.exists(self._key(token)))
+
+    def save(self, token, state):
+        """Store a session's state and return its new version."""
+        key = self._key(token)
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, "state", json.dumps(state))
+        pipeline.hincrby(key, "version", 1)
+        pipeline.expire(key, self.ttl)
+        return pipeline.execute()[1]
+
+
+def open_session_store(url=None, ttl=None):
+    """
+    Open the shared session store named by MBTI_SESSION_STORE.
+
+    Args:
+        url (str, optional): ``sqlite:///path/to/sessions.sqlite3`` or
+            ``redis://host:port/db``. Defaults to MBTI_SESSION_STORE.
+        ttl (float, optional): Defaults to MBTI_SESSION_TTL or 1800.
+
+    Returns:
+        The store, or None when unset (single-process, in-memory sessions)
+    """
+    url = url or os.environ.get("MBTI_SESSION_STORE")
+    if not url:
+        return None
+    ttl = ttl or float(os.environ.get("MBTI_SESSION_TTL", 1800))
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):], ttl)
+    if url.startswith(("redis://", "rediss://")):
+        return RedisSessionStore(url, ttl)
+    raise ValueError(f"Unsupported MBTI_SESSION_STORE: {url}")
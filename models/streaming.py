@@ -0,0 +1,28 @@
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+class SectionTokenHandler(BaseCallbackHandler):
+    def __init__(self, section, on_token):
+        """
+        Forward streamed LLM tokens for one result section.
+
+        Args:
+            section (str): Name of the result section being generated
+            on_token (callable): Called as on_token(section, token) per new token
+        """
+        self.section = section
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, **kwargs):
+        """Relay each token as soon as the model produces it."""
+        try:
+            self.on_token(self.section, token)
+        except Exception as e:
+            print(f"Error streaming token for section '{self.section}': {e}")
+
+
+def section_callbacks(section, on_token):
+    """Build the callbacks list for a section, or None when not streaming."""
+    if on_token is None:
+        return None
+    return [SectionTokenHandler(section, on_token)]
@@ -0,0 +1,383 @@
+import json
+import os
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .concurrency import run_blocking
+from .metrics import timer
+
+# Browser audio arrives as 16-bit little-endian mono PCM
+SAMPLE_WIDTH = 2
+
+
+def frame_energy(frame):
+    """Root-mean-square amplitude of a block of 16-bit PCM."""
+    samples = array("h", frame)
+    if not samples:
+        return 0.0
+    return (sum(sample * sample for sample in samples) / len(samples)) ** 0.5
+
+
+class Endpointer:
+    def __init__(self, sample_rate, frame_ms=30, silence_ms=None, max_seconds=None,
+                 min_energy=None, start_frames=3, pre_roll_ms=300):
+        """
+        Energy-based voice activity detection that cuts a PCM stream into utterances.
+
+        The threshold tracks the background noise level, so a quiet room and
+        a noisy one both work. An utterance starts after start_frames voiced
+        frames in a row (keeping pre_roll_ms of audio from before it, so the
+        first syllable isn't clipped) and ends after silence_ms of silence or
+        max_seconds of speech.
+
+        Args:
+            sample_rate (int): Samples per second of the incoming audio
+            frame_ms (int, optional): Analysis frame length. Defaults to 30.
+            silence_ms (int, optional): Trailing silence that ends an utterance.
+                Defaults to MBTI_VAD_SILENCE_MS or 700.
+            max_seconds (float, optional): Longest utterance before it is cut.
+                Defaults to MBTI_VAD_MAX_SECONDS or 15.
+            min_energy (float, optional): Energy floor below which a frame is
+                never speech. Defaults to MBTI_VAD_MIN_ENERGY or 300.
+            start_frames (int, optional): Voiced frames needed to start an utterance.
+            pre_roll_ms (int, optional): Audio kept from before the start.
+        """
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * SAMPLE_WIDTH * frame_ms // 1000
+        self.silence_frames = int(os.environ.get("MBTI_VAD_SILENCE_MS", 700) if silence_ms is None else silence_ms) // frame_ms
+        self.max_bytes = int(
+            float(os.environ.get("MBTI_VAD_MAX_SECONDS", 15) if max_seconds is None else max_seconds)
+            * sample_rate * SAMPLE_WIDTH
+        )
+        self.min_energy = float(os.environ.get("MBTI_VAD_MIN_ENERGY", 300) if min_energy is None else min_energy)
+        self.start_frames = start_frames
+
+        self.pending = bytearray()
+        self.pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self.noise_floor = None
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.speech = None
+
+    @property
+    def in_speech(self):
+        return self.speech is not None
+
+    def speech_so_far(self):
+        """The current utterance's audio, e.g. for a partial transcript."""
+        return bytes(self.speech) if self.speech is not None else b""
+
+    def feed(self, chunk):
+        """
+        Add audio and return the utterances it completed.
+
+        Returns:
+            list: PCM bytes of each utterance that ended within this chunk
+        """
+        self.pending.extend(chunk)
+        finished = []
+        while len(self.pending) >= self.frame_bytes:
+            frame = bytes(self.pending[:self.frame_bytes])
+            del self.pending[:self.frame_bytes]
+            utterance = self._frame(frame)
+            if utterance:
+                finished.append(utterance)
+        return finished
+
+    def flush(self):
+        """End the current utterance now, returning its audio (or None)."""
+        utterance = bytes(self.speech) if self.speech else None
+        self._reset()
+        return utterance
+
+    def _frame(self, frame):
+        energy = frame_energy(frame)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        voiced = energy >= max(self.min_energy, self.noise_floor * 3.0)
+
+        if self.speech is None:
+            # Only non-speech frames teach the noise floor
+            if not voiced:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+            self.pre_roll.append(frame)
+            self.voiced_run = self.voiced_run + 1 if voiced else 0
+            if self.voiced_run >= self.start_frames:
+                self.speech = bytearray(b"".join(self.pre_roll))
+                self.pre_roll.clear()
+                self.silent_run = 0
+            return None
+
+        self.speech.extend(frame)
+        self.silent_run = 0 if voiced else self.silent_run + 1
+        if self.silent_run >= self.silence_frames or len(self.speech) >= self.max_bytes:
+            return self.flush()
+        return None
+
+    def _reset(self):
+        self.speech = None
+        self.voiced_run = 0
+        self.silent_run = 0
+
+
+class GoogleRecognizer:
+    """Google's free web speech API through speech_recognition. Needs network access."""
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, pcm, sample_rate):
+        try:
+            return self.recognizer.recognize_google(self.sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH))
+        except self.sr.UnknownValueError:
+            return ""
+
+
+class SphinxRecognizer:
+    """CMU Sphinx through speech_recognition; offline, needs pocketsphinx installed."""
+
+    cpu_bound = True
+
+    def __init__(self):
+        import speech_recognition as sr
+
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def recognize(self, pcm, sample_rate):
+        try:
+            return self.recognizer.recognize_sphinx(self.sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH))
+        except self.sr.UnknownValueError:
+            return ""
+
+
+class VoskRecognizer:
+    """Vosk (Kaldi) offline recognition; needs vosk installed and a model at MBTI_VOSK_MODEL."""
+
+    cpu_bound = True
+
+    def __init__(self):
+        import vosk
+
+        path = os.environ.get("MBTI_VOSK_MODEL")
+        if not path:
+            raise ValueError("MBTI_STT_ENGINE=vosk needs MBTI_VOSK_MODEL set to a model directory")
+        self.vosk = vosk
+        self.model = vosk.Model(path)
+
+    def recognize(self, pcm, sample_rate):
+        # Recognizers are cheap next to the model and not thread-safe, so one per call
+        recognizer = self.vosk.KaldiRecognizer(self.model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+RECOGNIZERS = {
+    "google": GoogleRecognizer,
+    "sphinx": SphinxRecognizer,
+    "vosk": VoskRecognizer,
+}
+
+
+def get_recognizer(engine=None):
+    """
+    Build the speech recognizer named by MBTI_STT_ENGINE.
+
+    Args:
+        engine (str, optional): 'google' (default), 'sphinx' or 'vosk'
+
+    Returns:
+        An object with recognize(pcm, sample_rate) returning the transcript,
+        or "" when nothing intelligible was said; offline engines set
+        cpu_bound so they run off the green threads under eventlet
+    """
+    engine = (engine or os.environ.get("MBTI_STT_ENGINE", "google")).lower()
+    if engine not in RECOGNIZERS:
+        raise ValueError(f"Unsupported MBTI_STT_ENGINE: {engine}")
+    return RECOGNIZERS[engine]()
+
+
+class _Stream:
+    def __init__(self, sample_rate):
+        self.endpointer = Endpointer(sample_rate)
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        # Bumped per utterance so late partials of a finished one are dropped
+        self.utterance = 0
+        self.partial_busy = False
+        self.partial_at = 0
+        self.cancelled = False
+
+
+class STTPipeline:
+    def __init__(self, on_partial, on_final, recognizer=None, workers=None, max_pending=None,
+                 partial_interval=None, sessions=None):
+        """
+        Turn audio streamed from browsers into transcripts.
+
+        Each session's chunks go through its own Endpointer on the calling
+        thread, which is cheap; recognition runs on a bounded worker pool.
+        While someone is speaking, the utterance so far is re-recognized
+        every partial_interval seconds of audio for a partial transcript.
+        Partials are best-effort and skipped when the pool is busy; the
+        final transcript of every utterance is always recognized.
+
+        Args:
+            on_partial (callable): Called as on_partial(sid, text) with the
+                transcript of an utterance still in progress
+            on_final (callable): Called as on_final(sid, text) once an utterance ends
+            recognizer (optional): Object with recognize(pcm, sample_rate).
+                Defaults to get_recognizer(), built on first use.
+            workers (int, optional): Recognition workers. Defaults to
+                MBTI_STT_WORKERS or 4.
+            max_pending (int, optional): Recognition jobs allowed in flight
+                before partials are skipped. Defaults to twice the workers.
+            partial_interval (float, optional): Seconds of new speech between
+                partial transcripts; 0 disables them. Defaults to
+                MBTI_STT_PARTIAL_INTERVAL or 1.0.
+            sessions (optional): Registry of per-client voice state with
+                acquire(sid, holder) and release(sid, holder), e.g. the
+                VoiceProcessor. An open stream and each recognition in
+                flight hold a reference as 'stt'.
+        """
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.sessions = sessions
+        self.recognizer = recognizer
+        self.workers = workers or int(os.environ.get("MBTI_STT_WORKERS", 4))
+        self.max_pending = max_pending or self.workers * 2
+        self.partial_interval = float(
+            os.environ.get("MBTI_STT_PARTIAL_INTERVAL", 1.0) if partial_interval is None else partial_interval
+        )
+
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.executor = None
+
+    def start(self, sid, sample_rate=16000):
+        """
+        Open (or restart) a session's audio stream.
+
+        Raises:
+            ValueError: The sample rate is outside 8-48 kHz
+        """
+        sample_rate = int(sample_rate)
+        if not 8000 <= sample_rate <= 48000:
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+        with self.lock:
+            restarted = sid in self.streams
+            self.streams[sid] = _Stream(sample_rate)
+        if not restarted:
+            # A restarted stream keeps the reference the old one held
+            self._acquire(sid)
+
+    def feed(self, sid, chunk):
+        """Add a chunk of PCM audio to a session's stream."""
+        stream = self.streams.get(sid)
+        if stream is None or not isinstance(chunk, (bytes, bytearray)) or not chunk:
+            return
+        with stream.lock:
+            utterances = stream.endpointer.feed(chunk)
+            for utterance in utterances:
+                stream.utterance += 1
+                stream.partial_at = 0
+                self._submit(self._final, sid, stream, utterance)
+            self._maybe_partial(sid, stream)
+
+    def stop(self, sid):
+        """Close a session's stream, recognizing whatever was still being said."""
+        with self.lock:
+            stream = self.streams.pop(sid, None)
+        if stream is None:
+            return
+        with stream.lock:
+            utterance = stream.endpointer.flush()
+            stream.utterance += 1
+            if utterance:
+                self._submit(self._final, sid, stream, utterance)
+        self._release(sid)
+
+    def cancel(self, sid):
+        """Drop a session's stream and anything it was saying, e.g. on disconnect."""
+        with self.lock:
+            stream = self.streams.pop(sid, None)
+        if stream is not None:
+            with stream.lock:
+                stream.utterance += 1
+                stream.cancelled = True
+            self._release(sid)
+
+    def _maybe_partial(self, sid, stream):
+        """Queue a partial transcript if enough new speech arrived. Caller holds stream.lock."""
+        if self.partial_interval <= 0 or not stream.endpointer.in_speech or stream.partial_busy:
+            return
+        audio = stream.endpointer.speech_so_far()
+        step = int(self.partial_interval * stream.sample_rate * SAMPLE_WIDTH)
+        if len(audio) - stream.partial_at < step:
+            return
+        with self.lock:
+            if self.pending >= self.max_pending:
+                return
+        stream.partial_busy = True
+        stream.partial_at = len(audio)
+        self._submit(self._partial, sid, stream, audio, stream.utterance)
+
+    def _acquire(self, sid):
+        if self.sessions is not None:
+            self.sessions.acquire(sid, "stt")
+
+    def _release(self, sid):
+        if self.sessions is not None:
+            self.sessions.release(sid, "stt")
+
+    def _submit(self, job, sid, *args):
+        with self.lock:
+            self.pending += 1
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mbti-stt")
+        self._acquire(sid)
+        self.executor.submit(self._run, job, sid, *args)
+
+    def _run(self, job, sid, *args):
+        try:
+            job(sid, *args)
+        except Exception as e:
+            print(f"Error in speech recognition: {e}")
+        finally:
+            with self.lock:
+                self.pending -= 1
+            self._release(sid)
+
+    def _recognize(self, pcm, sample_rate):
+        if self.recognizer is None:
+            with self.lock:
+                if self.recognizer is None:
+                    self.recognizer = get_recognizer()
+        with timer("mbti_stage_seconds", stage="stt"):
+            if getattr(self.recognizer, "cpu_bound", False):
+                return run_blocking(self.recognizer.recognize, pcm, sample_rate).strip()
+            return self.recognizer.recognize(pcm, sample_rate).strip()
+
+    def _partial(self, sid, stream, audio, utterance):
+        try:
+            text = self._recognize(audio, stream.sample_rate)
+        finally:
+            with stream.lock:
+                stream.partial_busy = False
+        with stream.lock:
+            current = stream.utterance == utterance
+        if text and current:
+            self.on_partial(sid, text)
+
+    def _final(self, sid, stream, audio):
+        if stream.cancelled:
+            return
+        text = self._recognize(audio, stream.sample_rate)
+        if text and not stream.cancelled:
+            self.on_final(sid, text)
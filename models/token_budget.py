@@ -0,0 +1,57 @@
+# Loaded on the first count: tiktoken reads (or downloads) its encoding file
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    """
+    Count prompt tokens for gpt-3.5-turbo.
+
+    Uses tiktoken when it is installed, otherwise the usual ~4 characters
+    per token estimate.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def select_recent(entries, render, token_budget, max_entries):
+    """
+    Pick the most recent entries that fit a token budget.
+
+    Args:
+        entries (list): Entries in chronological order
+        render (callable): Turns one entry into its prompt text
+        token_budget (int): Maximum tokens for the selected entries
+        max_entries (int): Maximum number of entries to select
+
+    Returns:
+        tuple: (rendered texts in chronological order, number of older entries left out)
+    """
+    selected = []
+    used = 0
+    for entry in reversed(entries[-max_entries:] if max_entries else []):
+        text = render(entry)
+        tokens = count_tokens(text)
+        # Always keep the latest entry, even if it alone exceeds the budget
+        if selected and used + tokens > token_budget:
+            break
+        selected.append(text)
+        used += tokens
+    selected.reverse()
+    return selected, len(entries) - len(selected)
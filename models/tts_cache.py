@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "tts"
+)
+
+_KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def clip_key(text, lang, engine, voice):
+    """Hash everything that determines a synthesized clip into one key."""
+    payload = json.dumps([text, lang, engine, voice], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_clip_key(key):
+    """Whether a string looks like a clip key, e.g. before using it in a file path."""
+    return bool(_KEY_PATTERN.match(key or ""))
+
+
+class TTSCache:
+    def __init__(self, directory=None, max_memory_bytes=None, max_disk_bytes=None):
+        """
+        Content-addressed store of encoded speech clips.
+
+        Recently used clips are held in memory, least recently used evicted
+        first once max_memory_bytes is exceeded; every clip is also written
+        to a directory so it survives restarts and is shared by the workers
+        on a host. The directory is bounded too: once it exceeds
+        max_disk_bytes the clips least recently written or read are deleted,
+        so personalized replies don't accumulate forever while the fixed
+        ones, heard by every client, stay.
+
+        Args:
+            directory (str, optional): Clip directory. Defaults to the
+                MBTI_TTS_CACHE environment variable or cache/tts; 'off'
+                keeps clips in memory only.
+            max_memory_bytes (int, optional): Defaults to
+                MBTI_TTS_CACHE_MEMORY_MB (32) megabytes.
+            max_disk_bytes (int, optional): Defaults to
+                MBTI_TTS_CACHE_DISK_MB (512) megabytes.
+        """
+        directory = directory or os.environ.get("MBTI_TTS_CACHE", DEFAULT_CACHE_DIR)
+        self.directory = None if directory.lower() == "off" else directory
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self.max_memory_bytes = max_memory_bytes or int(
+            float(os.environ.get("MBTI_TTS_CACHE_MEMORY_MB", 32)) * 1024 * 1024
+        )
+        self.max_disk_bytes = max_disk_bytes or int(
+            float(os.environ.get("MBTI_TTS_CACHE_DISK_MB", 512)) * 1024 * 1024
+        )
+        # Estimate of the directory's size, kept by this process's writes and
+        # re-measured on every prune, which also sees other workers' clips
+        self.disk_bytes = sum(size for _, _, size in self._disk_clips()) if self.directory else 0
+        self.disk_lock = threading.Lock()
+
+        self.clips = OrderedDict()
+        self.memory_bytes = 0
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a clip's bytes from memory or disk, or None on a miss."""
+        with self.lock:
+            audio = self.clips.get(key)
+            if audio is not None:
+                self.clips.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return audio
+
+        audio = self._read(key)
+        if audio is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self._remember(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        """Store a clip in memory and on disk."""
+        if not audio:
+            return
+        self._remember(key, audio)
+        if self.directory:
+            path = self._path(key)
+            if not os.path.exists(path):
+                # Write then rename so other workers never read a partial clip
+                temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(temporary, "wb") as handle:
+                    handle.write(audio)
+                os.replace(temporary, path)
+                with self.lock:
+                    self.disk_bytes += len(audio)
+                    over = self.disk_bytes > self.max_disk_bytes
+                if over:
+                    self._prune_disk()
+
+    def get_or_synthesize(self, key, synthesize):
+        """Return a clip, synthesizing and storing it on a miss."""
+        audio = self.get(key)
+        if audio is None:
+            audio = synthesize()
+            if audio:
+                self._count("synthesized")
+                self.put(key, audio)
+        return audio
+
+    def stats(self):
+        """Hit/miss counters and the memory footprint."""
+        with self.lock:
+            counters = dict(self.counters)
+            counters["memory_clips"] = len(self.clips)
+            counters["memory_bytes"] = self.memory_bytes
+        return counters
+
+    def _remember(self, key, audio):
+        with self.lock:
+            previous = self.clips.pop(key, None)
+            if previous is not None:
+                self.memory_bytes -= len(previous)
+            self.clips[key] = audio
+            self.memory_bytes += len(audio)
+            while self.memory_bytes > self.max_memory_bytes and len(self.clips) > 1:
+                _, evicted = self.clips.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+
+    def _read(self, key):
+        if not self.directory or not is_clip_key(key):
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                audio = handle.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # The modification time orders clips for _prune_disk
+            os.utime(path)
+        except OSError:
+            pass
+        return audio
+
+    def _disk_clips(self):
+        """(modification time, path, size) of every clip in the directory."""
+        clips = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".mp3"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # pruned by another worker
+                clips.append((stat.st_mtime, entry.path, stat.st_size))
+        return clips
+
+    def _prune_disk(self):
+        """Delete the least recently used clips until the directory is back under 90% of its limit."""
+        if not self.disk_lock.acquire(blocking=False):
+            return  # another thread is already pruning
+        try:
+            clips = sorted(self._disk_clips())
+            total = sum(size for _, _, size in clips)
+            target = self.max_disk_bytes * 0.9
+            evicted = 0
+            for _, path, size in clips:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            with self.lock:
+                self.disk_bytes = total
+                self.counters["disk_evictions"] += evicted
+        finally:
+            self.disk_lock.release()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _count(self, event):
+        with self.lock:
+            self.counters[event] += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Return the process-wide speech clip cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TTSCache()
+        return _cache
+
+
+def speech_clips(texts, chunk_chars=None):
+    """
+    The clips TTSPipeline will ask for when speaking texts.
+
+    Replies are spoken in chunks, so these are the chunks, not the whole
+    texts; chunk_chars must match the pipeline's, which defaults to
+    MBTI_TTS_CHUNK_CHARS.
+    """
+    from .tts_pipeline import default_chunk_chars, split_speech
+
+    chunk_chars = default_chunk_chars() if chunk_chars is None else chunk_chars
+    clips = []
+    for text in texts:
+        for chunk in split_speech(text, chunk_chars):
+            if chunk not in clips:
+                clips.append(chunk)
+    return clips
+
+
+def presynthesize(voice_processor, texts, chunk_chars=None):
+    """
+    Synthesize every clip of texts that isn't cached yet.
+
+    Returns:
+        int: Number of clips synthesized
+    """
+    synthesized = 0
+    for clip in speech_clips(texts, chunk_chars):
+        if voice_processor.cached_clip(clip) is None:
+            if voice_processor.clip(clip) is not None:
+                synthesized += 1
+    return synthesized
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pre-synthesize speech for the analyzer's fixed replies."
+    )
+    parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from .mbti_analyzer import static_utterances
+    from .voice_processor import VoiceProcessor
+
+    voice_processor = VoiceProcessor()
+    texts = static_utterances()
+    clips = speech_clips(texts)
+    cached = sum(1 for clip in clips if voice_processor.cached_clip(clip) is not None)
+    synthesized = presynthesize(voice_processor, texts)
+    print(f"{len(texts)} fixed replies in {len(clips)} clips: {cached} already cached, {synthesized} synthesized, "
+          f"{len(clips) - cached - synthesized} failed ({get_tts_cache().directory or 'memory only'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import os
+import queue
+import re
+import threading
+import time
+
+from .metrics import observe
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
+
+
+def default_chunk_chars():
+    """Longest speech chunk from MBTI_TTS_CHUNK_CHARS, 250 by default."""
+    return int(os.environ.get("MBTI_TTS_CHUNK_CHARS", 250))
+
+
+def split_speech(text, max_chars):
+    """
+    Split a reply into chunks that can be synthesized and played one by one.
+
+    Paragraphs (result sections) always start a new chunk; within one,
+    sentences are merged up to max_chars. The very first chunk is a single
+    sentence so it synthesizes, and starts playing, as soon as possible.
+
+    Args:
+        text (str): The reply
+        max_chars (int): Longest merged chunk; 0 or less keeps the reply whole
+
+    Returns:
+        list: Chunk strings
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    if max_chars <= 0:
+        return [text]
+
+    chunks = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        current = ""
+        for sentence in _SENTENCE_END.split(" ".join(paragraph.split())):
+            if not sentence:
+                continue
+            if current and (not chunks or len(current) + 1 + len(sentence) > max_chars):
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+class _Utterance:
+    def __init__(self, generation):
+        self.generation = generation
+        self.started = time.perf_counter()
+        self.texts = []
+        self.queued = 0
+        self.delivered = 0
+        self.any_delivered = False
+        self.ready = {}
+        self.closed = False
+        self.released = False
+        # Held while recording a finished chunk and delivering what is now in order
+        self.delivery_lock = threading.Lock()
+
+
+class TTSPipeline:
+    def __init__(self, synthesize, deliver, workers=None, chunk_chars=None, lookahead=None, sessions=None):
+        """
+        Synthesize speech on background workers instead of the Socket.IO handler.
+
+        Each session only ever hears its latest reply: opening a new
+        utterance supersedes any older one that hasn't been delivered yet.
+        Replies are split into sentence/section chunks that are delivered
+        in order as each is ready, so the first sentence plays while the
+        rest is still being synthesized, and an open utterance can keep
+        growing, e.g. by result sections as they are generated.
+
+        Args:
+            synthesize (callable): Takes text and returns the encoded audio, or
+                a reference to it such as a clip cache key; a falsy result
+                means synthesis failed
+            deliver (callable): Called as deliver(sid, audio, first) with that
+                result for a session, in order; first is True for the first
+                chunk of a new utterance, which replaces anything still playing
+            workers (int, optional): Number of synthesis workers. Defaults to
+                the MBTI_TTS_WORKERS environment variable or 4.
+            chunk_chars (int, optional): Longest chunk; 0 synthesizes each
+                reply whole. Defaults to MBTI_TTS_CHUNK_CHARS or 250.
+            lookahead (int, optional): Chunks of one utterance synthesized
+                ahead of the last one delivered, so one long reply can't
+                occupy every worker. Defaults to MBTI_TTS_LOOKAHEAD or 2.
+            sessions (optional): Registry of per-client voice state with
+                acquire(sid, holder) and release(sid, holder), e.g. the
+                VoiceProcessor. Each utterance holds a reference as 'tts'
+                until it is fully delivered, superseded or cancelled.
+        """
+        self.synthesize = synthesize
+        self.deliver = deliver
+        self.sessions = sessions
+        self.workers = workers or int(os.environ.get("MBTI_TTS_WORKERS", 4))
+        self.chunk_chars = default_chunk_chars() if chunk_chars is None else chunk_chars
+        self.lookahead = lookahead or int(os.environ.get("MBTI_TTS_LOOKAHEAD", 2))
+
+        self.queue = queue.Queue()
+        self.utterances = {}
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.threads = []
+
+    def submit(self, sid, text):
+        """Speak a complete reply, superseding anything still pending for the session."""
+        if not text:
+            return
+        self.open(sid)
+        self.append(sid, text)
+        self.close(sid)
+
+    def open(self, sid):
+        """Start a new, still growing utterance for a session, superseding the previous one."""
+        self._ensure_workers()
+        if self.sessions is not None:
+            self.sessions.acquire(sid, "tts")
+        with self.lock:
+            previous = self.utterances.get(sid)
+            if previous is not None:
+                self._retire(sid, previous)
+            generation = self.generations.get(sid, 0) + 1
+            self.generations[sid] = generation
+            self.utterances[sid] = _Utterance(generation)
+
+    def append(self, sid, text):
+        """Add text to the session's open utterance; ignored once it is closed or superseded."""
+        chunks = split_speech(text, self.chunk_chars)
+        with self.lock:
+            utterance = self.utterances.get(sid)
+            if utterance is None or utterance.closed or not chunks:
+                return
+            utterance.texts.extend(chunks)
+            self._pump(sid, utterance)
+
+    def close(self, sid):
+        """Mark the session's utterance complete; what was appended is still spoken."""
+        with self.lock:
+            utterance = self.utterances.get(sid)
+            if utterance is not None:
+                utterance.closed = True
+                if utterance.delivered == len(utterance.texts):
+                    self._retire(sid, utterance)
+
+    def cancel(self, sid):
+        """Drop every pending utterance for a session, e.g. on disconnect."""
+        with self.lock:
+            utterance = self.utterances.get(sid)
+            if utterance is not None:
+                self._retire(sid, utterance)
+            self.generations.pop(sid, None)
+
+    def _retire(self, sid, utterance):
+        """Stop tracking an utterance and release its session reference. Caller holds the lock."""
+        if self.utterances.get(sid) is utterance:
+            del self.utterances[sid]
+        if not utterance.released:
+            utterance.released = True
+            if self.sessions is not None:
+                self.sessions.release(sid, "tts")
+
+    def _pump(self, sid, utterance):
+        """Queue the utterance's next chunks within the lookahead. Caller holds the lock."""
+        while utterance.queued < len(utterance.texts) and utterance.queued < utterance.delivered + self.lookahead:
+            index = utterance.queued
+            utterance.queued += 1
+            self.queue.put((sid, utterance, index, utterance.texts[index]))
+
+    def _is_current(self, sid, utterance):
+        with self.lock:
+            return self.utterances.get(sid) is utterance
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use."""
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"tts-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _worker(self):
+        """Synthesize queued chunks, skipping any whose utterance went stale."""
+        while True:
+            sid, utterance, index, text = self.queue.get()
+            try:
+                audio = self.synthesize(text) if self._is_current(sid, utterance) else None
+                self._finish_chunk(sid, utterance, index, audio)
+            except Exception as e:
+                print(f"Error in TTS pipeline: {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def _finish_chunk(self, sid, utterance, index, audio):
+        """Record a synthesized chunk and deliver every chunk that is now next in line."""
+        with utterance.delivery_lock:
+            with self.lock:
+                utterance.ready[index] = audio
+                in_order = []
+                while utterance.delivered in utterance.ready:
+                    in_order.append(utterance.ready.pop(utterance.delivered))
+                    utterance.delivered += 1
+                # A newer reply may have arrived while this one was synthesizing
+                current = self.utterances.get(sid) is utterance
+                if current:
+                    self._pump(sid, utterance)
+                    if utterance.closed and utterance.delivered == len(utterance.texts):
+                        self._retire(sid, utterance)
+
+            for audio in in_order:
+                if not audio or not current:
+                    continue  # a failed chunk is skipped, not retried
+                first = not utterance.any_delivered
+                utterance.any_delivered = True
+                if first:
+                    observe("mbti_stage_seconds", time.perf_counter() - utterance.started, stage="tts_first_audio")
+                self.deliver(sid, audio, first)
@@ -1,111 +1,188 @@
+import io
 import os
-import tempfile
-from gtts import gTTS
-import speech_recognition as sr
-import pygame
 import threading
-import queue
 import time
+from collections import Counter
 
-class VoiceProcessor:
+from .metrics import timer
+from .tts_cache import clip_key, get_tts_cache
+
+# gTTS and pygame are imported when a voice feature is first used, so
+# text-only and headless servers never load them
+
+
+class AudioBackend:
     def __init__(self):
-        """Initialize the voice processor with text-to-speech and speech-to-text capabilities."""
-        # Initialize speech recognizer
-        self.recognizer = sr.Recognizer()
-        
-        # Initialize pygame for audio playback
-        pygame.mixer.init()
-        
-        # Audio processing queue
-        self.audio_queue = queue.Queue()
-        
-        # Speech recognition thread
-        self.recognition_thread = None
-        self.is_listening = False
-        
-        # Temporary directory for audio files
-        self.temp_dir = tempfile.mkdtemp()
-        
-    def text_to_speech(self, text):
-        """Convert text to speech and play it."""
-        try:
-            # Generate temporary file path
-            temp_file = os.path.join(self.temp_dir, f'speech_{time.time()}.mp3')
-            
-            # Convert text to speech
-            tts = gTTS(text=text, lang='en', slow=False)
-            tts.save(temp_file)
-            
-            # Play the audio
-            pygame.mixer.music.load(temp_file)
+        """
+        The process's local audio output, shared by every session.
+
+        pygame's mixer is process-global, so it is initialized once, on the
+        first local playback, and only shut down when the process exits;
+        sessions coming and going never touch it.
+        """
+        self.pygame = None
+        self.initializations = 0
+        self.lock = threading.Lock()
+
+    def ensure(self):
+        """Initialize the mixer on first use and return pygame."""
+        with self.lock:
+            if self.pygame is None:
+                import pygame
+                pygame.mixer.init()
+                self.pygame = pygame
+                self.initializations += 1
+            return self.pygame
+
+    def play(self, audio):
+        """Play MP3 bytes from memory and wait for them to finish."""
+        pygame = self.ensure()
+        # One clip at a time: the mixer has a single music channel
+        with self.lock:
+            pygame.mixer.music.load(io.BytesIO(audio), "mp3")
             pygame.mixer.music.play()
-            
-            # Wait for playback to finish
             while pygame.mixer.music.get_busy():
                 pygame.time.Clock().tick(10)
-                
-            # Clean up temporary file
-            os.remove(temp_file)
-            
+            pygame.mixer.music.unload()
+
+    def shutdown(self):
+        """Release the mixer, e.g. at process exit."""
+        with self.lock:
+            if self.pygame is not None:
+                self.pygame.mixer.quit()
+                self.pygame = None
+
+
+_backend = AudioBackend()
+
+
+def get_audio_backend():
+    """Return the process-wide audio backend."""
+    return _backend
+
+
+class VoiceSession:
+    def __init__(self, sid):
+        """Voice state of one client, kept while any pipeline holds a reference to it."""
+        self.sid = sid
+        self.started = time.time()
+        # Holder ('stt', 'tts') -> references it holds: an open microphone
+        # stream, a recognition in flight or an utterance still being spoken
+        self.holders = Counter()
+
+    @property
+    def refs(self):
+        return sum(self.holders.values())
+
+
+class VoiceProcessor:
+    def __init__(self, cache=None):
+        """
+        Initialize the voice processor with text-to-speech capabilities.
+
+        Speech recognition of browser audio lives in STTPipeline. Audio is
+        handled as in-memory bytes throughout: clips go from gTTS to the
+        clip cache to the browser, or to the shared AudioBackend for local
+        playback, without temporary files. Construction is cheap.
+
+        Args:
+            cache (TTSCache, optional): Clip cache. Defaults to the
+                process-wide one.
+        """
+        # Synthesized clips are cached by (text, lang, engine, voice); the
+        # voice is gTTS's accent domain, e.g. 'com', 'co.uk' or 'com.au'
+        self.engine = "gtts"
+        self.voice = os.environ.get("MBTI_TTS_VOICE", "com")
+        self.cache = cache or get_tts_cache()
+        self.backend = get_audio_backend()
+
+        # sid -> VoiceSession, dropped when its last reference is released.
+        # STTPipeline and TTSPipeline take and release the references, so a
+        # disconnect frees the state once their in-flight work has finished
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, sid, holder):
+        """Take a reference to a client's voice state, creating it on first use."""
+        with self.lock:
+            session = self.sessions.get(sid)
+            if session is None:
+                session = VoiceSession(sid)
+                self.sessions[sid] = session
+            session.holders[holder] += 1
+            return session
+
+    def release(self, sid, holder):
+        """Drop one of holder's references to a client's voice state; the last one frees it."""
+        with self.lock:
+            session = self.sessions.get(sid)
+            if session is None or session.holders[holder] <= 0:
+                return
+            session.holders[holder] -= 1
+            if session.holders[holder] == 0:
+                del session.holders[holder]
+            if not session.holders:
+                del self.sessions[sid]
+
+    def active_sessions(self):
+        """Number of clients with live voice state."""
+        with self.lock:
+            return len(self.sessions)
+
+    def synthesize(self, text, lang='en'):
+        """Convert text to speech and return the MP3 bytes without playing them."""
+        try:
+            return self.cache.get_or_synthesize(
+                self._key(text, lang), lambda: self._synthesize(text, lang)
+            )
+        except Exception as e:
+            print(f"Error in synthesize: {str(e)}")
+            return None
+
+    def clip(self, text, lang='en'):
+        """
+        Make sure a reply's speech is cached and return its clip key.
+
+        Returns:
+            str: Key for clip_audio() and the /tts/<key>.mp3 route, or None
+            if synthesis failed
+        """
+        return self._key(text, lang) if self.synthesize(text, lang) else None
+
+    def cached_clip(self, text, lang='en'):
+        """The clip key if a reply's speech is already cached, without synthesizing it."""
+        key = self._key(text, lang)
+        return key if self.cache.get(key) is not None else None
+
+    def clip_audio(self, key):
+        """The MP3 bytes of a cached clip, or None."""
+        return self.cache.get(key)
+
+    def _key(self, text, lang):
+        return clip_key(text, lang, self.engine, self.voice)
+
+    def _synthesize(self, text, lang):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        with timer("mbti_stage_seconds", stage="tts"):
+            tts = gTTS(text=text, lang=lang, tld=self.voice, slow=False)
+            tts.write_to_fp(buffer)
+        return buffer.getvalue()
+
+    def text_to_speech(self, text):
+        """Convert text to speech and play it on the local audio backend."""
+        try:
+            audio = self.synthesize(text)
+            if audio is None:
+                return False
+            self.backend.play(audio)
             return True
         except Exception as e:
             print(f"Error in text_to_speech: {str(e)}")
             return False
-    
-    def start_listening(self, callback):
-        """Start continuous speech recognition."""
-        if self.recognition_thread is not None and self.recognition_thread.is_alive():
-            return False
-        
-        self.is_listening = True
-        self.recognition_thread = threading.Thread(
-            target=self._recognition_worker,
-            args=(callback,)
-        )
-        self.recognition_thread.daemon = True
-        self.recognition_thread.start()
-        return True
-    
-    def stop_listening(self):
-        """Stop continuous speech recognition."""
-        self.is_listening = False
-        if self.recognition_thread is not None:
-            self.recognition_thread.join()
-            self.recognition_thread = None
-    
-    def _recognition_worker(self, callback):
-        """Worker function for continuous speech recognition."""
-        with sr.Microphone() as source:
-            # Adjust for ambient noise
-            self.recognizer.adjust_for_ambient_noise(source)
-            
-            while self.is_listening:
-                try:
-                    # Listen for speech
-                    audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=10)
-                    
-                    # Recognize speech using Google Speech Recognition
-                    text = self.recognizer.recognize_google(audio)
-                    
-                    if text:
-                        # Call the callback function with the recognized text
-                        callback(text)
-                        
-                except sr.WaitTimeoutError:
-                    continue
-                except sr.UnknownValueError:
-                    continue
-                except sr.RequestError as e:
-                    print(f"Could not request results; {str(e)}")
-                except Exception as e:
-                    print(f"Error in speech recognition: {str(e)}")
-    
+
     def cleanup(self):
-        """Clean up resources."""
-        self.stop_listening()
-        pygame.mixer.quit()
-        # Clean up temporary directory
-        if os.path.exists(self.temp_dir):
-            for file in os.listdir(self.temp_dir):
-                os.remove(os.path.join(self.temp_dir, file))
-            os.rmdir(self.temp_dir) 
\ No newline at end of file
+        """Release shared resources at process exit; per-client state is freed by release()."""
+        with self.lock:
+            self.sessions.clear()
+        self.backend.shutdown()
@@ -17,9 +17,28 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Voice state
     let isVoiceActive = false;
+    let microphone = null;
+    let currentAudio = null;
+    const speechQueue = [];
+    let lastSentMessage = '';
     
-    // Connect to Socket.IO server
-    const socket = io();
+    // Progressive result state
+    let streamedResults = false;
+    const sectionBuffers = {};
+    const completedSections = new Set();
+    const sectionElements = {
+        overview: mbtiOverview,
+        roast: roastContainer,
+        recommendations: recommendations,
+        doppelgangers: doppelgangers,
+        relationship: relationshipInsights,
+        career: careerInsights
+    };
+    
+    // Connect to Socket.IO server, resuming the previous test session if any
+    const socket = io({
+        auth: (cb) => cb({ session_token: sessionStorage.getItem('mbti_session_token') })
+    });
     
     // Initialize chat
     init();
@@ -38,7 +57,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Functions
     function init() {
         // Send empty message to get initial greeting
-        socket.emit('message', { message: '' });
+        socket.emit('message', { message: '', progressive: true });
     }
     
     function sendMessage() {
@@ -55,7 +74,9 @@ document.addEventListener('DOMContentLoaded', () => {
         setInputState(false);
         
         // Send message to server
-        socket.emit('message', { message });
+        stopSpeech();
+        lastSentMessage = message;
+        socket.emit('message', { message, progressive: true, speak: isVoiceActive });
     }
     
     function addMessageToChat(sender, content) {
@@ -92,93 +113,59 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
-    function showResults(resultContent) {
-        // For debugging - log the raw result content
-        console.log("Raw result content:", resultContent);
-        
+    function showResultContainer() {
         // Hide chat container and show results
         document.querySelector('.chat-container').classList.add('hidden');
         resultContainer.classList.remove('hidden');
+    }
+    
+    function startProgressiveResults(mbtiType) {
+        streamedResults = true;
+        showResultContainer();
+        mbtiTitle.innerHTML = `${mbtiType}: ${getMbtiTypeTitle(mbtiType)}`;
         
-        // Extract MBTI type and title
-        const mbtiTypeMatch = resultContent.match(/🎉 Your MBTI Personality Type: (\w{4})/);
-        if (mbtiTypeMatch) {
-            const mbtiType = mbtiTypeMatch[1];
-            const mbtiTypeTitle = getMbtiTypeTitle(mbtiType);
-            mbtiTitle.innerHTML = `${mbtiType}: ${mbtiTypeTitle}`;
-            console.log("Found MBTI type:", mbtiType);
-        } else {
-            console.error("Failed to match MBTI type");
-            // Fallback to display something
-            mbtiTitle.innerHTML = "Your Personality Type";
-        }
-        
-        // Extract overview - updated regex to be more flexible
-        const overviewMatch = resultContent.match(/📝\s*Overview([\s\S]*?)(?=🔥\s*Roast|🎯)/i);
-        if (overviewMatch) {
-            mbtiOverview.innerHTML = formatBotMessage(overviewMatch[1]);
-            console.log("Found overview");
-        } else {
-            console.error("Failed to match overview section");
-            // Fallback for overview
-            const descriptionMatch = resultContent.match(/🎉.*?(\w{4})\s*([\s\S]*?)(?=📝|🔥|🎯)/i);
-            if (descriptionMatch) {
-                mbtiOverview.innerHTML = formatBotMessage(descriptionMatch[2]);
-                console.log("Found description as fallback for overview");
-            } else {
-                mbtiOverview.innerHTML = "<p>No overview available</p>";
-            }
-        }
-        
-        // Extract roast - updated regex to be more flexible
-        const roastMatch = resultContent.match(/🔥\s*Roast([\s\S]*?)(?=🎯)/i);
-        if (roastMatch) {
-            roastContainer.innerHTML = formatBotMessage(roastMatch[1]);
-            console.log("Found roast");
-        } else {
-            console.error("Failed to match roast section");
-            roastContainer.innerHTML = "<p>No roast available</p>";
-        }
-        
-        // Extract recommendations - updated regex to be more flexible
-        const recommendationsMatch = resultContent.match(/🎯[\s\S]*?recommendations([\s\S]*?)(?=Who are your celebrity|Remember|Career|Relationship)/i);
-        if (recommendationsMatch) {
-            displayRecommendations(recommendationsMatch[1]);
-            console.log("Found recommendations");
-        } else {
-            console.error("Failed to match recommendations section");
-            recommendations.innerHTML = "<p>No recommendations available</p>";
-        }
+        // Placeholders until each section arrives
+        Object.values(sectionElements).forEach(element => {
+            element.innerHTML = '<p class="section-loading">Generating...</p>';
+        });
+    }
+    
+    function renderSection(section, content) {
+        // Final content replaces anything streamed so far
+        completedSections.add(section);
+        delete sectionBuffers[section];
         
-        // Extract doppelgangers - updated regex to be more flexible
-        const doppelgangersMatch = resultContent.match(/Who are your celebrity doppelgangers\?([\s\S]*?)(?=Relationship|Career|Remember)/i);
-        if (doppelgangersMatch) {
-            displayDoppelgangers(doppelgangersMatch[1]);
-            console.log("Found doppelgangers");
-        } else {
-            console.error("Failed to match doppelgangers section");
-            doppelgangers.innerHTML = "<p>No celebrity doppelgangers available</p>";
+        if (section === 'recommendations') {
+            displayRecommendations(content);
+        } else if (section === 'doppelgangers') {
+            displayDoppelgangers(content);
+        } else if (section === 'career') {
+            displayCareerInsights(content);
+        } else if (section === 'relationship') {
+            displayRelationshipInsights(content);
+        } else if (sectionElements[section]) {
+            sectionElements[section].innerHTML = content ? formatBotMessage(content) : '<p>Not available</p>';
         }
+    }
+    
+    function appendSectionToken(section, token) {
+        const element = sectionElements[section];
+        if (!element) return;
         
-        // Extract relationship insights - updated regex to be more flexible
-        const relationshipMatch = resultContent.match(/Relationship([\s\S]*?)(?=Career|Remember)/i);
-        if (relationshipMatch) {
-            relationshipInsights.innerHTML = formatBotMessage(relationshipMatch[1]);
-            console.log("Found relationship insights");
-        } else {
-            console.error("Failed to match relationship section");
-            relationshipInsights.innerHTML = "<p>No relationship insights available</p>";
-        }
+        sectionBuffers[section] = (sectionBuffers[section] || '') + token;
+        element.innerHTML = formatBotMessage(sectionBuffers[section]);
+    }
+    
+    function showResults(result) {
+        showResultContainer();
         
-        // Extract career insights - updated regex to be more flexible
-        const careerMatch = resultContent.match(/Career insights?([\s\S]*?)(?=Remember|$)/i);
-        if (careerMatch) {
-            careerInsights.innerHTML = formatBotMessage(careerMatch[1]);
-            console.log("Found career insights");
-        } else {
-            console.error("Failed to match career section");
-            careerInsights.innerHTML = "<p>No career insights available</p>";
-        }
+        mbtiTitle.innerHTML = `${result.mbti_type}: ${getMbtiTypeTitle(result.mbti_type)}`;
+        renderSection('overview', result.overview || result.description);
+        renderSection('roast', result.roast);
+        renderSection('recommendations', result.recommendations);
+        renderSection('doppelgangers', result.doppelgangers);
+        renderSection('relationship', result.relationship);
+        renderSection('career', result.career);
     }
     
     function getMbtiTypeTitle(mbtiType) {
@@ -215,128 +202,85 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function displayRecommendations(content) {
-        console.log("Raw recommendations content:", content);
+    function displayRecommendations(categories) {
         // Clear previous recommendations
         recommendations.innerHTML = '';
         
-        // If content is empty or doesn't contain categories, display a message
-        if (!content || !content.trim()) {
-            recommendations.innerHTML = "<p>No recommendations available</p>";
-            return;
-        }
-        
-        // Create categories
-        const categories = ['Music', 'Books', 'Movies'];
-        let anyCategories = false;
-        
-        categories.forEach(category => {
-            // More flexible regex to match category sections
-            const categoryMatch = content.match(new RegExp(`${category}:?([\\s\\S]*?)(?=(?:Music|Books|Movies):?|$)`, 'i'));
-            if (categoryMatch && categoryMatch[1].trim()) {
-                anyCategories = true;
-                const categoryContent = categoryMatch[1];
-                
-                const categoryDiv = document.createElement('div');
-                categoryDiv.className = 'recommendation-category';
-                categoryDiv.innerHTML = `
-                    <h4>${category}</h4>
-                    <div class="recommendation-list">
-                        ${formatRecommendationItems(categoryContent)}
-                    </div>
-                `;
-                
-                recommendations.appendChild(categoryDiv);
-            }
+        const labels = { music: 'Music', books: 'Books', movies: 'Movies' };
+        Object.entries(labels).forEach(([key, label]) => {
+            const items = (categories && categories[key]) || [];
+            if (items.length === 0) return;
+            
+            const categoryDiv = document.createElement('div');
+            categoryDiv.className = 'recommendation-category';
+            categoryDiv.innerHTML = `
+                <h4>${label}</h4>
+                <div class="recommendation-list">
+                    ${items.map(item => `
+                        <div class="recommendation-item">
+                            <p>${item}</p>
+                        </div>
+                    `).join('')}
+                </div>
+            `;
+            recommendations.appendChild(categoryDiv);
         });
         
-        // If no categories were found, display the content directly
-        if (!anyCategories) {
-            recommendations.innerHTML = `<div class="recommendation-content">${formatBotMessage(content)}</div>`;
+        if (!recommendations.hasChildNodes()) {
+            recommendations.innerHTML = "<p>No recommendations available</p>";
         }
     }
     
-    function formatRecommendationItems(content) {
-        const items = content
-            .split('\n')
-            .filter(item => item.trim())
-            .map(item => {
-                const trimmedItem = item.trim();
-                // More flexible pattern to match recommendations
-                if (trimmedItem.match(/^\d+[\.\):]|^-|^\*/)) {
-                    return `
-                        <div class="recommendation-item">
-                            <p>${trimmedItem}</p>
-                        </div>
-                    `;
-                }
-                return '';
-            })
+    function displayDoppelgangers(items) {
+        if (!items || items.length === 0) {
+            doppelgangers.innerHTML = "<p>No celebrity doppelgangers available</p>";
+            return;
+        }
+        
+        doppelgangers.innerHTML = items
+            .map(item => `
+                <div class="doppelganger-item">
+                    ${item.name ? `<h4>${item.name}</h4>` : ''}
+                    <p>${item.description}</p>
+                </div>
+            `)
             .join('');
-            
-        return items || `<p>${content.trim()}</p>`;
     }
     
-    function displayDoppelgangers(content) {
-        console.log("Raw doppelgangers content:", content);
-        // Clear previous doppelgangers
-        doppelgangers.innerHTML = '';
-        
-        // If content is empty, display a message
-        if (!content || !content.trim()) {
-            doppelgangers.innerHTML = "<p>No celebrity doppelgangers available</p>";
+    function formatTraits(insights) {
+        const traits = [...(insights.strengths || []), ...(insights.weaknesses || [])];
+        return `
+            <p><strong>Strengths and weaknesses</strong></p>
+            <p>${traits.map(trait => `<strong>${trait}</strong>`).join('<br>')}</p>
+        `;
+    }
+    
+    function displayCareerInsights(insights) {
+        if (!insights || !insights.workplace) {
+            careerInsights.innerHTML = "<p>No career insights available</p>";
             return;
         }
         
-        // Split by lines and try to extract doppelgangers
-        const lines = content.split('\n').filter(line => line.trim());
-        
-        // If there are no lines, display the raw content
-        if (lines.length === 0) {
-            doppelgangers.innerHTML = formatBotMessage(content);
+        careerInsights.innerHTML = `
+            <p><strong>Your workplace</strong></p>
+            <p>${insights.workplace}</p>
+            <p><strong>Your perfect career</strong></p>
+            <p>${insights.perfect_career}</p>
+            ${formatTraits(insights)}
+        `;
+    }
+    
+    function displayRelationshipInsights(insights) {
+        if (!insights || !insights.summary) {
+            relationshipInsights.innerHTML = "<p>No relationship insights available</p>";
             return;
         }
         
-        // Process each line
-        const doppelgangerItems = lines
-            .map(line => {
-                const trimmedLine = line.trim();
-                // Try to match a numbered or bulleted item
-                const itemMatch = trimmedLine.match(/^(\d+[\.\):]|[-*])\s*(.*)/);
-                if (itemMatch) {
-                    // Try to split into name and description
-                    const itemContent = itemMatch[2];
-                    const parts = itemContent.split(/:\s*(.+)/);
-                    
-                    if (parts.length > 1) {
-                        // We have a name and description
-                        return `
-                            <div class="doppelganger-item">
-                                <h4>${parts[0].trim()}</h4>
-                                <p>${parts[1].trim()}</p>
-                            </div>
-                        `;
-                    } else {
-                        // No colon separation, treat whole line as content
-                        return `
-                            <div class="doppelganger-item">
-                                <p>${itemContent}</p>
-                            </div>
-                        `;
-                    }
-                } else if (trimmedLine) {
-                    // Not a list item but has content
-                    return `
-                        <div class="doppelganger-item">
-                            <p>${trimmedLine}</p>
-                        </div>
-                    `;
-                }
-                return '';
-            })
-            .join('');
-            
-        doppelgangers.innerHTML = doppelgangerItems || formatBotMessage(content);
+        relationshipInsights.innerHTML = `
+            <p><strong>Summary</strong></p>
+            <p>${insights.summary}</p>
+            ${formatTraits(insights)}
+        `;
     }
     
     function toggleVoice() {
@@ -347,14 +291,141 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
-    function startVoice() {
-        socket.emit('start_voice');
+    // Microphone audio is sent to the server as 16 kHz 16-bit mono PCM chunks;
+    // the server decides where each utterance ends and transcribes it
+    const STREAM_SAMPLE_RATE = 16000;
+    const CHUNK_MS = 100;
+    
+    async function startVoice() {
+        try {
+            const stream = await navigator.mediaDevices.getUserMedia({
+                audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true }
+            });
+            const context = new (window.AudioContext || window.webkitAudioContext)();
+            const source = context.createMediaStreamSource(stream);
+            const processor = context.createScriptProcessor(4096, 1, 1);
+            const pending = [];
+            let pendingLength = 0;
+            const chunkSamples = STREAM_SAMPLE_RATE * CHUNK_MS / 1000;
+            
+            processor.onaudioprocess = (event) => {
+                const samples = downsample(event.inputBuffer.getChannelData(0), context.sampleRate);
+                pending.push(samples);
+                pendingLength += samples.length;
+                if (pendingLength >= chunkSamples) {
+                    socket.emit('audio_chunk', toPCM16(pending, pendingLength));
+                    pending.length = 0;
+                    pendingLength = 0;
+                }
+            };
+            source.connect(processor);
+            processor.connect(context.destination);
+            
+            microphone = { stream, context, source, processor };
+            socket.emit('start_voice', { sample_rate: STREAM_SAMPLE_RATE });
+        } catch (error) {
+            console.error('Microphone unavailable:', error);
+            addMessageToChat('bot', "I couldn't access your microphone. Please check the browser's permissions.");
+            updateVoiceUI(false);
+        }
     }
     
     function stopVoice() {
+        releaseMicrophone();
         socket.emit('stop_voice');
     }
     
+    function releaseMicrophone() {
+        if (!microphone) {
+            return;
+        }
+        microphone.processor.disconnect();
+        microphone.source.disconnect();
+        microphone.stream.getTracks().forEach(track => track.stop());
+        microphone.context.close();
+        microphone = null;
+        showPartialTranscript('');
+    }
+    
+    function downsample(input, inputRate) {
+        // Average each run of input samples into one output sample
+        if (inputRate === STREAM_SAMPLE_RATE) {
+            return Float32Array.from(input);
+        }
+        const ratio = inputRate / STREAM_SAMPLE_RATE;
+        const output = new Float32Array(Math.floor(input.length / ratio));
+        for (let i = 0; i < output.length; i++) {
+            const start = Math.floor(i * ratio);
+            const end = Math.min(input.length, Math.floor((i + 1) * ratio));
+            let sum = 0;
+            for (let j = start; j < end; j++) {
+                sum += input[j];
+            }
+            output[i] = sum / Math.max(1, end - start);
+        }
+        return output;
+    }
+    
+    function toPCM16(blocks, length) {
+        const pcm = new Int16Array(length);
+        let offset = 0;
+        blocks.forEach(block => {
+            for (let i = 0; i < block.length; i++) {
+                const sample = Math.max(-1, Math.min(1, block[i]));
+                pcm[offset++] = sample < 0 ? sample * 0x8000 : sample * 0x7fff;
+            }
+        });
+        return pcm.buffer;
+    }
+    
+    function showPartialTranscript(text) {
+        // What the user has said so far, shown in the input until the turn is sent
+        userInput.placeholder = text || 'Type your answer here...';
+    }
+    
+    function playSpeech(url, first) {
+        // Replies arrive a sentence or section at a time: the first clip of a
+        // newer reply replaces whatever is still playing, later ones queue up.
+        // Clips are cached URLs, so a repeated reply comes from the browser cache
+        if (first) {
+            stopSpeech();
+        }
+        
+        // Start fetching now so the next clip is buffered before this one ends
+        const audio = new Audio(url);
+        audio.preload = 'auto';
+        speechQueue.push(audio);
+        if (!currentAudio) {
+            playNextSpeech();
+        }
+    }
+    
+    function playNextSpeech() {
+        currentAudio = speechQueue.shift() || null;
+        if (!currentAudio) {
+            return;
+        }
+        const audio = currentAudio;
+        const advance = () => {
+            if (currentAudio === audio) {
+                playNextSpeech();
+            }
+        };
+        audio.addEventListener('ended', advance);
+        audio.play().catch(error => {
+            console.error('Audio playback failed:', error);
+            advance();
+        });
+    }
+    
+    function stopSpeech() {
+        speechQueue.length = 0;
+        if (currentAudio) {
+            currentAudio.pause();
+            currentAudio = null;
+        }
+    }
+    
     function updateVoiceUI(isActive) {
         isVoiceActive = isActive;
         voiceToggle.classList.toggle('active', isActive);
@@ -367,27 +438,25 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log('Connected to server');
     });
     
+    socket.on('session', (data) => {
+        sessionStorage.setItem('mbti_session_token', data.session_token);
+    });
+    
     socket.on('response', (data) => {
         console.log('Socket response received:', data);
         
         if (data.voice_input) {
             // Add the transcribed voice input to chat
+            showPartialTranscript('');
             addMessageToChat('user', data.voice_input);
         }
         
         if (data.is_complete && data.mbti_result) {
-            // Test is complete, show results
-            addMessageToChat('bot', 'Great! Your test is now complete. Here are your results...');
-            
-            // Log the raw message for debugging
-            console.log('Complete MBTI result received:', {
-                mbtiType: data.mbti_result,
-                messageLength: data.message ? data.message.length : 0,
-                messagePreview: data.message ? data.message.substring(0, 100) + '...' : 'No message'
-            });
-            
-            // Process the results
-            showResults(data.message);
+            // Test is complete, show results, unless they were already streamed in section by section
+            if (!streamedResults) {
+                addMessageToChat('bot', data.message);
+                showResults(data.mbti_result);
+            }
             
             // Stop voice input when test is complete
             if (isVoiceActive) {
@@ -402,10 +471,47 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
     
+    socket.on('result_section', (data) => {
+        if (data.section === 'type') {
+            addMessageToChat('bot', 'Great! Your test is now complete. Here are your results...');
+            startProgressiveResults(data.content.mbti_type);
+            return;
+        }
+        renderSection(data.section, data.content);
+    });
+    
+    socket.on('result_token', (data) => {
+        // Tokens that arrive after the final section content are stale
+        if (!completedSections.has(data.section)) {
+            appendSectionToken(data.section, data.token);
+        }
+    });
+    
+    socket.on('busy', (data) => {
+        // The server refused the turn; let the user resend it
+        if (data.voice_input) {
+            addMessageToChat('user', data.voice_input);
+        }
+        addMessageToChat('bot', data.message);
+        if (!data.voice_input && !userInput.value) {
+            userInput.value = lastSentMessage;
+        }
+        setInputState(true);
+    });
+    
+    socket.on('tts_audio', (data) => {
+        playSpeech(data.url, data.first !== false);
+    });
+    
+    socket.on('partial_transcript', (data) => {
+        showPartialTranscript(data.text);
+    });
+    
     socket.on('voice_status', (data) => {
         if (data.status === 'started') {
             updateVoiceUI(true);
         } else if (data.status === 'stopped' || data.status === 'error') {
+            releaseMicrophone();
             updateVoiceUI(false);
         }
     });
@@ -419,6 +525,7 @@ document.addEventListener('DOMContentLoaded', () => {
     socket.on('disconnect', () => {
         console.log('Disconnected from server');
         addMessageToChat('bot', 'Disconnected from server. Please refresh the page to reconnect.');
+        releaseMicrophone();
         updateVoiceUI(false);
     });
 });
\ No newline at end of file